@@ -5,7 +5,7 @@ Created on Mon Apr  20 19:24:32 2020
 @author: intgridnb-02
 """
 import operator
-from .bid import Bid
+from .bid import Bid, SENT, INELASTIC_DEMAND
 import logging
 from .MarketResults import MarketResults
 
@@ -96,11 +96,11 @@ class CRM():
                                     reverse = True)
         
         bidsReceived["Demand"].append(Bid(issuer = self,
-                                          ID = "IEDt{}".format(t),
                                           price = -3000,
                                           amount = -self.demand[product][t],
-                                          status = "Sent",
-                                          bidType = "InelasticDemand"))
+                                          status = SENT,
+                                          bidType = "InelasticDemand",
+                                          kind = INELASTIC_DEMAND))
         
         bidsReceived["Demand"].sort(key = operator.attrgetter(sortingAttribute),
                                     reverse = True)
@@ -6,7 +6,7 @@ Created on Sun Apr  19 16:38:21 2020
 """
 
 from .auxFunc import initializer
-from .bid import Bid
+from .bid import Bid, SENT, INELASTIC_DEMAND
 import operator
 import logging
 from .MarketResults import MarketResults
@@ -78,11 +78,11 @@ class DHM():
                                     reverse = True)
         
         bidsReceived["Demand"].append(Bid(issuer = self, 
-                                          ID = "IEDt{}".format(t),
                                           price = -3000,
                                           amount = self.HLP_DH[region].at[t],
-                                          status = "Sent",
-                                          bidType = "InelasticDemand"))
+                                          status = SENT,
+                                          bidType = "InelasticDemand",
+                                          kind = INELASTIC_DEMAND))
         
         bidsReceived["Demand"].sort(key = operator.attrgetter('price'),
                                     reverse = True)
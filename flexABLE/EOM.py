@@ -4,9 +4,8 @@ Created on Sun Apr  19 16:08:03 2020
 
 @author: intgridnb-02
 """
-import operator
-from .bid import Bid
-import logging
+import numpy as np
+from .bidBook import BidBook, clearBidBook, SUPPLY, DEMAND, INELASTIC_DEMAND, SENT
 from .MarketResults import MarketResults
 
 
@@ -47,238 +46,46 @@ class EOM():
 
 
     def marketClearing(self,t):
-        bidsReceived = {"Supply":[],
-                        "Demand":[]}
-        
-        confirmedBids = []
-        rejectedBids = []
-        partiallyConfirmedBids = []
-        
-        for b in self.bids:
-            bidsReceived[b.bidType].append(b)
-            
-        bidsReceived["Supply"].append(Bid(issuer = self,
-                                          ID = "Bu{}t{}_import".format(self.name,t),
-                                          price = -500.,
-                                          amount = self.CBtrades['Import'][t],
-                                          status = "Sent",
-                                          bidType = "Supply"))
-        
-        bidsReceived["Demand"].append(Bid(issuer = self,
-                                          ID = "Bu{}t{}_export".format(self.name,t),
-                                          price = 2999.,
-                                          amount = self.CBtrades['Export'][t],
-                                          status = "Sent",
-                                          bidType = "Demand"))
-        
-        bidsReceived["Supply"].sort(key = operator.attrgetter('price'), reverse = True)
-        
-        bidsReceived["Demand"].append(Bid(issuer = self,
-                                          ID = "IEDt{}".format(t),
-                                          price = 3000.,
-                                          amount = self.demand[t],
-                                          status = "Sent",
-                                          bidType = "InelasticDemand"))
-        
-        bidsReceived["Demand"].sort(key = operator.attrgetter('price'))
-        
-        sum_totalSupply = sum(bidsReceived["Supply"])
-        sum_totalDemand = sum(bidsReceived["Demand"])
-        
-        # =====================================================================
-        # The different cases of uniform price market clearing
-        # Case 1: The sum of either supply or demand is 0
-        # Case 2: Inelastic demand is higher than sum of all supply bids
-        # Case 3: Covers all other cases       
-        # =====================================================================
-        
-        #Case 1
-        if sum_totalSupply == 0 or sum_totalDemand == 0:
-            logging.debug('The sum of either demand offers ({}) or supply '
-                          'offers ({}) is 0 at t:{}'.format(sum_totalDemand, sum_totalSupply, t))
-            
-            result = MarketResults("{}".format(self.name),
-                                   issuer = self.name,
-                                   confirmedBids = [],
-                                   rejectedBids = bidsReceived["Demand"] + bidsReceived["Supply"],
-                                   marketClearingPrice = 3000.2,
-                                   marginalUnit = "None",
-                                   status = "Case1",
-                                   timestamp = t)
-        
-        #Case 2
-        elif self.demand[t] > sum_totalSupply:
-            """
-            Since the Inelastic demand is higher than the sum of all supply offers
-            all the supply offers are confirmed
-            
-            the marginal unit is assumed to be the last supply bid confirmed
-            """
+        """
+        Uniform price market clearing of the collected bids together with the
+        imports, exports and the inelastic demand, performed on an array
+        backed bid book. The clearing cases are documented in clearBidBook.
+        """
+        book = BidBook.fromBids(self.bids,
+                                extraBids = [(-500., self.CBtrades['Import'][t], SUPPLY),
+                                             (2999., self.CBtrades['Export'][t], DEMAND),
+                                             (3000., self.demand[t], INELASTIC_DEMAND)])
+        
+        clearing = clearBidBook(book, self.demand[t])
+        
+        # Write the clearing back to the bids of the agents
+        for row in np.nonzero(book.status[:len(self.bids)] != SENT)[0]:
+            self.bids[row].status = int(book.status[row])
+            self.bids[row].confirmedAmount = book.confirmedAmount[row]
             
-            for b in bidsReceived["Supply"]:
-                confirmedBids.append(b)
-                b.confirm()
-                
-            bidsReceived["Demand"][-1].partialConfirm(sum_totalSupply)
-            partiallyConfirmedBids.append(bidsReceived["Demand"].pop())
-            rejectedBids = list(set(bidsReceived["Supply"] + bidsReceived["Demand"]) - set(confirmedBids))
-            marketClearingPrice = sorted(confirmedBids,key=operator.attrgetter('price'))[-1].price
+        if clearing.lastAcceptedSupplyPrice is not None:
+            self.world.IEDPrice[t] = clearing.lastAcceptedSupplyPrice
             
-            result = MarketResults("{}".format(self.name),
-                                   issuer = self.name,
-                                   confirmedBids = confirmedBids,
-                                   rejectedBids = rejectedBids,
-                                   partiallyConfirmedBids = partiallyConfirmedBids,
-                                   marketClearingPrice = marketClearingPrice,
-                                   marginalUnit = "None",
-                                   status = "Case2",
-                                   energyDeficit = self.demand[t] - sum_totalSupply,
-                                   energySurplus = 0,
-                                   timestamp = t)
-        
-        #Case 3
+        if clearing.marginalRow < 0:
+            marginalUnit = "None"
+        elif book.issuer[clearing.marginalRow] >= 0:
+            marginalUnit = self.bids[book.issuer[clearing.marginalRow]].ID
         else:
-            confirmedBidsDemand = []
-            confirmedBidsDemand.append(bidsReceived["Demand"].pop())
-            confQty_demand = confirmedBidsDemand[-1].amount
-            confirmedBidsDemand[-1].confirm()
-                        
-            confirmedBidsSupply = []
-            confQty_supply = 0
-            currBidPrice_demand = 3000.00
-            currBidPrice_supply = -3000.00
-    
-            while True:
-                # =============================================================================
-                # Cases to accept bids
-                # Case 3.1: Demand is larger than confirmed supply, and the current demand price is
-                #         higher than the current supply price, which signals willingness to buy
-                # Case 3.2: Confirmed demand is less or equal to confirmed supply but the current 
-                #         demand price is higher than current supply price, which means there is till 
-                #         willingness to buy and energy supply is still available, so an extra demand
-                #         offer is accepted
-                # Case 3.3: The intersection of the demand-supply curve has been exceeded (Confirmed Supply 
-                #         price is higher than demand)
-                # Case 3.4: The intersection of the demand-supply curve found, and the price of bother offers
-                #         is equal
-                
-                
-                # =============================================================================
-                # Case 3.1
-                # =============================================================================
-                if confQty_demand > confQty_supply and currBidPrice_demand > currBidPrice_supply:
-                    try:
-                        '''
-                        Tries accepting last supply offer since they are reverse sorted
-                        excepts that there are no extra supply offers, then the last demand offer
-                        is changed into a partially confirmed offer
-                        '''
-                        
-                        confirmedBidsSupply.append(bidsReceived["Supply"].pop())
-                        confQty_supply += confirmedBidsSupply[-1].amount
-                        currBidPrice_supply = confirmedBidsSupply[-1].price
-                        confirmedBidsSupply[-1].confirm()
-    
-                    except IndexError:
-                        confirmedBidsDemand[-1].partialConfirm(confirmedBidsDemand[-1].amount-(confQty_demand - confQty_supply))
-                        case = 'Case3.1'
-                        break
-                    
-                # =============================================================================
-                # Case 3.2
-                # =============================================================================
-                elif confQty_demand <= confQty_supply and currBidPrice_demand > currBidPrice_supply:
-                    try:
-                        '''
-                        Tries accepting last demand offer since they are reverse sorted
-                        excepts that there are no extra demand offers, then the last supply offer
-                        is changed into a partially confirmed offer
-                        '''
-                        
-                        confirmedBidsDemand.append(bidsReceived["Demand"].pop())
-                        confQty_demand += confirmedBidsDemand[-1].amount
-                        currBidPrice_demand = confirmedBidsDemand[-1].price
-                        confirmedBidsDemand[-1].confirm()
-                        self.world.IEDPrice[t] = currBidPrice_supply
-                        
-                    except IndexError:
-                        confirmedBidsSupply[-1].partialConfirm(confirmedBidsSupply[-1].amount-(confQty_supply - confQty_demand))
-                        case = 'Case3.2'
-                        break
-    
-                # =============================================================================
-                # Case 3.3    
-                # =============================================================================
-                elif currBidPrice_demand < currBidPrice_supply:
-                    
-                    # Checks whether the confirmed demand is greater than confirmed supply
-                    if (confQty_supply - confirmedBidsSupply[-1].amount) < (confQty_demand - confirmedBidsDemand[-1].amount):
-                        confQty_demand -= confirmedBidsDemand[-1].amount
-                        confirmedBidsSupply[-1].partialConfirm(confirmedBidsSupply[-1].amount - (confQty_supply - confQty_demand))
-                        bidsReceived["Demand"].append(confirmedBidsDemand.pop())
-                        bidsReceived["Demand"][-1].reject()
-                        case = 'Case3.3'
-                        break
-    
-                    # Checks whether the confirmed supply is greater than confirmed demand
-                    elif (confQty_supply - abs(confirmedBidsSupply[-1].amount)) > (confQty_demand - confirmedBidsDemand[-1].amount):
-                        confQty_supply -= confirmedBidsSupply[-1].amount
-                        confirmedBidsDemand[-1].partialConfirm(confirmedBidsDemand[-1].amount - (confQty_demand - confQty_supply))
-                        bidsReceived["Supply"].append(confirmedBidsSupply.pop())
-                        bidsReceived["Supply"][-1].reject()
-                        case = 'Case3.3'
-                        break
-    
-                    # The confirmed supply matches confirmed demand
-                    else:
-                        case = 'Case3.3'
-                        break
-    
-                # =============================================================================
-                # Case 3.4
-                # =============================================================================
-                elif currBidPrice_demand == currBidPrice_supply:
-    
-                    # Confirmed supply is greater than confirmed demand
-                    if confQty_supply > confQty_demand:
-                        confirmedBidsSupply[-1].partialConfirm(confirmedBidsSupply[-1].amount - (confQty_supply - confQty_demand))
-                        case = 'Case3.4'
-                        break
-    
-                    # Confirmed demand is greater than confirmed supply
-                    elif confQty_demand > confQty_supply:
-                        confirmedBidsDemand[-1].partialConfirm(confirmedBidsDemand[-1].amount - (confQty_demand - confQty_supply))
-                        confirmedBidsDemand[-1][1] -= (confQty_demand - confQty_supply)
-                        case = 'Case3.4'
-                        break
-    
-                    # Confirmed supply and confirmed demand are equal
-                    else:
-                        case = 'Case3.4'
-                        break
-    
-                # Confirmed supply and confirmed demand are equal
-                else:
-                    case = 'Case3.4'
-                    break
-            
+            marginalUnit = ["Bu{}t{}_import".format(self.name, t),
+                            "Bu{}t{}_export".format(self.name, t),
+                            "IEDt{}".format(t)][clearing.marginalRow - len(self.bids)]
             
-            confirmedBids = confirmedBidsDemand + confirmedBidsSupply
-            rejectedBids = list(set(bidsReceived["Supply"] + bidsReceived["Demand"]) - set(confirmedBids))
-            marketClearingPrice = sorted(confirmedBidsSupply, key = operator.attrgetter('price'))[-1].price
-            marginalUnit = sorted(confirmedBidsSupply,key=operator.attrgetter('price'))[-1].ID
-
-            result = MarketResults("{}".format(self.name),
-                       issuer = self.name,
-                       confirmedBids = confirmedBids,
-                       rejectedBids = rejectedBids,
-                       partiallyConfirmedBids = partiallyConfirmedBids,
-                       marketClearingPrice = marketClearingPrice,
-                       marginalUnit = marginalUnit,
-                       status = case,
-                       energyDeficit = 0,
-                       energySurplus = 0,
-                       timestamp = t)
+        result = MarketResults("{}".format(self.name),
+                               issuer = self.name,
+                               confirmedBids = [self.bids[i] for i in book.issuer[clearing.confirmedRows] if i >= 0],
+                               rejectedBids = [self.bids[i] for i in book.issuer[clearing.rejectedRows] if i >= 0],
+                               partiallyConfirmedBids = [self.bids[i] for i in book.issuer[clearing.partiallyConfirmedRows] if i >= 0],
+                               marketClearingPrice = clearing.marketClearingPrice,
+                               marginalUnit = marginalUnit,
+                               status = clearing.case,
+                               energyDeficit = clearing.energyDeficit,
+                               energySurplus = 0,
+                               timestamp = t)
 
         self.world.dictPFC[t] = result.marketClearingPrice
 
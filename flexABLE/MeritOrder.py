@@ -5,6 +5,7 @@ Created on Tue Jun  2 09:09:16 2020
 
 @author: intgridnb-02
 """
+import numpy as np
 
 class MeritOrder():
     def __init__(self, demand, powerplantsList, vrepowerplantFeedIn, fuelPrices, emissionFactors, snapshots):
@@ -63,10 +64,88 @@ class MeritOrder():
         return mcp
     
     
-    def PFC(self):
+    def iterativePFC(self):
+        """
+        Reference implementation of the price forward curve, clearing the
+        merit order snapshot by snapshot using pandas. It is kept to validate
+        the vectorized PFC() and for debugging single snapshots.
+        """
         pfc = []
         
         for t in range(len(self.snapshots)):
             pfc.append(self.meritOrder(self.demand[t], sum(self.renewableSupply.iloc[t]), t))
             
         return pfc
+    
+    
+    # =============================================================================
+    # Vectorized merit order
+    # =============================================================================
+    def marginalCostMatrix(self):
+        """
+        Builds the (T x N) marginal cost matrix of all power plants for all
+        snapshots in one shot. The operations are ordered exactly as in
+        marginalCost() so both give bitwise identical costs.
+        """
+        T = len(self.snapshots)
+        
+        fuels = list(self.powerplants['fuel'])
+        efficiency = self.powerplants['efficiency'].to_numpy(dtype = float)
+        variableCosts = self.powerplants['variableCosts'].to_numpy(dtype = float)
+        emissionFactor = np.array([self.emissionFactors[fuel] for fuel in fuels], dtype = float)
+        
+        fuelPrice = np.empty((T, len(fuels)))
+        for fuel in set(fuels):
+            fuelPrice[:, [i for i, f in enumerate(fuels) if f == fuel]] = np.asarray(self.fuelPrices[fuel], dtype = float)[:T, None]
+            
+        co2price = np.asarray(self.co2price, dtype = float)[:T, None]
+        
+        return (fuelPrice / efficiency) + (co2price * (emissionFactor / efficiency)) + variableCosts
+    
+    
+    def PFC(self):
+        """
+        Calculates the price forward curve for all snapshots at once.
+        
+        The marginal costs are calculated as a (T x N) matrix, every snapshot is
+        sorted with argsort, the contracted supply is accumulated with cumsum and
+        the marginal unit is found with a vectorized search on the cumulative
+        supply. The result is identical to iterativePFC().
+        
+        Note: iterativePFC() sorts the same DataFrame in place for every snapshot
+        with an unstable sort, so the order of units with equal marginal costs
+        depends on the order left by the previous snapshot. The sort order is
+        therefore chained here the same way, otherwise units with equal costs
+        but different capacities could set a different price.
+        """
+        T = len(self.snapshots)
+        
+        marginalCosts = self.marginalCostMatrix()
+        maxPower = self.powerplants['maxPower'].to_numpy(dtype = float)
+        
+        demand = np.asarray(self.demand, dtype = float).reshape(T, -1)[:, 0]
+        
+        # Summed column by column to keep the summation order of sum(row)
+        renewableSupply = np.zeros(T)
+        for column in self.renewableSupply:
+            renewableSupply += self.renewableSupply[column].to_numpy(dtype = float)[:T]
+        
+        order = np.empty(marginalCosts.shape, dtype = np.intp)
+        currentOrder = np.arange(len(maxPower))
+        for t in range(T):
+            currentOrder = currentOrder[marginalCosts[t, currentOrder].argsort(kind = 'quicksort')]
+            order[t] = currentOrder
+            
+        sortedCosts = np.take_along_axis(marginalCosts, order, axis = 1)
+        
+        # Contracted supply before each unit is added, starting with the renewable supply
+        contractedSupply = np.cumsum(np.hstack((renewableSupply[:, None], maxPower[order])), axis = 1)[:, :-1]
+        marginalUnit = (contractedSupply < demand[:, None]).sum(axis = 1)
+        
+        pfc = np.zeros(T)
+        cleared = marginalUnit < len(maxPower)
+        pfc[cleared] = sortedCosts[cleared, marginalUnit[cleared]]
+        pfc[renewableSupply >= demand] = -500
+        pfc[(maxPower.sum() + renewableSupply) < demand] = 1000
+        
+        return pfc.tolist()
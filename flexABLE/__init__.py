@@ -1,4 +1,4 @@
-from . import agent, auxFunc, bid, CRM, DHM, EOM, MarketResults, MeritOrder, powerplant, resultsWriter, storage, vrepowerplants, electrolyzer, flexABLE
+from . import agent, auxFunc, bid, bidBook, CRM, DHM, EOM, MarketResults, MeritOrder, pfcCache, pfcIndex, inputStore, costTables, powerplant, powerplantFleet, storageFleet, storageLookAhead, timeSeries, profiler, resultsWriter, resultsStore, checkpoint, sweep, solvers, storage, vrepowerplants, electrolyzer, flexABLE
 
 __version__='0.1.2'
 __author__='Thomas Künzel (HS Offenburg, Fichtner), Ramiz Qussous (HS Offenburg, Uni Freiburg), Nick Harder (Uni Freiburg)'
@@ -39,6 +39,14 @@ class Agent():
                                                               **kwargs)
         
         self.world.powerplants.append(self.powerplants[name])
+        
+        
+    def addVREPortfolio(self, name, **kwargs):
+        self.powerplants[name] = vrepowerplants.VREPortfolio(name = name, 
+                                                             world = self.world, 
+                                                             **kwargs)
+        
+        self.world.powerplants.append(self.powerplants[name])
     
     
     def addStorage(self, name, **kwargs):
@@ -13,6 +13,7 @@ Created on Fri Mar  1 5:15:07 2019
 
 from functools import wraps
 import inspect
+import numpy as np
 if not hasattr(inspect, 'getargspec'):
     inspect.getargspec = inspect.getfullargspec
 
@@ -104,3 +105,23 @@ def _assign_args(instance, args, kwargs, function):
   if(kwargs               ): assign_keyword_args         (kwargs=kwargs                                           )
   if(VARIABLE_PARAM       ): assign_variable_args        (parameter=VARIABLE_PARAM,      args=args                )
 
+
+def roundArray(values, ndigits):
+    """
+    Element-wise round(value, ndigits) with the same results as the builtin
+    round. Scaling by 10**ndigits is only inexact close to a tie, those
+    elements (and values too large to scale) are rounded by the builtin.
+    """
+    values = np.asarray(values, dtype = np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    result = np.rint(scaled) / scale
+    
+    with np.errstate(invalid = 'ignore'):
+        distanceToTie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5)
+        exact = (distanceToTie > 4 * np.spacing(scaled) + 1e-9) & (np.abs(scaled) < 2.**52)
+    
+    for i in np.flatnonzero(~exact):
+        result.flat[i] = round(values.item(i), ndigits)
+        
+    return result
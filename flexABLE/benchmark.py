@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the simulation on synthetic scenarios.
+
+Synthetic scenario folders in the format of input/2030 are generated with a
+configurable number of power plants, storages and simulated days. For every
+scale loadScenario, MeritOrder.PFC, World.step and the result writing are timed
+and the timings are saved as JSON in output/benchmarks, together with the
+commit they were measured on. Every run is compared with the previous results
+file, so that regressions show up between versions.
+
+    python -m flexABLE.benchmark
+    python -m flexABLE.benchmark --scales small medium --compare output/benchmarks/benchmark_20210101_120000.json
+
+With --influx the ResultsWriter is timed against a local stand-in of the
+InfluxDB HTTP API, once writing single points and once batched.
+
+@author: intgridnb-02
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, sleep
+
+import numpy as np
+import pandas as pd
+
+from . import MeritOrder
+from .inputStore import InputStore
+from .flexABLE import World
+from .resultsWriter import ResultsWriter
+
+logger = logging.getLogger("flexABLE")
+
+
+# Number of power plants, storages and simulated days per scale, 'medium' is
+# about the size of the 2030 scenario
+scales = {'small': {'powerplants': 50, 'storages': 5, 'days': 1},
+          'medium': {'powerplants': 176, 'storages': 25, 'days': 7},
+          'large': {'powerplants': 500, 'storages': 100, 'days': 14}}
+
+# Share of units and mean parameters per technology, taken from input/2030
+technologies = {'combined cycle gas turbine': {'share': 75, 'fuel': 'natural gas', 'maxPower': 220, 'minRatio': 0.41,
+                                               'efficiency': 0.49, 'rampRatio': 0.5, 'variableCosts': 3.5,
+                                               'startCosts': (24.1, 34.2, 46.7), 'minOperatingTime': 5, 'minDowntime': 3},
+                'hard coal': {'share': 24, 'fuel': 'hard coal', 'maxPower': 395, 'minRatio': 0.41,
+                              'efficiency': 0.42, 'rampRatio': 0.5, 'variableCosts': 1.3,
+                              'startCosts': (38.4, 61.8, 71.4), 'minOperatingTime': 7, 'minDowntime': 6},
+                'lignite': {'share': 12, 'fuel': 'lignite', 'maxPower': 825, 'minRatio': 0.5,
+                            'efficiency': 0.41, 'rampRatio': 0.5, 'variableCosts': 1.65,
+                            'startCosts': (30.4, 47.5, 69.3), 'minOperatingTime': 10, 'minDowntime': 7},
+                'oil': {'share': 25, 'fuel': 'oil', 'maxPower': 110, 'minRatio': 0.26,
+                        'efficiency': 0.32, 'rampRatio': 1., 'variableCosts': 5.5,
+                        'startCosts': (18.9, 31.6, 39.4), 'minOperatingTime': 0, 'minDowntime': 0},
+                'open cycle gas turbine': {'share': 40, 'fuel': 'natural gas', 'maxPower': 130, 'minRatio': 0.26,
+                                           'efficiency': 0.35, 'rampRatio': 1., 'variableCosts': 5.5,
+                                           'startCosts': (14.8, 18.1, 23.5), 'minOperatingTime': 0, 'minDowntime': 0}}
+
+fuelPrices = {'uranium': 0.9, 'lignite': 1.8, 'hard coal': 11.88, 'natural gas': 33.84, 'oil': 60., 'biomass': 20.7, 'co2': 87}
+emissionFactors = {'uranium': 0, 'lignite': 0.406, 'hard coal': 0.335, 'natural gas': 0.201, 'oil': 0.776, 'biomass': 0}
+
+provinces = ['SH', 'HH', 'NI', 'HB', 'NW', 'HE', 'RP', 'BW', 'BY', 'SL', 'BE', 'BB', 'MV', 'SN', 'ST', 'TH']
+
+# Installed renewable capacity relative to the conventional capacity
+renewables = {'Wind Onshore [MW]': 1.4, 'Wind Offshore [MW]': 0.45, 'Solar [MW]': 1.6, 'Water [MW]': 0.05, 'Biomass [MW]': 0.11}
+
+
+def generateScenario(name, powerplants = 176, storages = 25, days = 7, seed = 0, directory = 'input'):
+    """
+    Writes a synthetic scenario with the given number of conventional power
+    plants and storages and 96 * days snapshots into directory/name. The
+    demand is scaled to the generated capacities, so that the residual demand
+    runs through most of the merit order.
+    """
+    rng = np.random.default_rng(seed)
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    snapshots = 96 * days
+    hours = np.arange(snapshots) / 4.
+
+    # =========================================================================
+    # Power plants and storages
+    # =========================================================================
+    names = list(technologies)
+    shares = np.array([technologies[technology]['share'] for technology in names], dtype = np.float64)
+    companies = ['Company {}'.format(i) for i in range(max(1, powerplants // 3))]
+
+    rows = []
+    for i, technology in enumerate(rng.choice(names, size = powerplants, p = shares / shares.sum())):
+        data = technologies[technology]
+        maxPower = round(data['maxPower'] * rng.uniform(0.5, 1.5))
+        heatExtraction = technology != 'oil' and rng.random() < 0.6
+
+        rows.append({'name': 'FPP_{:04d}'.format(i),
+                     'technology': technology,
+                     'fuel': data['fuel'],
+                     'maxPower': maxPower,
+                     'minPower': round(maxPower * data['minRatio']),
+                     'efficiency': round(data['efficiency'] + rng.uniform(-0.03, 0.03), 3),
+                     'rampUp': round(maxPower * data['rampRatio']),
+                     'rampDown': round(maxPower * data['rampRatio']),
+                     'variableCosts': data['variableCosts'],
+                     'hotStartCosts': data['startCosts'][0],
+                     'warmStartCosts': data['startCosts'][1],
+                     'coldStartCosts': data['startCosts'][2],
+                     'minOperatingTime': data['minOperatingTime'],
+                     'minDowntime': data['minDowntime'],
+                     'heatExtraction': 'yes' if heatExtraction else 'no',
+                     'maxExtraction': round(0.3 * maxPower) if heatExtraction else 0,
+                     'company': companies[i % len(companies)],
+                     'heatingDistrict': provinces[rng.integers(len(provinces))],
+                     'year': int(rng.integers(1970, 2021))})
+
+    powerplantsList = pd.DataFrame(rows).set_index('name')
+    powerplantsList.to_csv(os.path.join(path, 'FPP_DE.csv'))
+
+    rows = []
+    for i in range(storages):
+        maxPower = round(rng.uniform(20, 1000))
+        rows.append({'name': 'STO_{:03d}'.format(i),
+                     'technology': 'PSPP',
+                     'maxPower_charge': maxPower,
+                     'maxPower_discharge': round(maxPower * rng.uniform(0.9, 1.3)),
+                     'efficiency_charge': round(rng.uniform(0.73, 0.88), 2),
+                     'efficiency_discharge': round(rng.uniform(0.82, 0.92), 2),
+                     'minSOC': 0,
+                     'maxSOC': round(maxPower * rng.uniform(4, 8)),
+                     'variableCosts_charge': 0.28,
+                     'variableCosts_discharge': 0.28,
+                     'natural_inflow': 0,
+                     'company': companies[i % len(companies)],
+                     'node': 0})
+
+    columns = ['name', 'technology', 'maxPower_charge', 'maxPower_discharge', 'efficiency_charge', 'efficiency_discharge',
+               'minSOC', 'maxSOC', 'variableCosts_charge', 'variableCosts_discharge', 'natural_inflow', 'company', 'node']
+    pd.DataFrame(rows, columns = columns).set_index('name').to_csv(os.path.join(path, 'STO_DE.csv'))
+
+    # =========================================================================
+    # Time series
+    # =========================================================================
+    capacity = float(powerplantsList.maxPower.sum())
+    daily = 0.5 - 0.5 * np.cos(2 * np.pi * (hours - 4) / 24)
+    weekly = np.where((hours // 24) % 7 < 5, 1., 0.85)
+
+    wind = np.clip(0.35 + np.cumsum(rng.normal(0, 0.02, snapshots)), 0.02, 0.95)
+    solar = np.clip(np.sin(np.pi * (hours % 24 - 6) / 12), 0, None) * rng.uniform(0.4, 0.9, days).repeat(96)
+    profiles = {'Wind Onshore [MW]': wind,
+                'Wind Offshore [MW]': np.clip(wind + rng.normal(0, 0.05, snapshots), 0.02, 0.95),
+                'Solar [MW]': solar,
+                'Water [MW]': np.full(snapshots, 0.7),
+                'Biomass [MW]': np.full(snapshots, 0.9)}
+
+    feedIn = pd.DataFrame({column: np.round(profiles[column] * share * capacity, 2) for column, share in renewables.items()})
+    feedIn.to_csv(os.path.join(path, 'FES_DE.csv'))
+
+    residualDemand = capacity * (0.3 + 0.6 * daily * weekly + rng.normal(0, 0.02, snapshots))
+    demand = pd.DataFrame({'demand': np.round(residualDemand + feedIn.sum(axis = 1).values).astype(np.int64)})
+    demand.to_csv(os.path.join(path, 'IED_DE.csv'))
+    demand.to_csv(os.path.join(path, 'IED_DE_for_PFC.csv'))
+
+    pd.DataFrame({'Import': np.round(capacity * rng.uniform(0, 0.08, snapshots)),
+                  'Export': np.round(capacity * rng.uniform(0.05, 0.2, snapshots))},
+                 index = pd.date_range('2030-01-01', periods = snapshots, freq = '15T')).to_csv(os.path.join(path, 'CBT_DE.csv'))
+
+    pd.DataFrame({'positive Demand [MW]': np.full(snapshots, round(0.06 * capacity)),
+                  'negative Demand [MW]': np.full(snapshots, round(0.05 * capacity)),
+                  'positive Call-Off [MW]': np.round(rng.exponential(0.003 * capacity, snapshots)),
+                  'negative Call-Off [MW]': np.round(rng.exponential(0.003 * capacity, snapshots))}).to_csv(os.path.join(path, 'CRM_DE.csv'))
+
+    fuel = pd.DataFrame({fuel: np.full(snapshots, price) for fuel, price in fuelPrices.items()})
+    fuel.index.name = 'tick'
+    fuel.to_csv(os.path.join(path, 'Fuel.csv'))
+
+    emissions = pd.DataFrame({'emissions': emissionFactors})
+    emissions.index.name = 'fuel'
+    emissions.to_csv(os.path.join(path, 'EmissionFactors.csv'))
+
+    # Heat load profiles around 0.2 with an annual demand of the extraction
+    # capacity of each province, i.e. a heat demand of about 80 % of the capacity
+    heatProfile = 0.2 - 0.05 * daily
+    heatLoadProfile = pd.DataFrame({province: np.round(heatProfile * rng.uniform(0.9, 1.1), 4) for province in provinces})
+    heatLoadProfile.index.name = 'tick'
+    heatLoadProfile.to_csv(os.path.join(path, 'HLP_DH_DE.csv'))
+
+    extraction = powerplantsList.groupby('heatingDistrict').maxExtraction.sum()
+    annualDemand = pd.DataFrame({'Demand': [int(extraction.get(province, 0)) for province in provinces]},
+                                index = pd.Index(provinces, name = 'province'))
+    annualDemand.to_csv(os.path.join(path, 'DH_DE.csv'))
+
+    return path
+
+
+def timeCall(function, *args, **kwargs):
+    start = perf_counter()
+    result = function(*args, **kwargs)
+
+    return result, perf_counter() - start
+
+
+def runScale(scale, powerplants, storages, days, seed = 0, repeat = 3):
+    """
+    Generates the scenario of one scale, simulates it and returns the timings
+    in seconds. MeritOrder.PFC is repeated and the fastest run is reported,
+    loadScenario includes one calculation of the PFC.
+    """
+    scenario = 'benchmark_{}'.format(scale)
+    snapshots = 96 * days
+    timings = {}
+
+    _, timings['generateScenario'] = timeCall(generateScenario, scenario, powerplants, storages, days, seed)
+    _, timings['InputStore.convertScenario'] = timeCall(InputStore(scenario).convertScenario)
+
+    world = World(snapshots, simulationID = scenario, startingDate = '2030-01-01T00:00:00')
+    _, timings['World.loadScenario'] = timeCall(world.loadScenario,
+                                                scenario = scenario,
+                                                importStorages = True,
+                                                importCRM = True,
+                                                importDHM = True,
+                                                importCBT = True,
+                                                cachePFC = False)
+
+    powerplantsList = pd.read_csv('input/{}/FPP_DE.csv'.format(scenario), index_col = 0, encoding = "Latin-1")
+    meritOrder = MeritOrder.MeritOrder(world.readTimeseries('IED_DE_for_PFC.csv', index_col = 0),
+                                       powerplantsList,
+                                       world.readTimeseries('FES_DE.csv', index_col = 0, encoding = "Latin-1"),
+                                       world.fuelPrices,
+                                       world.emissionFactors,
+                                       world.snapshots)
+    timings['MeritOrder.PFC'] = min(timeCall(meritOrder.PFC)[1] for _ in range(repeat))
+
+    stepTimes = np.empty(snapshots)
+    for i in range(snapshots):
+        _, stepTimes[i] = timeCall(world.step)
+
+    timings['World.step'] = float(stepTimes.sum())
+    timings['World.step mean'] = float(stepTimes.mean())
+    timings['World.step max'] = float(stepTimes.max())
+
+    _, timings['World.writeResults'] = timeCall(world.writeResults)
+
+    return {'parameters': {'powerplants': powerplants, 'storages': storages, 'days': days, 'snapshots': snapshots, 'seed': seed},
+            'timings': timings}
+
+
+class InfluxStandIn(ThreadingHTTPServer):
+    """
+    Local stand-in for the InfluxDB HTTP API on a free port. It answers /query
+    and /write, counts the received lines and can add a fixed latency per
+    request to mimic a remote database.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency = 0.):
+        self.latency = latency
+        self.lines = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), InfluxStandInHandler)
+
+        self.thread = threading.Thread(target = self.serve_forever, daemon = True)
+        self.thread.start()
+
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class InfluxStandInHandler(BaseHTTPRequestHandler):
+
+    # keep-alive, like the InfluxDB server
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if self.server.latency:
+            sleep(self.server.latency)
+
+        with self.server.lock:
+            self.server.requests += 1
+            if self.path.startswith('/write'):
+                self.server.lines += len(body.splitlines())
+
+        if self.path.startswith('/write'):
+            self.send_response(204)
+            self.end_headers()
+        else:
+            response = b'{"results": [{"statement_id": 0}]}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+
+    def log_message(self, *args):
+        pass
+
+
+def runInflux(points = 2000, batchSize = 5000, latency = 0.001):
+    """
+    Times writing the same bid points once point by point through the
+    influxdb client and once through the batched LineProtocolWriter.
+    """
+    timeStamps = pd.date_range('2030-01-01', periods = points, freq = '15T')
+    body = [[{'measurement': 'Bid',
+              'tags': {'user': 'FPP_{:04d}'.format(i % 100), 'simulationID': 'benchmark'},
+              'time': '{}'.format(timeStamp),
+              'fields': {'Amount': float(i), 'Price': 0.5 * i}}] for i, timeStamp in enumerate(timeStamps)]
+    timings = {}
+
+    for name, size in (('ResultsWriter single points', None), ('ResultsWriter batched', batchSize)):
+        server = InfluxStandIn(latency)
+        writer = ResultsWriter('benchmark', 'benchmark', port = server.port, batchSize = size)
+
+        start = perf_counter()
+        for point in body:
+            writer.writePoints(point)
+        writer.close()
+        timings[name] = perf_counter() - start
+
+        server.close()
+        if server.lines != points:
+            raise RuntimeError('InfluxDB stand-in received {} of {} points'.format(server.lines, points))
+
+    return {'parameters': {'points': points, 'batchSize': batchSize, 'latency': latency},
+            'timings': timings}
+
+
+def currentCommit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output = True,
+                              text = True,
+                              cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def runBenchmark(scaleNames = None, seed = 0, repeat = 3, influx = False):
+    from . import __version__
+
+    scaleNames = scaleNames or list(scales)
+    results = {'version': __version__,
+               'commit': currentCommit(),
+               'created': datetime.now().isoformat(timespec = 'seconds'),
+               'python': platform.python_version(),
+               'numpy': np.__version__,
+               'pandas': pd.__version__,
+               'machine': platform.platform(),
+               'scales': {}}
+
+    for scale in scaleNames:
+        logger.warning('Benchmark scale {}: {}'.format(scale, scales[scale]))
+        results['scales'][scale] = runScale(scale, seed = seed, repeat = repeat, **scales[scale])
+
+    if influx:
+        logger.warning('Benchmark InfluxDB results writer')
+        results['scales']['influx'] = runInflux()
+
+    return results
+
+
+def saveResults(results, directory = 'output/benchmarks'):
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    path = os.path.join(directory, 'benchmark_{}.json'.format(datetime.now().strftime('%Y%m%d_%H%M%S')))
+    with open(path, 'w') as f:
+        json.dump(results, f, indent = 2)
+
+    return path
+
+
+def latestResults(directory = 'output/benchmarks'):
+    paths = sorted(glob.glob(os.path.join(directory, 'benchmark_*.json')))
+
+    return paths[-1] if paths else None
+
+
+def compareResults(baseline, results, tolerance = 0.1, minimumDifference = 0.01):
+    """
+    Compares the timings of two benchmark results scale by scale. Returns a
+    list of (scale, section, baseline, current, ratio, regression) tuples,
+    a section regressed if it got slower by more than the tolerance and by
+    more than minimumDifference seconds, which keeps timer noise of very short
+    sections out. Scales run with different parameters are not compared.
+    """
+    comparison = []
+
+    for scale, current in results['scales'].items():
+        previous = baseline['scales'].get(scale)
+
+        if previous is None or previous['parameters'] != current['parameters']:
+            continue
+
+        for section, seconds in current['timings'].items():
+            if section not in previous['timings'] or section == 'generateScenario':
+                continue
+
+            before = previous['timings'][section]
+            ratio = seconds / before if before else float('inf')
+            comparison.append((scale, section, before, seconds, ratio, ratio > 1 + tolerance and seconds - before > minimumDifference))
+
+    return comparison
+
+
+def summary(results, comparison = None):
+    lines = ['{:<10}{:<30}{:>12}{:>12}{:>9}'.format('scale', 'section', 'time [s]', 'before [s]', 'ratio')]
+    previous = {(scale, section): (before, ratio, regression) for scale, section, before, _, ratio, regression in comparison or []}
+
+    for scale, result in results['scales'].items():
+        for section, seconds in result['timings'].items():
+            before, ratio, regression = previous.get((scale, section), (None, None, False))
+            lines.append('{:<10}{:<30}{:>12.4f}{:>12}{:>9}{}'.format(scale,
+                                                                    section,
+                                                                    seconds,
+                                                                    '' if before is None else '{:.4f}'.format(before),
+                                                                    '' if ratio is None else '{:.2f}'.format(ratio),
+                                                                    '  REGRESSION' if regression else ''))
+
+    return '\n'.join(lines)
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = 'Times flexABLE on synthetic scenarios.')
+    parser.add_argument('--scales', nargs = '+', choices = list(scales), default = list(scales))
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--repeat', type = int, default = 3, help = 'repetitions of MeritOrder.PFC')
+    parser.add_argument('--compare', help = 'results file to compare with, defaults to the latest in output/benchmarks')
+    parser.add_argument('--tolerance', type = float, default = 0.1, help = 'relative slowdown reported as regression')
+    parser.add_argument('--directory', default = 'output/benchmarks')
+    parser.add_argument('--influx', action = 'store_true', help = 'also time the InfluxDB results writer against a local stand-in')
+    arguments = parser.parse_args(arguments)
+
+    logger.setLevel(logging.WARNING)
+    if not os.path.exists('output'):
+        os.makedirs('output')
+
+    baselinePath = arguments.compare or latestResults(arguments.directory)
+    results = runBenchmark(arguments.scales, arguments.seed, arguments.repeat, arguments.influx)
+    path = saveResults(results, arguments.directory)
+
+    comparison = None
+    if baselinePath is not None:
+        with open(baselinePath) as f:
+            comparison = compareResults(json.load(f), results, arguments.tolerance)
+
+    print(summary(results, comparison))
+    print('Results saved to {}{}'.format(path, '' if baselinePath is None else ', compared with {}'.format(baselinePath)))
+
+    return 1 if comparison and any(regression for *_, regression in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,40 @@ Created on Sun Apr  19 15:59:22 2020
 import logging
 logger = logging.getLogger("flexABLE")
 
+# bid status
+CREATED = -1
+SENT = 0
+CONFIRMED = 1
+PARTIALLY_CONFIRMED = 2
+REJECTED = 3
+statusNames = {CREATED: "Created",
+               SENT: "Sent",
+               CONFIRMED: "Confirmed",
+               PARTIALLY_CONFIRMED: "PartiallyConfirmed",
+               REJECTED: "Rejected"}
+
+# bid kinds, the issuers route the feedback of the markets on them, the names are the suffix of the bid ID
+GENERIC = 0
+MR_EOM = 1
+FLEX_EOM = 2
+SUPPLY_EOM = 3
+DEMAND_EOM = 4
+STEAM = 5
+AUX_FIRING = 6
+CRM_POS = 7
+CRM_NEG = 8
+INELASTIC_DEMAND = 9
+kindNames = {GENERIC: "Generic",
+             MR_EOM: "mrEOM",
+             FLEX_EOM: "flexEOM",
+             SUPPLY_EOM: "supplyEOM",
+             DEMAND_EOM: "demandEOM",
+             STEAM: "steam",
+             AUX_FIRING: "auxFi",
+             CRM_POS: "CRMPosDem",
+             CRM_NEG: "CRMNegDem",
+             INELASTIC_DEMAND: "IED"}
+
 class Bid(object):
     """
     The bid class is intended to represent a bid object that is offered on a DA-Market
@@ -13,10 +47,15 @@ class Bid(object):
     between -500 €/MWh up to 3000 €/MWh. 
     This does not represent a bid block. Multiple objects of the class bid could be used to define
     a block bid, but 
+    
+    Without an explicit ID, the ID is built from the name (default: name of the
+    issuer) and the kind when it is first read, e.g. "PP1_mrEOM".
     """
     
-    def __init__(self,issuer="Not-Issued", ID="Generic", price=0, amount=0, energyPrice=0, status=None, bidType=None, node='DefaultNode'):
-        self.ID = ID
+    def __init__(self,issuer="Not-Issued", ID=None, price=0, amount=0, energyPrice=0, status=None, bidType=None, node='DefaultNode', kind=GENERIC, name=None):
+        self._ID = ID
+        self.name = name
+        self.kind = kind
         self.issuer = issuer
         self.price = price
         self.amount = abs(amount)
@@ -25,7 +64,7 @@ class Bid(object):
         self.node = node
         
         if status == None:
-            self.status = "Created"
+            self.status = CREATED
         else:
             self.status = status
             
@@ -35,6 +74,22 @@ class Bid(object):
             self.bidType = bidType
 
 
+    @property
+    def ID(self):
+        if self._ID is None:
+            if self.kind == GENERIC and self.name is None:
+                self._ID = kindNames[GENERIC]
+            else:
+                self._ID = "{}_{}".format(self.issuer.name if self.name is None else self.name, kindNames[self.kind])
+                
+        return self._ID
+
+
+    @property
+    def statusName(self):
+        return statusNames[self.status]
+
+
     def __repr__(self):
         return self.ID
 
@@ -48,7 +103,7 @@ class Bid(object):
     
     
     def confirm(self):
-        self.status = "Confirmed"
+        self.status = CONFIRMED
         self.confirmedAmount = self.amount
         
         
@@ -67,13 +122,13 @@ class Bid(object):
 
         """
         if confirmedAmount == 0:
-            self.status = "Rejected"
+            self.status = REJECTED
             self.confirmedAmount= 0
         elif confirmedAmount < self.amount:
-            self.status = "PartiallyConfirmed"
+            self.status = PARTIALLY_CONFIRMED
             self.confirmedAmount= confirmedAmount
         elif confirmedAmount == self.amount:
-            self.status = "Confirmed"
+            self.status = CONFIRMED
             self.confirmedAmount = self.amount
         elif confirmedAmount > self.amount and (confirmedAmount - self.amount) > 1:
             logger.warning("For bid {}, the confirmed amount is greater than offered amount."
@@ -83,10 +138,8 @@ class Bid(object):
 
 
     def reject(self):
-        if 'IED' in self.ID:
+        if self.kind == INELASTIC_DEMAND:
             pass
         else:
-            self.status = "Rejected"
+            self.status = REJECTED
             self.confirmedAmount = 0
-            
-        
\ No newline at end of file
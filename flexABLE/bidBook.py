@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Array backed bid book and uniform price clearing.
+
+The bid book stores all bids of one market clearing in parallel numpy arrays
+instead of Bid objects, and clearBidBook() reproduces the uniform price
+clearing of EOM.marketClearing on those arrays: the same cases, the same
+clearing price, marginal unit and confirmed amounts.
+
+@author: intgridnb-02
+"""
+import logging
+
+import numpy as np
+
+from .bid import SENT, CONFIRMED, PARTIALLY_CONFIRMED, REJECTED
+
+logger = logging.getLogger("flexABLE")
+
+# bid types
+SUPPLY = 0
+DEMAND = 1
+INELASTIC_DEMAND = 2
+
+
+
+class BidBook():
+    """
+    Holds price, amount, confirmed amount, type, status and issuer index of
+    every bid in parallel arrays. The issuer index refers to the position of
+    the bid in the list the book was built from, bids added by the market
+    itself (imports, exports, inelastic demand) have the issuer index -1.
+    Bids marked as protected are never rejected, by default the inelastic
+    demand.
+    """
+    
+    def __init__(self, price, amount, bidType, issuer, protected = None):
+        self.price = np.asarray(price, dtype = np.float64)
+        self.amount = np.abs(np.asarray(amount, dtype = np.float64))
+        self.bidType = np.asarray(bidType, dtype = np.int8)
+        self.issuer = np.asarray(issuer, dtype = np.intp)
+        self.protected = self.bidType == INELASTIC_DEMAND if protected is None else np.asarray(protected, dtype = bool)
+        self.confirmedAmount = np.zeros(len(self.price))
+        self.status = np.full(len(self.price), SENT, dtype = np.int8)
+        
+        
+    @classmethod
+    def fromBids(cls, bids, extraBids = ()):
+        """
+        Builds a book from a list of Bid objects followed by market bids given
+        as (price, amount, bidType) tuples.
+        """
+        types = {"Supply": SUPPLY, "Demand": DEMAND, "InelasticDemand": INELASTIC_DEMAND}
+        
+        price = [b.price for b in bids] + [b[0] for b in extraBids]
+        amount = [b.amount for b in bids] + [b[1] for b in extraBids]
+        bidType = [types[b.bidType] for b in bids] + [b[2] for b in extraBids]
+        issuer = list(range(len(bids))) + [-1] * len(extraBids)
+        
+        return cls(price, amount, bidType, issuer)
+    
+    
+    def __len__(self):
+        return len(self.price)
+    
+    
+    def confirm(self, rows):
+        self.status[rows] = CONFIRMED
+        self.confirmedAmount[rows] = self.amount[rows]
+        
+        
+    def partialConfirm(self, row, confirmedAmount = 0):
+        """
+        Same rules as Bid.partialConfirm for a single row.
+        """
+        if confirmedAmount == 0:
+            self.status[row] = REJECTED
+            self.confirmedAmount[row] = 0
+        elif confirmedAmount < self.amount[row]:
+            self.status[row] = PARTIALLY_CONFIRMED
+            self.confirmedAmount[row] = confirmedAmount
+        elif confirmedAmount == self.amount[row]:
+            self.status[row] = CONFIRMED
+            self.confirmedAmount[row] = self.amount[row]
+        elif confirmedAmount > self.amount[row] and (confirmedAmount - self.amount[row]) > 1:
+            logger.warning("For bid row {}, the confirmed amount is greater than offered amount."
+                           " Confirmed amount reduced to offered amount."
+                           " This could eventually cause imbalance problem. Amount: {}".format(row, confirmedAmount - self.amount[row]))
+            self.confirmedAmount[row] = self.amount[row]
+            
+            
+    def reject(self, row):
+        if not self.protected[row]:
+            self.status[row] = REJECTED
+            self.confirmedAmount[row] = 0
+            
+            
+class ClearingResult():
+    def __init__(self, case, marketClearingPrice, marginalRow = -1, confirmedRows = None, partiallyConfirmedRows = None,
+                 rejectedRows = None, energyDeficit = 0, lastAcceptedSupplyPrice = None):
+        noRows = np.empty(0, dtype = np.intp)
+        
+        self.case = case
+        self.marketClearingPrice = marketClearingPrice
+        self.marginalRow = marginalRow
+        self.confirmedRows = noRows if confirmedRows is None else confirmedRows
+        self.partiallyConfirmedRows = noRows if partiallyConfirmedRows is None else partiallyConfirmedRows
+        self.rejectedRows = noRows if rejectedRows is None else rejectedRows
+        self.energyDeficit = energyDeficit
+        # supply price at the time the last additional demand bid was accepted, None if there was none
+        self.lastAcceptedSupplyPrice = lastAcceptedSupplyPrice
+        
+        
+def clearBidBook(book, inelasticDemand, noClearingPrice = 3000.2):
+    """
+    Uniform price clearing of a bid book, following EOM.marketClearing.
+    
+    Case 1: The sum of either supply or demand is 0
+    Case 2: Inelastic demand is higher than sum of all supply bids
+    Case 3: Supply and demand bids are accepted alternately by cumulative
+            quantity, cheapest supply and most expensive demand first, until
+            the demand price is no longer higher than the supply price or one
+            side runs out of bids.
+    
+    Instead of accepting bid by bid, the whole acceptance path is calculated
+    at once from the cumulative supply and demand curves. Sums are cumulated
+    in the same order as the bid by bid clearing, so all amounts are bitwise
+    identical.
+    """
+    rows = np.arange(len(book))
+    supply = rows[book.bidType == SUPPLY]
+    demand = rows[book.bidType != SUPPLY]
+    
+    # Bid lists are sorted stable (supply descending, demand ascending) and bids are taken from the end
+    supply = supply[np.argsort(-book.price[supply], kind = 'stable')]
+    demand = demand[np.argsort(book.price[demand], kind = 'stable')]
+    
+    sum_totalSupply = np.cumsum(book.amount[supply])[-1] if len(supply) else 0
+    sum_totalDemand = np.cumsum(book.amount[demand])[-1] if len(demand) else 0
+    
+    # =========================================================================
+    # Case 1
+    # =========================================================================
+    if sum_totalSupply == 0 or sum_totalDemand == 0:
+        logging.debug('The sum of either demand offers ({}) or supply '
+                      'offers ({}) is 0'.format(sum_totalDemand, sum_totalSupply))
+        
+        return ClearingResult("Case1", noClearingPrice,
+                              rejectedRows = np.concatenate((demand, supply)))
+    
+    # =========================================================================
+    # Case 2
+    # =========================================================================
+    if inelasticDemand > sum_totalSupply:
+        book.confirm(supply)
+        book.partialConfirm(demand[-1], sum_totalSupply)
+        
+        return ClearingResult("Case2", book.price[supply].max(),
+                              confirmedRows = supply,
+                              partiallyConfirmedRows = demand[-1:],
+                              rejectedRows = demand[:-1],
+                              energyDeficit = inelasticDemand - sum_totalSupply)
+    
+    # =========================================================================
+    # Case 3
+    # =========================================================================
+    supply = supply[::-1]
+    demand = demand[::-1]
+    m = len(supply)
+    n = len(demand)
+    
+    supplyPrice = book.price[supply]
+    demandPrice = book.price[demand]
+    supplyAmount = book.amount[supply]
+    demandAmount = book.amount[demand]
+    
+    # S[i] is the confirmed supply after i supply bids, D[j - 1] the confirmed demand after j demand bids
+    S = np.concatenate(([0.], np.cumsum(supplyAmount)))
+    D = np.cumsum(demandAmount)
+    
+    # With i supply bids confirmed, demand bids are accepted as long as D <= S,
+    # the next supply bid is accepted at the first j with D[j - 1] > S[i]
+    nextSupplyAt = np.searchsorted(D, S, side = 'right') + 1
+    exhausted = np.nonzero(nextSupplyAt > n)[0]
+    lastI = exhausted[0] if len(exhausted) else m
+    
+    # All states (i, j) on the acceptance path
+    startJ = np.concatenate(([1], nextSupplyAt[:lastI]))
+    endJ = np.minimum(nextSupplyAt[:lastI + 1], n)
+    counts = endJ - startJ + 1
+    stateI = np.repeat(np.arange(lastI + 1), counts)
+    stateJ = np.repeat(startJ - np.cumsum(np.concatenate(([0], counts[:-1]))), counts) + np.arange(counts.sum())
+    
+    currBidPrice_supply = np.where(stateI == 0, -3000.00, supplyPrice[stateI - 1])
+    currBidPrice_demand = np.where(stateJ == 1, 3000.00, demandPrice[stateJ - 1])
+    
+    stop = np.nonzero(~(currBidPrice_demand > currBidPrice_supply))[0]
+    k = stop[0] if len(stop) else len(stateI) - 1
+    i, j = stateI[k], stateJ[k]
+    
+    book.confirm(supply[:i])
+    book.confirm(demand[:j])
+    confQty_supply = S[i]
+    confQty_demand = D[j - 1]
+    
+    lastSupply = supply[i - 1] if i > 0 else None
+    lastDemand = demand[j - 1]
+    supplyRejected = demandRejected = False
+    
+    if len(stop) == 0:
+        if i == m and confQty_demand > confQty_supply:
+            # Case 3.1, no supply bids left
+            book.partialConfirm(lastDemand, book.amount[lastDemand] - (confQty_demand - confQty_supply))
+            case = 'Case3.1'
+        else:
+            # Case 3.2, no demand bids left
+            book.partialConfirm(lastSupply, book.amount[lastSupply] - (confQty_supply - confQty_demand))
+            case = 'Case3.2'
+            
+    elif currBidPrice_demand[k] < currBidPrice_supply[k]:
+        case = 'Case3.3'
+        
+        if (confQty_supply - book.amount[lastSupply]) < (confQty_demand - book.amount[lastDemand]):
+            confQty_demand -= book.amount[lastDemand]
+            book.partialConfirm(lastSupply, book.amount[lastSupply] - (confQty_supply - confQty_demand))
+            book.reject(lastDemand)
+            demandRejected = True
+            
+        elif (confQty_supply - book.amount[lastSupply]) > (confQty_demand - book.amount[lastDemand]):
+            confQty_supply -= book.amount[lastSupply]
+            book.partialConfirm(lastDemand, book.amount[lastDemand] - (confQty_demand - confQty_supply))
+            book.reject(lastSupply)
+            supplyRejected = True
+            
+    elif currBidPrice_demand[k] == currBidPrice_supply[k]:
+        case = 'Case3.4'
+        
+        if confQty_supply > confQty_demand:
+            book.partialConfirm(lastSupply, book.amount[lastSupply] - (confQty_supply - confQty_demand))
+        elif confQty_demand > confQty_supply:
+            book.partialConfirm(lastDemand, book.amount[lastDemand] - (confQty_demand - confQty_supply))
+            
+    else:
+        case = 'Case3.4'
+        
+    confirmedSupply = supply[:i - 1] if supplyRejected else supply[:i]
+    confirmedDemand = demand[:j - 1] if demandRejected else demand[:j]
+    
+    # The last additional demand bid was accepted at the first state with j demand bids
+    lastAcceptedSupplyPrice = None
+    if j > 1:
+        lastAcceptedSupplyPrice = currBidPrice_supply[np.argmax(stateJ == j)]
+        
+    return ClearingResult(case, book.price[confirmedSupply[-1]],
+                          marginalRow = confirmedSupply[-1],
+                          confirmedRows = np.concatenate((confirmedDemand, confirmedSupply)),
+                          rejectedRows = np.concatenate((demand[len(confirmedDemand):], supply[len(confirmedSupply):])),
+                          lastAcceptedSupplyPrice = lastAcceptedSupplyPrice)
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints of the simulation state of a World.
+
+A checkpoint holds everything that changes while a World is stepping: the
+current step, the EOM prices and the PFC, the state of every unit, the
+PowerplantFleet and StorageFleet arrays and the results of the CRM. Everything else is read
+from the scenario, so a checkpoint is restored into a World that loaded the
+same scenario with the same number of snapshots, either to resume a run or
+to fork a new one from the saved step.
+
+Bids and market results refer to their issuing units and markets. These
+references are stored as persistent IDs (unit type and name) and resolved
+against the objects of the restoring World, so a checkpoint never contains
+a copy of the World itself.
+
+@author: intgridnb-02
+"""
+import gzip
+import os
+import pickle
+
+import numpy as np
+
+formatVersion = 6
+
+# State attributes per unit class
+unitState = {'Powerplant': ['dictCapacity', 'dictCapacityMR', 'dictCapacityFlex', 'confQtyCRM_pos', 'confQtyCRM_neg',
+                            'confQtyDHM_steam', 'powerLoss_CHP', 'maxPower', 'currentStatus', 'currentDowntime',
+                            'meanMarketSuccess', 'marketSuccess', 'averageDownTime', 'currentCapacity', 'sentBids'],
+             'VREPowerplant': ['dictCapacity', 'dictCapacityMR', 'dictCapacityFlex', 'sentBids'],
+             'VREPortfolio': ['confirmed', 'sentBids'],
+             'Storage': ['dictSOC', 'dictCapacity', 'dictEnergyCost', 'confQtyCRM_pos', 'confQtyCRM_neg',
+                         'marketSuccess', 'currentCapacity', 'sentBids'],
+             'Electrolyzer': ['dictCapacity', 'sentBids']}
+
+# State of the units of a PowerplantFleet or StorageFleet that lives in the fleet arrays
+fleetState = ['capacity', 'capacityMR', 'capacityFlex', 'confQtyCRM_pos', 'confQtyCRM_neg', 'confQtyDHM_steam',
+              'powerLoss_CHP', 'maxPower', 'currentStatus', 'currentDowntime', 'meanMarketSuccess']
+storageFleetState = ['SOC', 'capacity', 'energyCost', 'confQtyCRM_pos', 'confQtyCRM_neg']
+fleetUnitState = {'dictCapacity', 'dictCapacityMR', 'dictCapacityFlex', 'confQtyCRM_pos', 'confQtyCRM_neg',
+                  'confQtyDHM_steam', 'powerLoss_CHP', 'maxPower', 'currentStatus', 'currentDowntime', 'meanMarketSuccess',
+                  'dictSOC', 'dictEnergyCost'}
+
+
+class PackedSeries():
+    """
+    Per-snapshot dictionary or list with numeric or (capacity, price) values,
+    stored as an array of keys and one of values. Values that are not Python
+    floats, i.e. ints and numpy floats, get a type code, so that unpacking
+    returns exactly the original objects and a restored run rounds and
+    compares like the original one.
+    """
+
+    types = [float, int, np.float64]
+    typeCodes = {float: 0, int: 1, np.float64: 2}
+
+    def __init__(self, series):
+        if type(series) is dict:
+            self.keys = np.fromiter(series.keys(), dtype = np.int64, count = len(series))
+            items = list(series.values())
+        else:
+            self.keys = None
+            items = series
+
+        self.values = np.array(items, dtype = np.float64)
+        self.codes = None
+
+        if self.values.ndim == 2:
+            components = [component for item in items for component in item]
+        else:
+            components = items
+
+        if any(type(component) is not float for component in components):
+            self.codes = np.array([self.typeCodes[type(component)] for component in components], dtype = np.int8).reshape(self.values.shape)
+
+
+    @classmethod
+    def packable(cls, series):
+        if type(series) is dict:
+            if not series or not all(type(key) is int for key in series):
+                return False
+            items = series.values()
+        elif type(series) is list:
+            items = series
+        else:
+            return False
+
+        items = list(items)
+
+        if items and type(items[0]) is tuple:
+            return all(type(item) is tuple and len(item) == 2 and type(item[0]) in cls.typeCodes and type(item[1]) in cls.typeCodes
+                       for item in items)
+
+        return all(type(item) in cls.typeCodes for item in items)
+
+
+    def unpack(self):
+        values = self.values.tolist()
+
+        if self.codes is not None:
+            types = self.types
+
+            if self.values.ndim == 2:
+                values = [[types[code](value) if code else value for value, code in zip(item, codes)]
+                          for item, codes in zip(values, self.codes.tolist())]
+            else:
+                values = [types[code](value) if code else value for value, code in zip(values, self.codes.tolist())]
+
+        if self.values.ndim == 2:
+            values = list(map(tuple, values))
+
+        if self.keys is None:
+            return values
+
+        return dict(zip(self.keys.tolist(), values))
+
+
+def pack(value):
+    return PackedSeries(value) if PackedSeries.packable(value) else value
+
+
+def unpack(value):
+    return value.unpack() if type(value) is PackedSeries else value
+
+
+def worldObjects(world):
+    """
+    Returns the objects of a World that are referenced by persistent ID.
+    """
+    objects = {('world',): world}
+
+    for name, agent in world.agents.items():
+        objects[('agent', name)] = agent
+
+    for unitType, units in (('powerplant', world.powerplants), ('storage', world.storages), ('electrolyzer', world.electrolyzers)):
+        for unit in units:
+            objects[(unitType, unit.name)] = unit
+
+    for name, market in world.markets['EOM'].items():
+        objects[('market', 'EOM', name)] = market
+
+    for name in ('CRM', 'DHM'):
+        if name in world.markets:
+            objects[('market', name)] = world.markets[name]
+
+    if world.powerplantFleet is not None:
+        objects[('fleet',)] = world.powerplantFleet
+
+    if world.storageFleet is not None:
+        objects[('storageFleet',)] = world.storageFleet
+
+    return objects
+
+
+class CheckpointPickler(pickle.Pickler):
+
+    def __init__(self, file, objects):
+        super().__init__(file, protocol = pickle.HIGHEST_PROTOCOL)
+        self.objectIDs = {id(obj): key for key, obj in objects.items()}
+
+
+    def persistent_id(self, obj):
+        return self.objectIDs.get(id(obj))
+
+
+class CheckpointUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, objects):
+        super().__init__(file)
+        self.objects = objects
+
+
+    def persistent_load(self, key):
+        try:
+            return self.objects[key]
+        except KeyError:
+            raise pickle.UnpicklingError('Checkpoint refers to {} which is not part of this World'.format(key))
+
+
+def saveCheckpoint(world, path):
+    """
+    Saves the state of the World after its last finished step into a gzip
+    compressed pickle. The file is replaced atomically, an interrupted
+    checkpoint never destroys the previous one.
+    """
+    objects = worldObjects(world)
+
+    state = {'version': formatVersion,
+             'scenario': world.scenario,
+             'snapshots': len(world.snapshots),
+             'currstep': world.currstep,
+             'usesFleet': world.powerplantFleet is not None,
+             'usesStorageFleet': world.storageFleet is not None,
+             'world': {'dictPFC': pack(world.dictPFC),
+                       'PFC': pack(world.PFC),
+                       'IEDPrice': pack(world.IEDPrice)},
+             'units': {},
+             'fleet': None,
+             'storageFleet': None,
+             'markets': {}}
+
+    for key, unit in objects.items():
+        attributes = unitState.get(type(unit).__name__)
+
+        if attributes is None:
+            continue
+
+        if getattr(unit, 'fleet', None) is not None:
+            attributes = [attribute for attribute in attributes if attribute not in fleetUnitState]
+
+        state['units'][key] = {attribute: pack(getattr(unit, attribute)) for attribute in attributes if hasattr(unit, attribute)}
+
+    if world.powerplantFleet is not None:
+        state['fleet'] = {name: getattr(world.powerplantFleet, name) for name in fleetState}
+
+    if world.storageFleet is not None:
+        state['storageFleet'] = {name: getattr(world.storageFleet, name) for name in storageFleetState}
+
+    if 'CRM' in world.markets:
+        state['markets']['CRM'] = {'marketResults': world.markets['CRM'].marketResults,
+                                   'bids': world.markets['CRM'].bids}
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    temporaryPath = path + '.tmp'
+    with gzip.open(temporaryPath, 'wb', compresslevel = 1) as f:
+        CheckpointPickler(f, objects).dump(state)
+
+    os.replace(temporaryPath, path)
+
+
+def loadCheckpoint(world, path):
+    """
+    Restores a checkpoint into a World that loaded the same scenario, the
+    next step of the World is the first step after the checkpoint.
+    """
+    objects = worldObjects(world)
+
+    with gzip.open(path, 'rb') as f:
+        state = CheckpointUnpickler(f, objects).load()
+
+    if state['version'] != formatVersion:
+        raise ValueError('Checkpoint format {} is not supported'.format(state['version']))
+
+    if state['scenario'] != world.scenario or state['snapshots'] != len(world.snapshots):
+        raise ValueError('Checkpoint of scenario {} with {} snapshots does not match scenario {} with {} snapshots'.format(
+            state['scenario'], state['snapshots'], world.scenario, len(world.snapshots)))
+
+    units = {key for key, unit in objects.items() if type(unit).__name__ in unitState}
+
+    if (state['usesFleet'] != (world.powerplantFleet is not None)
+            or state['usesStorageFleet'] != (world.storageFleet is not None)
+            or set(state['units']) != units):
+        raise ValueError('Checkpoint units do not match the units of the World')
+
+    world.currstep = state['currstep']
+    world.dictPFC = unpack(state['world']['dictPFC'])
+    world.PFC = unpack(state['world']['PFC'])
+    world.IEDPrice = unpack(state['world']['IEDPrice'])
+
+    for key, attributes in state['units'].items():
+        unit = objects[key]
+
+        for attribute, value in attributes.items():
+            setattr(unit, attribute, unpack(value))
+
+    fleet = world.powerplantFleet
+    if fleet is not None:
+        # in place, the units hold views on the fleet arrays
+        for name, values in state['fleet'].items():
+            getattr(fleet, name)[...] = values
+
+        fleet.bidStep = None
+        fleet.bidsEOM = [None] * len(fleet.units)
+        fleet.sentBidsEOM = [None] * len(fleet.units)
+
+    fleet = world.storageFleet
+    if fleet is not None:
+        for name, values in state['storageFleet'].items():
+            getattr(fleet, name)[...] = values
+
+        fleet.bidStep = None
+        fleet.bidsEOM = [None] * len(fleet.units)
+        fleet.sentBidsEOM = [None] * len(fleet.units)
+
+    if 'CRM' in state['markets']:
+        world.markets['CRM'].marketResults = state['markets']['CRM']['marketResults']
+        world.markets['CRM'].bids = state['markets']['CRM']['bids']
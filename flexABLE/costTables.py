@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed marginal cost tables of the conventional power plants.
+
+@author: intgridnb-02
+"""
+import numpy as np
+
+from .auxFunc import roundArray
+
+
+class EtaLossCurve():
+    """
+    Partial load efficiency loss as a 4th order polynomial of the capacity
+    ratio. Works on floats and on numpy arrays with the same formula.
+    """
+
+    def __init__(self, a, b, c, d, e):
+        self.coefficients = (a, b, c, d, e)
+
+
+    def __call__(self, capacityRatio):
+        a, b, c, d, e = self.coefficients
+
+        return a * (capacityRatio ** 4) - b * (capacityRatio ** 3) \
+               + c * (capacityRatio ** 2) - d * capacityRatio + e
+
+
+class CostTables():
+    """
+    Marginal costs of the conventional power plants, one row per unit.
+
+    The base marginal costs (fuel, CO2 and variable costs at nominal
+    efficiency) are precomputed for every unit and snapshot when the scenario
+    is loaded. The partial load efficiency dependent costs only have to apply
+    the efficiency loss curve of the fuel class, units without a curve read
+    the rounded base costs.
+    """
+
+    etaLossCurves = {'lignite': EtaLossCurve(0.095859, 0.356010, 0.532948, 0.447059, 0.174262),
+                     'hard coal': EtaLossCurve(0.095859, 0.356010, 0.532948, 0.447059, 0.174262),
+                     'combined cycle gas turbine': EtaLossCurve(0.178749, 0.653192, 0.964704, 0.805845, 0.315584),
+                     'open cycle gas turbine': EtaLossCurve(0.485049, 1.540723, 1.899607, 1.251502, 0.407569)}
+
+    def __init__(self, world, units):
+        self.world = world
+        self.units = list(units)
+
+        self.fuelPrices = {fuel: np.asarray(prices, dtype = np.float64) for fuel, prices in self.world.fuelPrices.items()}
+
+        self.efficiency = np.array([unit.efficiency for unit in self.units], dtype = np.float64)
+        self.emission = np.array([unit.emission for unit in self.units], dtype = np.float64)
+        self.variableCosts = np.array([unit.variableCosts for unit in self.units], dtype = np.float64)
+        self.curves = [self.etaLossCurves.get(unit.fuel) for unit in self.units]
+
+        # unit fuel price and base marginal costs, (units x snapshots)
+        self.fuelPrice = np.array([self.fuelPrices[unit.fuel] for unit in self.units], dtype = np.float64)
+        self.co2price = self.fuelPrices['co2']
+        self.baseCosts = (self.fuelPrice / self.efficiency[:, None]) \
+                         + (self.co2price[None, :] * (self.emission / self.efficiency)[:, None]) \
+                         + self.variableCosts[:, None]
+
+        self.curveRows = {fuel: np.array([i for i, unit in enumerate(self.units) if unit.fuel == fuel], dtype = np.intp)
+                          for fuel in self.etaLossCurves}
+
+        for i, unit in enumerate(self.units):
+            unit.costIndex = i
+
+
+    def marginalCosts(self, row, t, capacityRatio):
+        """
+        Partial load efficiency dependent marginal costs of one unit, same as
+        Powerplant.marginalCostsFPP with efficiencyDependence.
+        """
+        curve = self.curves[row]
+
+        if curve is None:
+            return round(self.baseCosts.item(row, t), 2)
+
+        etaLoss = curve(capacityRatio)
+        efficiency = self.efficiency.item(row)
+
+        return round((self.fuelPrice.item(row, t) / (efficiency - etaLoss)) \
+                     + (self.co2price.item(t) * (self.emission.item(row) / (efficiency - etaLoss))) \
+                     + self.variableCosts.item(row), 2)
+
+
+    def marginalCostsArray(self, rows, t, capacityRatio):
+        """
+        Vectorized marginalCosts for an array of rows.
+        """
+        costs = roundArray(self.baseCosts[rows, t], 2)
+
+        for fuel, curveRows in self.curveRows.items():
+            selected = np.flatnonzero(np.isin(rows, curveRows))
+
+            if len(selected) == 0:
+                continue
+
+            etaLoss = self.etaLossCurves[fuel](capacityRatio[selected])
+            efficiency = self.efficiency[rows[selected]]
+
+            costs[selected] = roundArray((self.fuelPrice[rows[selected], t] / (efficiency - etaLoss))
+                                         + (self.co2price[t] * (self.emission[rows[selected]] / (efficiency - etaLoss)))
+                                         + self.variableCosts[rows[selected]], 2)
+
+        return costs
@@ -1,12 +1,328 @@
 from .auxFunc import initializer
-from .bid import Bid
+from .bid import Bid, SENT, DEMAND_EOM
+from .timeSeries import TimeSeries
+from . import solvers
 import numpy as np
-import pandas as pd 
+import pandas as pd
 import pyomo.environ as pyomo
-from pyomo.opt import SolverFactory 
 import os
-import pandas as pd
-import datetime
+import heapq
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+# optimization models of this process, built once per electrolyzer and window length
+models = {}
+
+def buildModel(unit, time_periods):
+    """
+    Builds the optimization model of an electrolyzer for windows of
+    time_periods quarter-hours. Prices, demands and the allowed cold startups
+    are mutable parameters, the model is solved again for every window of the
+    same length with updated parameters instead of being rebuilt.
+    """
+    model = pyomo.ConcreteModel('Optimized Electroluzer Bidding')
+    model.i = pyomo.RangeSet(0, time_periods - 1)
+
+    # Window data, updated before every solve
+    model.price = pyomo.Param(model.i, mutable=True, initialize=0.)
+    model.industry_demand = pyomo.Param(model.i, mutable=True, initialize=0.)
+    model.maxAllowedColdStartups = pyomo.Param(mutable=True, initialize=0.)
+
+    # Define the decision variables
+    model.bidQuantity_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals)
+    model.prodH2_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #produced H2
+    model.elecCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer consumption per kg
+    model.elecStandByCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer consumption per kg
+    # model.elecColdStartUpCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer cold startup consumption per kg
+    model.elecColdStartUpCost_EUR = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer consumption per kg
+    model.comprCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #compressor consumption per kg
+    model.elecToStorage_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #H2 from electrolyzer to storage
+    model.elecToPlantUse_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #H2 from electrolyzer to process
+    model.storageToPlantUse_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #H2 from storage to process
+    model.currentSOC_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #Status of Storage
+
+    # Binary variable to represent the status of the electrolyzer (on/off)
+    model.isRunning = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer running')
+    model.isColdStarted = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer  start from idle')
+    model.isIdle = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer is idle')
+    model.isStandBy = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer isStandBy')
+
+    # Define the objective function - minimize cost sum within selected timeframe
+    model.obj = pyomo.Objective(expr=sum(model.price[i] * model.bidQuantity_MW[i] * unit.dt  + unit.coldStartUpCost * model.isColdStarted[i] for i in model.i), sense=pyomo.minimize)
+
+    # Status constraints and constraining max and min bid quantity 
+    #Max power boundary
+    model.maxPower_rule = pyomo.Constraint(model.i, rule=lambda model, i:
+                                            model.elecCons_MW[i] <= unit.maxPower * model.isRunning[i] + unit.standbyCons*model.isStandBy[i] )
+    #min power boundary
+    model.minPower_rule = pyomo.Constraint(model.i, rule=lambda model, i:
+                                            model.elecCons_MW[i] >= unit.minPower * model.isRunning[i]+ unit.standbyCons*model.isStandBy[i])
+    #only one operational mode
+    model.statesExclusivity = pyomo.Constraint(model.i, rule=lambda model, i:
+                                            model.isRunning[i] + model.isIdle[i] + model.isStandBy[i] == 1)
+    #transition from off to on state
+    model.statesExclusivity_2 = pyomo.Constraint(model.i, rule=lambda model, i:
+                                            model.isColdStarted[i] >= model.isRunning[i] - model.isRunning[i-1]- model.isStandBy[i-1] if i > 0 else pyomo.Constraint.Skip)
+    # first coldstartup not counted
+    model.statesExclusivity_3 = pyomo.Constraint(model.i, rule=lambda model, i:
+                                            model.isColdStarted[0] == 0 ) 
+
+    # transition from an off-state to a standby-state is not allowed    
+    model.statesExclusivity_4 = pyomo.Constraint(model.i, rule=lambda model, i:
+                                            model.isIdle[i-1] + model.isStandBy[i] <= 1 if i > 0 else pyomo.Constraint.Skip)     
+    #minimum runtime constraint
+    # def minRuntime_rule(model, i):
+    #     #force the minimum runtime after a start event
+    #     next_time_periods = {i + offset for offset in range(int(unit.minRuntime)) if i + offset < time_periods}
+    #     return sum(model.isRunning[tt] + model.isStandBy[tt] for tt in next_time_periods) >= len(next_time_periods) * model.isColdStarted[i]
+    # model.minRuntime_rule = pyomo.Constraint(model.i, rule=minRuntime_rule)       
+
+    #minimum downtime constraint
+    def minDownTime_rule(model, i):
+        if i == 0:
+            return pyomo.Constraint.Skip
+        previous_time_periods = {i - offset for offset in range(1, int(unit.minDowntime) + 1) if i - offset >=0}
+        return len(previous_time_periods) * model.isColdStarted[i] <= sum(model.isIdle[tt] for tt in previous_time_periods)
+    model.minDownTime_rule = pyomo.Constraint(model.i, rule=minDownTime_rule)     
+
+    #maximum allowed cold startups within defined time period    
+    model.maxColdStartup_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                        sum(model.isColdStarted[i] for i in range(0, time_periods)) <= model.maxAllowedColdStartups) 
+
+    # no production in standby, where the power bounds fix the consumption to standbyCons,
+    # i.e. elecCons*(1-isStandBy) written linearly, so that MILP solvers can solve the model
+    model.electrolyzerConsumption_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                        model.prodH2_kg[i] == (model.elecCons_MW[i] - unit.standbyCons*model.isStandBy[i])*unit.dt*unit.effElec/unit.energyContentH2_LHV )
+
+    model.hydrogenBalance_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                            model.prodH2_kg[i] == model.elecToPlantUse_kg[i] + model.elecToStorage_kg[i])
+
+
+    model.demandBalance_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                            model.industry_demand[i] == model.elecToPlantUse_kg[i] + model.storageToPlantUse_kg[i])   
+
+    # model.elecColdStartUpCost_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+    #                                             model.elecColdStartUpCost_EUR[i] == unit.coldStartUpCost * model.isColdStarted[i])
+
+    # model.elecColdStartUp_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+    #                                             model.elecColdStartUpCons_MW[i] == unit.coldStartUpCons * model.isColdStarted[i])
+
+    model.compressorCons_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                                model.comprCons_MW[i] == model.elecToStorage_kg[i] * unit.comprCons/unit.dt)
+
+    model.standByConsumption_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                                model.elecStandByCons_MW[i] == unit.standbyCons*model.isStandBy[i])
+
+    model.totalConsumption_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                            model.bidQuantity_MW[i] == model.elecCons_MW[i] + model.comprCons_MW[i]) #model.elecColdStartUpCons_MW[i]) 
+
+    # Define Storage constraint
+    model.currentSOC_rule = pyomo.Constraint(model.i, rule=lambda model, i:
+                                        model.currentSOC_kg[i] == model.currentSOC_kg[i - 1] + model.elecToStorage_kg[i] - model.storageToPlantUse_kg[i]
+                                        if i > 0 else model.currentSOC_kg[i] == model.elecToStorage_kg[i]  - model.storageToPlantUse_kg[i])  
+
+    model.maxSOC_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+                                        model.currentSOC_kg[i] <= unit.maxSOC)
+
+    # model.storageFlowRate_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
+    #                                         model.storageToPlantUse_kg[i] <= unit.maxStorageOutput)  
+    return model
+
+def optimizeH2Prod(unit, solverSettings, price, industry_demand, time_periods, maxAllowedColdStartups):
+    """
+    Optimizes the hydrogen production of one electrolyzer for one window of
+    prices and demands. Module level function, so that windows can be solved
+    in worker processes, unit holds the parameters of the electrolyzer.
+    With a warm start the solver starts from the solution of the previous
+    window of the same length, which the reused model still holds. Returns
+    the results and the statistics of the solve. A window for which the
+    solver returned no solution, e.g. infeasible or stopped by the time limit
+    without incumbent, is scheduled with dispatchH2Prod instead, the
+    statistics then name the heuristic as fallback.
+    """
+    key = (tuple(sorted(vars(unit).items())), time_periods)
+    model = models.get(key)
+    if model is None:
+        model = models[key] = buildModel(unit, time_periods)
+
+    model.price.store_values(dict(enumerate(price)))
+    model.industry_demand.store_values(dict(enumerate(industry_demand)))
+    model.maxAllowedColdStartups.set_value(maxAllowedColdStartups)
+
+    # Solve the optimization problem
+    result, statistics = solvers.solve(model, solverSettings)
+    print('INFO: Electrolyzer Agent: Solver status:', result.solver.status)
+    print('INFO: Electrolyzer Agent: Results: ', result.solver.termination_condition)
+
+    # without a solution the reused model would still hold the values of an earlier window
+    if not statistics['loaded']:
+        return fallbackH2Prod(unit, price, industry_demand, time_periods, maxAllowedColdStartups, statistics)
+
+    # Retrieve the optimal values
+    optimalBidamount = [model.bidQuantity_MW[i].value for i in model.i]
+    elecCons = [model.elecCons_MW[i].value for i in model.i]            
+    elecStandByCons = [model.elecStandByCons_MW[i].value for i in model.i]           
+    comprCons = [model.comprCons_MW[i].value for i in model.i]
+    prodH2 = [ model.prodH2_kg[i].value for i in model.i]           
+    elecToPlantUse_kg = [ model.elecToPlantUse_kg[i].value for i in model.i]            
+    elecToStorage_kg = [ model.elecToStorage_kg[i].value for i in model.i]            
+    storageToPlantUse_kg = [ model.storageToPlantUse_kg[i].value for i in model.i]            
+    currentSOC = [model.currentSOC_kg[i].value for i in model.i]                
+    isRunning =   [model.isRunning[i].value for i in model.i]
+    isStandBy = [model.isStandBy[i].value for i in model.i]
+    isIdle = [model.isIdle[i].value for i in model.i]
+    isColdStarted = [model.isColdStarted[i].value for i in model.i]
+    results = (optimalBidamount,elecCons, elecStandByCons, comprCons,  prodH2, elecToPlantUse_kg, elecToStorage_kg, \
+               storageToPlantUse_kg, currentSOC, isRunning, isStandBy, isIdle, isColdStarted)
+
+    if any(None in values for values in results):
+        return fallbackH2Prod(unit, price, industry_demand, time_periods, maxAllowedColdStartups, statistics)
+
+    statistics['fallback'] = None
+    return results, statistics
+
+def fallbackH2Prod(unit, price, industry_demand, time_periods, maxAllowedColdStartups, statistics):
+    """
+    Schedules a window that the solver could not solve with the heuristic
+    dispatch and records it in the statistics of the solve.
+    """
+    print('WARNING: Electrolyzer Agent: No solution for window, termination condition {}, using the heuristic dispatch'.format(statistics['termination']))
+    results, heuristicStatistics = dispatchH2Prod(unit, price, industry_demand, time_periods, maxAllowedColdStartups)
+    statistics['fallback'] = 'heuristic'
+    statistics['fallbackTermination'] = heuristicStatistics['termination']
+    statistics['seconds'] += heuristicStatistics['seconds']
+    return results, statistics
+
+def dispatchH2Prod(unit, price, industry_demand, time_periods, maxAllowedColdStartups):
+    """
+    Heuristic counterpart of optimizeH2Prod, which needs no solver. The
+    demand of every quarter-hour is covered in chronological order by the
+    cheapest production available until then, directly or through the
+    storage as far as maxSOC allows. A quarter-hour that starts producing runs
+    at least at minPower, the surplus is stored and used first later on.
+    Gaps between running quarter-hours are bridged in standby or, within the
+    allowed cold startups, by a cold startup where this is cheaper. Returns
+    the schedule and statistics like optimizeH2Prod.
+    """
+    start = time.perf_counter()
+    eps = 1e-9
+    price = np.asarray(price, dtype=float)
+    demand = np.asarray(industry_demand, dtype=float)
+
+    kgPerMW = unit.dt*unit.effElec/unit.energyContentH2_LHV #H2 per MW of electrolyzer consumption and quarter-hour
+    maxKg = unit.maxPower*kgPerMW
+    minKg = unit.minPower*kgPerMW
+    storedPrice = price*(1 + unit.comprCons*unit.effElec/unit.energyContentH2_LHV) #including the compressor for stored H2
+
+    prodH2 = np.zeros(time_periods)
+    elecToPlantUse_kg = np.zeros(time_periods)
+    elecToStorage_kg = np.zeros(time_periods)
+    storageToPlantUse_kg = np.zeros(time_periods)
+    currentSOC = np.zeros(time_periods)
+    surplus = deque() #[quarter-hour, kg] of stored surplus production
+    candidates = [] #heap of earlier quarter-hours with spare capacity by price of stored H2
+    shortfall = 0.
+
+    # produces up to amount in quarter-hour s for the demand in t, returns the amount
+    def produce(s, t, amount):
+        amount = min(amount, maxKg - prodH2[s])
+        if s < t:
+            amount = min(amount, unit.maxSOC - currentSOC[s:t].max())
+
+        extra = minKg - amount if prodH2[s] == 0 else 0.
+        if amount <= eps or (extra > 0 and unit.maxSOC - max(currentSOC[s:t].max() + amount if s < t else 0., currentSOC[t:].max()) < extra):
+            return 0.
+
+        prodH2[s] += amount
+        if s < t:
+            elecToStorage_kg[s] += amount
+            currentSOC[s:t] += amount
+            storageToPlantUse_kg[t] += amount
+        else:
+            elecToPlantUse_kg[t] += amount
+
+        if extra > 0:
+            prodH2[s] += extra
+            elecToStorage_kg[s] += extra
+            currentSOC[s:] += extra
+            surplus.append([s, extra])
+
+        return amount
+
+    for t in range(time_periods):
+        need = demand[t]
+
+        # stored surplus is already paid for
+        while need > eps and surplus and surplus[0][0] < t:
+            amount = min(need, surplus[0][1])
+            surplus[0][1] -= amount
+            if surplus[0][1] <= eps:
+                surplus.popleft()
+            storageToPlantUse_kg[t] += amount
+            currentSOC[t:] -= amount
+            need -= amount
+
+        ownAvailable = True
+        while need > eps:
+            if candidates and (not ownAvailable or candidates[0][0] < price[t]):
+                amount = produce(candidates[0][1], t, need)
+                if amount <= eps:
+                    heapq.heappop(candidates)
+            elif ownAvailable:
+                amount = produce(t, t, need)
+                ownAvailable = amount > eps
+            else:
+                shortfall += need
+                break
+            need -= amount
+
+        if maxKg - prodH2[t] > eps:
+            heapq.heappush(candidates, (storedPrice[t], t))
+
+    # operating states, gaps between running quarter-hours in standby or idle with a cold startup
+    isRunning = (prodH2 > eps).astype(float)
+    isStandBy = np.zeros(time_periods)
+    isColdStarted = np.zeros(time_periods)
+    running = np.flatnonzero(isRunning)
+
+    if len(running):
+        gaps = [(0, running[0])] + [(a + 1, b) for a, b in zip(running[:-1], running[1:]) if b > a + 1]
+        gaps = [(a, b) for a, b in gaps if b > a]
+        coldStarts = []
+        for a, b in gaps:
+            saving = unit.standbyCons*unit.dt*price[a:b].sum() - unit.coldStartUpCost
+            # the previous minDowntime quarter-hours of a cold startup have to be idle
+            if saving > 0 and (a == 0 or b - a >= unit.minDowntime):
+                coldStarts.append((saving, a, b))
+        coldStarts = {(a, b) for saving, a, b in sorted(coldStarts, reverse=True)[:int(maxAllowedColdStartups + eps)]}
+
+        for a, b in gaps:
+            if (a, b) in coldStarts:
+                isColdStarted[b] = 1.
+            else:
+                isStandBy[a:b] = 1.
+
+    isIdle = 1. - isRunning - isStandBy
+    elecCons = prodH2/kgPerMW + unit.standbyCons*isStandBy
+    elecStandByCons = unit.standbyCons*isStandBy
+    comprCons = elecToStorage_kg*unit.comprCons/unit.dt
+    optimalBidamount = elecCons + comprCons
+
+    statistics = {'solver': 'heuristic',
+                  'status': 'ok' if shortfall <= eps else 'warning',
+                  'termination': 'feasible' if shortfall <= eps else 'demandNotMet',
+                  'seconds': time.perf_counter() - start}
+
+    return tuple(values.tolist() for values in (optimalBidamount, elecCons, elecStandByCons, comprCons, prodH2, elecToPlantUse_kg, elecToStorage_kg,
+                                                storageToPlantUse_kg, currentSOC, isRunning, isStandBy, isIdle, isColdStarted)), statistics
+
+
+# objective of optimizeH2Prod for a schedule of one window
+def dispatchCost(unit, price, values):
+    return float(np.dot(price, values[0])*unit.dt + unit.coldStartUpCost*np.sum(values[12]))
+
 
 class Electrolyzer():
     @initializer
@@ -41,15 +357,19 @@ class Electrolyzer():
         # self.maxStorageOutput = self.maxSOC*0.1*self.world.dt #10% of storage capacity
 
         # bids status parameters
-        self.dictCapacity = {n:0 for n in self.world.snapshots}
+        self.dictCapacity = TimeSeries.allocate(len(self.world.snapshots), initial = 0)
         self.sentBids = []
-        self.dictCapacity[-1] = 0 
+
+        # optimized bid schedule, loaded once and reloaded only if the exported file changes
+        self.optimizedBidAmount = None
+        self.optimizedBidAmountMtime = None
+        self.solveStatistics = None
 
     #For the production of 1kg of hydrogen, about 9 kg of water and 60kWh of electricity are consumed(Rievaj, V., Gaňa, J., & Synák, F. (2019). Is hydrogen the fuel of the future?)
     def step(self): 
         # self.dictCapacity[self.world.currstep] = 0 #It initializes the available capacity at the current time step to zero.
         for bid in self.sentBids: 
-            if 'demandEOM' in bid.ID: #If the bid's ID contains the substring 'demandEOM', it increases the available capacity at the current time step
+            if bid.kind == DEMAND_EOM: #a demand bid on the EOM sets the available capacity at the current time step
                 self.dictCapacity[self.world.currstep] = bid.confirmedAmount
 
     #clarify
@@ -66,22 +386,181 @@ class Electrolyzer():
     #this function is for collecting optimized bid amounts for EOM market
     def collectBidsEOM(self, t, bidsEOM, bidQuantity_demand):
             bidsEOM.append(Bid(issuer = self,
-                                ID = "{}_demandEOM".format(self.name),
                                 price = 300, #to make sure all bids gets confirmation
                                 amount = bidQuantity_demand,
-                                status = "Sent",
+                                status = SENT,
                                 bidType = "Demand",
-                                node = self.node))
+                                node = self.node,
+                                kind = DEMAND_EOM))
             return bidsEOM
 
+    # heuristic schedules are exported separately, so that they are never mistaken for optimized ones
+    def optimizedBidAmountPath(self):
+        if self.world.dispatchStrategy == 'heuristic':
+            return self.world.outputPath('Elec_capacities', '{}_heuristicBidAmount.csv'.format(self.name))
+        return self.world.outputPath('Elec_capacities', '{}_optimizedBidAmount.csv'.format(self.name))
+
+    def solveStatisticsPath(self):
+        if self.world.dispatchStrategy == 'heuristic':
+            return self.world.outputPath('Elec_capacities', '{}_heuristicStatistics.csv'.format(self.name))
+        return self.world.outputPath('Elec_capacities', '{}_solveStatistics.csv'.format(self.name))
+
+    # returns the optimized bid schedule as array, or None if it was not exported yet
+    # the file is only parsed again if its modification time changed since it was loaded
+    def loadOptimizedBidAmount(self):
+        try:
+            mtime = os.stat(self.optimizedBidAmountPath()).st_mtime_ns
+        except FileNotFoundError:
+            self.optimizedBidAmount = None
+            self.optimizedBidAmountMtime = None
+            return None
+
+        if mtime != self.optimizedBidAmountMtime:
+            optimization_results = pd.read_csv(self.optimizedBidAmountPath(), usecols=['bidQuantity'])
+            self.optimizedBidAmount = optimization_results['bidQuantity'].to_numpy()
+            self.optimizedBidAmountMtime = mtime
+            print('INFO: Electrolyzer Agent: {} bidding from csv file {}'.format(self.name, self.optimizedBidAmountPath()))
+
+        return self.optimizedBidAmount
+
+    # parameters of the optimization model, picklable to be sent to worker processes
+    def optimizationParameters(self):
+        return SimpleNamespace(dt=self.world.dt,
+                               coldStartUpCost=self.coldStartUpCost,
+                               maxPower=self.maxPower,
+                               minPower=self.minPower,
+                               standbyCons=self.standbyCons,
+                               minDowntime=self.minDowntime,
+                               effElec=self.effElec,
+                               energyContentH2_LHV=self.energyContentH2_LHV,
+                               comprCons=self.comprCons,
+                               maxSOC=self.maxSOC)
+
+    # solves the optimization windows one after another or on a pool of world.optimizationWorkers processes
+    # (all cores if None), the results are returned in the order of the windows
+    # the heuristic dispatch takes milliseconds per window and always runs in this process
+    def optimizeWindows(self, prices, demands, maxAllowedColdStartups, dispatchStrategy='milp'):
+        unit = self.optimizationParameters()
+        if dispatchStrategy == 'heuristic':
+            return [dispatchH2Prod(unit, price, demand, len(price), maxAllowedColdStartups) for price, demand in zip(prices, demands)]
+        elif dispatchStrategy != 'milp':
+            raise ValueError('Unknown dispatch strategy {}, use milp or heuristic'.format(dispatchStrategy))
+
+        solverSettings = solvers.solverSettings(solver=self.world.optimizationSolver,
+                                                mipGap=self.world.optimizationMIPGap,
+                                                timeLimit=self.world.optimizationTimeLimit,
+                                                threads=self.world.optimizationThreads,
+                                                warmStart=self.world.optimizationWarmStart)
+        workers = self.world.optimizationWorkers
+        workers = min(os.cpu_count() if workers is None else workers, len(prices))
+        windowCount = len(prices)
+        arguments = ([unit] * windowCount, [solverSettings] * windowCount, prices, demands, [len(price) for price in prices], [maxAllowedColdStartups] * windowCount)
+
+        if workers <= 1:
+            return list(map(optimizeH2Prod, *arguments))
+
+        print('INFO: Electrolyzer Agent: {} solving {} windows on {} processes'.format(self.name, windowCount, workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(optimizeH2Prod, *arguments, chunksize=max(1, windowCount // (4 * workers))))
+
+    # optimization input: industrial demand and PFC of the simulation year with timestamps,
+    # the positions of the optimization windows and the cold startups allowed per window
+    def optimizationInput(self):
+        #setup optimization input data from flexable
+        industrialDemandH2 = self.world.industrial_demand[self.name]
+        industrialDemandH2 = pd.DataFrame(industrialDemandH2, columns=[self.name])            
+        #to acommodate negative values negative PFC is set to minimum positive number here 0.001
+        PFC = [max(0.001, round(p, 2)) for p in self.world.PFC]
+        PFC = pd.DataFrame(PFC, columns=['PFC'])
+
+        #set up timeframe for optimization #TODO
+        optTimeframe = 'day' # input("Choose optimization timefrme, day or week : ")
+        simulationYear = 2030 #please specify year
+        lastDay = 31 #please specify last day
+        lastMonth = 12 #please specify last month
+        industrialDemandH2['Timestamp'] = pd.date_range(start=f'1/1/{simulationYear}', end=f'{lastMonth}/{lastDay}/{simulationYear} 23:45', freq='15T')            
+        PFC['Timestamp'] = pd.date_range(start=f'1/1/{simulationYear}', end=f'{lastMonth}/{lastDay}/{simulationYear} 23:45', freq='15T')
+
+        #split the optimization timeframe into independent windows
+        if optTimeframe == "year":
+            print('INFO: Optimization is being performed for entire time period')
+            windowKeys = np.zeros(len(PFC), dtype=int)
+            maxAllowedColdStartups = self.maxAllowedColdStartups/365*lastDay #number of allowed startups within current timeframe
+        elif optTimeframe == "month":
+            print('INFO: Monthly optimization is being performed')
+            windowKeys = PFC['Timestamp'].dt.month
+            maxAllowedColdStartups = self.maxAllowedColdStartups/12
+        elif optTimeframe == "week":
+            print('INFO: Weekly optimization is being performed')
+            windowKeys = PFC['Timestamp'].dt.isocalendar().week
+            maxAllowedColdStartups = self.maxAllowedColdStartups/52
+        elif optTimeframe == "day":
+            print('INFO: Daily optimization is being performed')
+            windowKeys = PFC['Timestamp'].dt.date
+            maxAllowedColdStartups = self.maxAllowedColdStartups/365
+
+        #positions of every window, in order of the first appearance of its key
+        codes, _ = pd.factorize(windowKeys)
+        windows = np.split(np.argsort(codes, kind='stable'), np.cumsum(np.bincount(codes))[:-1])
+
+        return industrialDemandH2, PFC, windows, maxAllowedColdStartups
+
+    # schedules all windows of the simulation year with the given dispatch strategy
+    def scheduleWindows(self, dispatchStrategy):
+        industrialDemandH2, PFC, windows, maxAllowedColdStartups = self.optimizationInput()
+        price = PFC['PFC'].to_numpy()
+        demand = industrialDemandH2[self.name].to_numpy()
+
+        #windows are only coupled through the constant share of cold startups, so they are solved independently
+        results = self.optimizeWindows(prices=[price[window].tolist() for window in windows],
+                                       demands=[demand[window].tolist() for window in windows],
+                                       maxAllowedColdStartups=maxAllowedColdStartups,
+                                       dispatchStrategy=dispatchStrategy)
+
+        return industrialDemandH2, PFC, windows, results
+
+    def windowStatistics(self, industrialDemandH2, windows, results):
+        statistics = pd.DataFrame([windowStatistics for values, windowStatistics in results])
+        statistics.insert(0, 'start', industrialDemandH2['Timestamp'].iloc[[window[0] for window in windows]].values)
+        statistics.insert(1, 'periods', [len(window) for window in windows])
+        return statistics
+
+    def dispatchGapReport(self):
+        """
+        Schedules the current PFC with the MILP and with the heuristic dispatch
+        and returns the cost of both per window, as in the objective of the
+        MILP, with the additional cost of the heuristic and its gap in percent
+        of the MILP cost. The report is also written to <name>_dispatchGap.csv.
+        """
+        unit = self.optimizationParameters()
+        industrialDemandH2, PFC, windows, milp = self.scheduleWindows('milp')
+        industrialDemandH2, PFC, windows, heuristic = self.scheduleWindows('heuristic')
+        price = PFC['PFC'].to_numpy()
+
+        report = self.windowStatistics(industrialDemandH2, windows, milp)[['start', 'periods']]
+        report['milpCost'] = [dispatchCost(unit, price[window], values) for window, (values, statistics) in zip(windows, milp)]
+        report['heuristicCost'] = [dispatchCost(unit, price[window], values) for window, (values, statistics) in zip(windows, heuristic)]
+        report['costDifference'] = report['heuristicCost'] - report['milpCost']
+        report['gap'] = (report['heuristicCost'] / report['milpCost'] - 1) * 100
+        report['milpTermination'] = [statistics['termination'] for values, statistics in milp]
+        report['heuristicTermination'] = [statistics['termination'] for values, statistics in heuristic]
+        report['milpSeconds'] = [statistics['seconds'] for values, statistics in milp]
+        report['heuristicSeconds'] = [statistics['seconds'] for values, statistics in heuristic]
+
+        report.to_csv(self.world.outputPath('Elec_capacities', '{}_dispatchGap.csv'.format(self.name)), index_label='window')
+
+        print('INFO: Electrolyzer Agent: {} heuristic dispatch costs {:.2f} % more than the MILP, {:.3f} s instead of {:.1f} s'.format(
+            self.name, (report['heuristicCost'].sum() / report['milpCost'].sum() - 1) * 100, report['heuristicSeconds'].sum(), report['milpSeconds'].sum()))
+
+        return report
+
     # calculation EOM bid
     def calculateBidEOM(self, t):
         bidsEOM = []
-        if os.path.exists('output/{}/Elec_capacities/{}_optimizedBidAmount.csv'.format(self.world.scenario, self.name)):
-            optimization_results = pd.read_csv('output/{}/Elec_capacities/{}_optimizedBidAmount.csv'.format(self.world.scenario, self.name))
-            bidQuantity_demand = optimization_results["bidQuantity"][t]             
+        optimizedBidAmount = self.loadOptimizedBidAmount()
+        if optimizedBidAmount is not None:
+            bidQuantity_demand = optimizedBidAmount[t]
             bidsEOM = self.collectBidsEOM(t, bidsEOM, bidQuantity_demand) 
-            print(self.world.currstep, 'bidding from csv file')
         else:   
             #calculate compressor consumption based on input values 
             #whithin the scope of this project constant compressor consumption is used. To use following formula, please specify required variables in electrolyzers.csv input file
@@ -95,298 +574,20 @@ class Electrolyzer():
             #     return compCons
             # compCons = compressorConsumtion(compEff=self.compEff, compPressIn=self.compPressIn, compPressOut=self.compPressOut, compTempIn=self.compTempIn) *self.world.dt 
 
-            # Defining optimization function       
-            def  optimizeH2Prod(price, industry_demand, time_periods, maxAllowedColdStartups):
-                model = pyomo.ConcreteModel('Optimized Electroluzer Bidding')
-                model.i = pyomo.RangeSet(0, len(price) - 1)
-        
-                # Define the decision variables
-                model.bidQuantity_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals)
-                model.prodH2_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #produced H2
-                model.elecCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer consumption per kg
-                model.elecStandByCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer consumption per kg
-                # model.elecColdStartUpCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer cold startup consumption per kg
-                model.elecColdStartUpCost_EUR = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #electrolyzer consumption per kg
-                model.comprCons_MW = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #compressor consumption per kg
-                model.elecToStorage_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #H2 from electrolyzer to storage
-                model.elecToPlantUse_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #H2 from electrolyzer to process
-                model.storageToPlantUse_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #H2 from storage to process
-                model.currentSOC_kg = pyomo.Var(model.i, domain=pyomo.NonNegativeReals) #Status of Storage
-
-                # Binary variable to represent the status of the electrolyzer (on/off)
-                model.isRunning = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer running')
-                model.isColdStarted = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer  start from idle')
-                model.isIdle = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer is idle')
-                model.isStandBy = pyomo.Var(model.i, domain=pyomo.Binary, doc='Electrolyzer isStandBy')
-
-                # Define the objective function - minimize cost sum within selected timeframe
-                model.obj = pyomo.Objective(expr=sum(price[i] * model.bidQuantity_MW[i] * self.world.dt  + self.coldStartUpCost * model.isColdStarted[i] for i in model.i), sense=pyomo.minimize)
-
-                # Status constraints and constraining max and min bid quantity 
-                #Max power boundary
-                model.maxPower_rule = pyomo.Constraint(model.i, rule=lambda model, i:
-                                                        model.elecCons_MW[i] <= self.maxPower * model.isRunning[i] + self.standbyCons*model.isStandBy[i] )
-                #min power boundary
-                model.minPower_rule = pyomo.Constraint(model.i, rule=lambda model, i:
-                                                        model.elecCons_MW[i] >= self.minPower * model.isRunning[i]+ self.standbyCons*model.isStandBy[i])
-                #only one operational mode
-                model.statesExclusivity = pyomo.Constraint(model.i, rule=lambda model, i:
-                                                        model.isRunning[i] + model.isIdle[i] + model.isStandBy[i] == 1)
-                #transition from off to on state
-                model.statesExclusivity_2 = pyomo.Constraint(model.i, rule=lambda model, i:
-                                                        model.isColdStarted[i] >= model.isRunning[i] - model.isRunning[i-1]- model.isStandBy[i-1] if i > 0 else pyomo.Constraint.Skip)
-                # first coldstartup not counted
-                model.statesExclusivity_3 = pyomo.Constraint(model.i, rule=lambda model, i:
-                                                        model.isColdStarted[0] == 0 ) 
-                
-                # transition from an off-state to a standby-state is not allowed    
-                model.statesExclusivity_4 = pyomo.Constraint(model.i, rule=lambda model, i:
-                                                        model.isIdle[i-1] + model.isStandBy[i] <= 1 if i > 0 else pyomo.Constraint.Skip)     
-                #minimum runtime constraint
-                # def minRuntime_rule(model, i):
-                #     #force the minimum runtime after a start event
-                #     next_time_periods = {i + offset for offset in range(int(self.minRuntime)) if i + offset < time_periods}
-                #     return sum(model.isRunning[tt] + model.isStandBy[tt] for tt in next_time_periods) >= len(next_time_periods) * model.isColdStarted[i]
-                # model.minRuntime_rule = pyomo.Constraint(model.i, rule=minRuntime_rule)       
-                
-                #minimum downtime constraint
-                def minDownTime_rule(model, i):
-                    if i == 0:
-                        return pyomo.Constraint.Skip
-                    previous_time_periods = {i - offset for offset in range(1, int(self.minDowntime) + 1) if i - offset >=0}
-                    return len(previous_time_periods) * model.isColdStarted[i] <= sum(model.isIdle[tt] for tt in previous_time_periods)
-                model.minDownTime_rule = pyomo.Constraint(model.i, rule=minDownTime_rule)     
-
-                #maximum allowed cold startups within defined time period    
-                model.maxColdStartup_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                    sum(model.isColdStarted[i] for i in range(0, time_periods)) <= maxAllowedColdStartups) 
-
-                model.electrolyzerConsumption_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                    model.prodH2_kg[i] == model.elecCons_MW[i]*self.world.dt*self.effElec/self.energyContentH2_LHV*(1-model.isStandBy[i]) )
-
-                model.hydrogenBalance_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                        model.prodH2_kg[i] == model.elecToPlantUse_kg[i] + model.elecToStorage_kg[i])
-
-
-                model.demandBalance_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                        industry_demand[i] == model.elecToPlantUse_kg[i] + model.storageToPlantUse_kg[i])   
-
-                # model.elecColdStartUpCost_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                #                                             model.elecColdStartUpCost_EUR[i] == self.coldStartUpCost * model.isColdStarted[i])
-                
-                # model.elecColdStartUp_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                #                                             model.elecColdStartUpCons_MW[i] == self.coldStartUpCons * model.isColdStarted[i])
-
-                model.compressorCons_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                            model.comprCons_MW[i] == model.elecToStorage_kg[i] * self.comprCons/self.world.dt)
-
-                model.standByConsumption_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                            model.elecStandByCons_MW[i] == self.standbyCons*model.isStandBy[i])
-
-                model.totalConsumption_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                        model.bidQuantity_MW[i] == model.elecCons_MW[i] + model.comprCons_MW[i]) #model.elecColdStartUpCons_MW[i]) 
-
-                # Define Storage constraint
-                model.currentSOC_rule = pyomo.Constraint(model.i, rule=lambda model, i:
-                                                    model.currentSOC_kg[i] == model.currentSOC_kg[i - 1] + model.elecToStorage_kg[i] - model.storageToPlantUse_kg[i]
-                                                    if i > 0 else model.currentSOC_kg[i] == model.elecToStorage_kg[i]  - model.storageToPlantUse_kg[i])  
-                
-                model.maxSOC_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                                                    model.currentSOC_kg[i] <= self.maxSOC)
-
-                # model.storageFlowRate_rule = pyomo.Constraint(model.i, rule=lambda model, i: 
-                #                                         model.storageToPlantUse_kg[i] <= self.maxStorageOutput)  
-                # Solve the optimization problem
-                opt = SolverFactory("gurobi")  # You can replace this with your preferred solver
-                result = opt.solve(model) #tee=True
-                print('INFO: Electrolyzer Agent: Solver status:', result.solver.status)
-                print('INFO: Electrolyzer Agent: Results: ', result.solver.termination_condition)
-
-                # Retrieve the optimal values
-                optimalBidamount = [model.bidQuantity_MW[i].value for i in model.i]
-                elecCons = [model.elecCons_MW[i].value for i in model.i]            
-                elecStandByCons = [model.elecStandByCons_MW[i].value for i in model.i]           
-                comprCons = [model.comprCons_MW[i].value for i in model.i]
-                prodH2 = [ model.prodH2_kg[i].value for i in model.i]           
-                elecToPlantUse_kg = [ model.elecToPlantUse_kg[i].value for i in model.i]            
-                elecToStorage_kg = [ model.elecToStorage_kg[i].value for i in model.i]            
-                storageToPlantUse_kg = [ model.storageToPlantUse_kg[i].value for i in model.i]            
-                currentSOC = [model.currentSOC_kg[i].value for i in model.i]                
-                isRunning =   [model.isRunning[i].value for i in model.i]
-                isStandBy = [model.isStandBy[i].value for i in model.i]
-                isIdle = [model.isIdle[i].value for i in model.i]
-                isColdStarted = [model.isColdStarted[i].value for i in model.i]
-                return optimalBidamount,elecCons, elecStandByCons, comprCons,  prodH2, elecToPlantUse_kg, elecToStorage_kg, \
-                        storageToPlantUse_kg, currentSOC, isRunning, isStandBy, isIdle, isColdStarted
-
-            #setup optimization input data from flexable
-            industrialDemandH2 = self.world.industrial_demand[self.name]
-            industrialDemandH2 = pd.DataFrame(industrialDemandH2, columns=[self.name])            
-            #to acommodate negative values negative PFC is set to minimum positive number here 0.001
-            PFC = [max(0.001, round(p, 2)) for p in self.world.PFC]
-            PFC = pd.DataFrame(PFC, columns=['PFC'])
-
-            #set up timeframe for optimization #TODO
-            optTimeframe = 'day' # input("Choose optimization timefrme, day or week : ")
-            simulationYear = 2030 #please specify year
-            lastDay = 31 #please specify last day
-            lastMonth = 12 #please specify last month
-            industrialDemandH2['Timestamp'] = pd.date_range(start=f'1/1/{simulationYear}', end=f'{lastMonth}/{lastDay}/{simulationYear} 23:45', freq='15T')            
-            PFC['Timestamp'] = pd.date_range(start=f'1/1/{simulationYear}', end=f'{lastMonth}/{lastDay}/{simulationYear} 23:45', freq='15T')
-
-            #initialize empty lists to retreive optimization reults for all optimized timeperiod
-            bidQuantity_all = []
-            elecCons_all = []
-            elecStandByCons_all = []
-            comprCons_all = []
-            prodH2_all = []
-            elecToPlantUse_kg_all = []
-            elecToStorage_kg_all = []
-            storageToPlantUse_kg_all = []
-            currentSOC_all = []
-            isRunning_all = []
-            isIdle_all = []
-            isStandBy_all = []
-            isColdStarted_all = []
-
-            #setting optimization timeframe and calling optimization function
-            if optTimeframe == "year":
-                print('INFO: Optimization is being performed for entire time period')
-                time_periods = len(PFC) 
-                maxAllowedColdStartups = self.maxAllowedColdStartups/365*lastDay #number of allowed startups within current timeframe
-                demand = list(industrialDemandH2[self.name])
-                price = list(PFC['PFC'])
-                #Perform optimization for entire time period
-                optimalBidamount,elecCons,elecStandByCons, comprCons, prodH2, elecToPlantUse_kg, elecToStorage_kg, storageToPlantUse_kg, \
-                    currentSOC, isRunning, isStandBy, isIdle, isColdStarted = optimizeH2Prod(price=price, 
-                                                                                            industry_demand=demand, 
-                                                                                            time_periods = time_periods, 
-                                                                                            maxAllowedColdStartups=maxAllowedColdStartups)     
-                #output results
-                bidQuantity_all.extend(optimalBidamount)                    
-                elecCons_all.extend(elecCons)
-                elecStandByCons_all.extend(elecStandByCons)        
-                comprCons_all.extend(comprCons)
-                prodH2_all.extend(prodH2)
-                elecToPlantUse_kg_all.extend(elecToPlantUse_kg)
-                elecToStorage_kg_all.extend(elecToStorage_kg)
-                storageToPlantUse_kg_all.extend(storageToPlantUse_kg)
-                currentSOC_all.extend(currentSOC)
-                isRunning_all.extend(isRunning)
-                isStandBy_all.extend(isStandBy)            
-                isIdle_all.extend(isIdle)            
-                isColdStarted_all.extend(isColdStarted)   
-                
-            if optTimeframe == "month":
-                print('INFO: Monthly optimization is being performed')
-                # find weeks from timestamp
-                industrialDemandH2['Month'] = industrialDemandH2['Timestamp'].dt.month
-                PFC['Month'] = PFC['Timestamp'].dt.month
-                unique_month = industrialDemandH2['Month'].unique()
-                for month in unique_month:
-                    # Extract weekly data for the current month
-                    monthlyIntervalDemand = industrialDemandH2[industrialDemandH2['Month'] == month]
-                    monthlyIntervalDemand = list(monthlyIntervalDemand[self.name])
-                    monthlyIntervalPFC = PFC[PFC['Month'] == month]
-                    monthlyIntervalPFC = list(monthlyIntervalPFC['PFC'])
-                    time_periods = len(monthlyIntervalPFC) 
-                    maxAllowedColdStartups = self.maxAllowedColdStartups/12
-                    #Perform optimization for each week
-                    optimalBidamount,elecCons,elecStandByCons, comprCons, prodH2, elecToPlantUse_kg, elecToStorage_kg, storageToPlantUse_kg,\
-                        currentSOC, isRunning, isStandBy, isIdle, isColdStarted = optimizeH2Prod(price=monthlyIntervalPFC, 
-                                                                                                industry_demand=monthlyIntervalDemand, 
-                                                                                                time_periods = time_periods, 
-                                                                                                maxAllowedColdStartups=maxAllowedColdStartups)
-                                        #output results
-                    bidQuantity_all.extend(optimalBidamount)                    
-                    elecCons_all.extend(elecCons)
-                    elecStandByCons_all.extend(elecStandByCons)        
-                    comprCons_all.extend(comprCons)
-                    prodH2_all.extend(prodH2)
-                    elecToPlantUse_kg_all.extend(elecToPlantUse_kg)
-                    elecToStorage_kg_all.extend(elecToStorage_kg)
-                    storageToPlantUse_kg_all.extend(storageToPlantUse_kg)
-                    currentSOC_all.extend(currentSOC)
-                    isRunning_all.extend(isRunning)
-                    isStandBy_all.extend(isStandBy)            
-                    isIdle_all.extend(isIdle)            
-                    isColdStarted_all.extend(isColdStarted)   
-                    
-            if optTimeframe == "week":
-                print('INFO: Weekly optimization is being performed')
-                # find weeks from timestamp
-                industrialDemandH2['Week'] = industrialDemandH2['Timestamp'].dt.isocalendar().week
-                PFC['Week'] = PFC['Timestamp'].dt.isocalendar().week
-                unique_weeks = industrialDemandH2['Week'].unique()
-                for week in unique_weeks:
-                    # Extract weekly data for the current week
-                    weeklyIntervalDemand = industrialDemandH2[industrialDemandH2['Week'] == week]
-                    weeklyIntervalDemand = list(weeklyIntervalDemand[self.name])
-                    weeklyIntervalPFC = PFC[PFC['Week'] == week]
-                    weeklyIntervalPFC = list(weeklyIntervalPFC['PFC'])
-                    time_periods = len(weeklyIntervalPFC) 
-                    maxAllowedColdStartups = self.maxAllowedColdStartups/52
-                    #Perform optimization for each week
-                    optimalBidamount,elecCons,elecStandByCons, comprCons, prodH2, elecToPlantUse_kg, elecToStorage_kg, storageToPlantUse_kg, \
-                        currentSOC, isRunning, isStandBy, isIdle, isColdStarted = optimizeH2Prod(price=weeklyIntervalPFC, 
-                                                                                                industry_demand=weeklyIntervalDemand, 
-                                                                                                time_periods = time_periods, 
-                                                                                                maxAllowedColdStartups=maxAllowedColdStartups)
-                                        #output results
-                    bidQuantity_all.extend(optimalBidamount)                    
-                    elecCons_all.extend(elecCons)
-                    elecStandByCons_all.extend(elecStandByCons)        
-                    comprCons_all.extend(comprCons)
-                    prodH2_all.extend(prodH2)
-                    elecToPlantUse_kg_all.extend(elecToPlantUse_kg)
-                    elecToStorage_kg_all.extend(elecToStorage_kg)
-                    storageToPlantUse_kg_all.extend(storageToPlantUse_kg)
-                    currentSOC_all.extend(currentSOC)
-                    isRunning_all.extend(isRunning)
-                    isStandBy_all.extend(isStandBy)            
-                    isIdle_all.extend(isIdle)            
-                    isColdStarted_all.extend(isColdStarted)   
-            elif optTimeframe == "day":
-                print('INFO: Daily optimization is being performed')
-                # find days from timestamp
-                industrialDemandH2['Date'] = industrialDemandH2['Timestamp'].dt.date
-                PFC['Date'] = PFC['Timestamp'].dt.date
-                unique_days = industrialDemandH2['Date'].unique()
-                for day in unique_days:
-                    # Extract data for the current day
-                    dailyIntervalDemand = industrialDemandH2[industrialDemandH2['Date'] == day]
-                    dailyIntervalDemand = list(dailyIntervalDemand[self.name])
-                    dailyIntervalPFC = PFC[PFC['Date'] == day]
-                    dailyIntervalPFC = list(dailyIntervalPFC['PFC'])
-                    time_periods = len(dailyIntervalPFC)  
-                    maxAllowedColdStartups = self.maxAllowedColdStartups/365
-                    
-                    #Perform optimization for each day
-                    optimalBidamount,elecCons,elecStandByCons, comprCons, prodH2, elecToPlantUse_kg, elecToStorage_kg, storageToPlantUse_kg, \
-                    currentSOC, isRunning, isStandBy, isIdle, isColdStarted = optimizeH2Prod(price=dailyIntervalPFC, 
-                                                                                            industry_demand=dailyIntervalDemand, 
-                                                                                            time_periods = time_periods, 
-                                                                                            maxAllowedColdStartups=maxAllowedColdStartups)
-                    #output results
-                    bidQuantity_all.extend(optimalBidamount)                    
-                    elecCons_all.extend(elecCons)
-                    elecStandByCons_all.extend(elecStandByCons)        
-                    comprCons_all.extend(comprCons)
-                    prodH2_all.extend(prodH2)
-                    elecToPlantUse_kg_all.extend(elecToPlantUse_kg)
-                    elecToStorage_kg_all.extend(elecToStorage_kg)
-                    storageToPlantUse_kg_all.extend(storageToPlantUse_kg)
-                    currentSOC_all.extend(currentSOC)
-                    isRunning_all.extend(isRunning)
-                    isStandBy_all.extend(isStandBy)            
-                    isIdle_all.extend(isIdle)            
-                    isColdStarted_all.extend(isColdStarted)    
+            industrialDemandH2, PFC, windows, results = self.scheduleWindows(self.world.dispatchStrategy)
+
+            #reassemble the results of all windows in order
+            bidQuantity_all, elecCons_all, elecStandByCons_all, comprCons_all, prodH2_all, elecToPlantUse_kg_all, elecToStorage_kg_all, \
+                storageToPlantUse_kg_all, currentSOC_all, isRunning_all, isStandBy_all, isIdle_all, isColdStarted_all = \
+                    [[value for windowValues in values for value in windowValues] for values in zip(*(values for values, statistics in results))]
+
+            #solve statistics per window
+            self.solveStatistics = self.windowStatistics(industrialDemandH2, windows, results)
+            print('INFO: Electrolyzer Agent: {} scheduled {} windows with {} in {:.1f} s'.format(self.name, len(windows), self.solveStatistics['solver'].iloc[0], self.solveStatistics['seconds'].sum()))
+            if 'fallback' in self.solveStatistics and self.solveStatistics['fallback'].notna().any():
+                print('WARNING: Electrolyzer Agent: {} scheduled {} windows without solver solution with the heuristic dispatch'.format(self.name, self.solveStatistics['fallback'].notna().sum()))
             
             #exporting optimization results, happens one time then code uses exported csv file for the rest of the simulation
-            directory = 'output/{}/Elec_capacities'.format(self.world.scenario)
-            if not os.path.exists(directory):
-                os.makedirs(directory)
-            
             output = {'timestamp': industrialDemandH2['Timestamp'], 
                         'bidQuantity': bidQuantity_all,
                         'electrolyzer_consumption': elecCons_all,
@@ -403,7 +604,11 @@ class Electrolyzer():
                         'PFC': PFC['PFC'],
                         'h2demand': industrialDemandH2[self.name]}
             df = pd.DataFrame(output)
-            df.to_csv( directory + '/{}_optimizedBidAmount.csv'.format(self.name), index=True)
+            df.to_csv(self.optimizedBidAmountPath(), index=True)
+            self.solveStatistics.to_csv(self.solveStatisticsPath(), index_label='window')
+            #keep the schedule in memory, so the exported file is not parsed again
+            self.optimizedBidAmount = np.array(bidQuantity_all)
+            self.optimizedBidAmountMtime = os.stat(self.optimizedBidAmountPath()).st_mtime_ns
             # print('INFO: Electrolyzer Agent: Optimization for a period completed, continuing with next timeframe')
             #save results into bid requests
             bidQuantity_demand = bidQuantity_all[t]
@@ -25,7 +25,18 @@ from . import EOM
 from . import DHM
 from . import CRM
 from . import MeritOrder
+from . import pfcCache
+from . import inputStore
+from . import costTables
+from . import powerplantFleet
+from . import storageFleet
+from . import storageLookAhead
+from . import pfcIndex
 from . import resultsWriter
+from . import resultsStore
+from . import checkpoint
+from . import profiler
+from .vrepowerplants import VREPortfolio
 
 import pandas as pd
 from datetime import datetime
@@ -61,11 +72,14 @@ class World():
     """
     This is the main container
     """
-    def __init__(self, snapshots, simulationID = None, databaseName = 'flexABLE', industrial_demand=None, startingDate = '2018-01-01T00:00:00', writeResultsToDB = False):
+    def __init__(self, snapshots, simulationID = None, databaseName = 'flexABLE', industrial_demand=None, startingDate = '2018-01-01T00:00:00', writeResultsToDB = False, resultsBatchSize = None, resultsFormat = 'csv', streamResults = False, resultsChunkSize = 672, profile = False, optimizationWorkers = 1, optimizationWarmStart = False, optimizationSolver = 'gurobi', optimizationMIPGap = None, optimizationTimeLimit = None, optimizationThreads = None, dispatchStrategy = 'milp', outputDirectory = None):
         self.simulationID = simulationID
         self.powerplants = []
         self.storages = []
         self.electrolyzers = []
+        self.costTables = None
+        self.powerplantFleet = None
+        self.storageFleet = None
         self.agents = {}
         self.industrial_demand = []
         self.markets = {"EOM":{},
@@ -77,6 +91,7 @@ class World():
             self.snapshots = snapshots
             
         self.currstep = 0
+        self.inputStore = None
         self.fuelPrices = {}
         self.emissionFactors = {}
         
@@ -85,11 +100,22 @@ class World():
         self.minBidDHM = 1
         self.minBidReDIS = 1
         
+        self.optimizationWorkers = optimizationWorkers # processes for the electrolyzer bid optimization, None for all cores
+        self.optimizationWarmStart = optimizationWarmStart # start electrolyzer solves from the previous window's solution
+        self.optimizationSolver = optimizationSolver # gurobi, highs, cbc or glpk, see solvers.py
+        self.optimizationMIPGap = optimizationMIPGap # relative MIP gap, None for the solver default
+        self.optimizationTimeLimit = optimizationTimeLimit # seconds per window
+        self.optimizationThreads = optimizationThreads # threads per solve
+        self.dispatchStrategy = dispatchStrategy # electrolyzer bid schedule, milp or heuristic for fast screening runs
+        self.outputDirectory = outputDirectory # outputs of this run, output/<scenario> if None, see outputPath
+        
         self.dt = 0.25 # Although we are always dealing with power, dt is needed to calculate the revenue and for the energy market
         self.dtu = 16 # The frequency of reserve market
         
         self.dictPFC = [0]*snapshots # This is an artifact and should be removed
         self.PFC = [0]*snapshots
+        self.pfcIndex = None
+        self.storageLookAhead = storageLookAhead.StorageLookAhead(self)
         # self.weather_CF = [0]*snapshots
 
         self.EOMResult = [0]*snapshots
@@ -97,11 +123,17 @@ class World():
         
         self.startingDate = startingDate
         self.writeResultsToDB = writeResultsToDB
+        self.resultsFormat = resultsFormat
+        self.streamResults = streamResults
+        self.resultsChunkSize = resultsChunkSize
+        self.resultsStream = None
+        self.profiler = profiler.Profiler() if profile else None
         if writeResultsToDB:
             self.ResultsWriter = resultsWriter.ResultsWriter(databaseName = databaseName,
                                                              simulationID = simulationID,
                                                              startingDate = startingDate,
-                                                             world = self)
+                                                             world = self,
+                                                             batchSize = resultsBatchSize)
             
     
     def addAgent(self, name):
@@ -122,31 +154,133 @@ class World():
     #perform a single step on each market in the following order CRM, DHM, EOM 
     def step(self):
         if self.currstep < len(self.snapshots):
-            for powerplant in self.powerplants:
-                powerplant.checkAvailability(self.snapshots[self.currstep])
-                
-            self.markets['CRM'].step(self.snapshots[self.currstep], self.agents)
-            self.markets['DHM'].step(self.snapshots[self.currstep])
-            
-            for market in self.markets["EOM"].values():
-                market.step(self.snapshots[self.currstep],self.agents)
-                
-            for powerplant in self.powerplants:
-                powerplant.step()
-                
-            for storage in self.storages:
-                storage.step()
+            with self.phase('World.step'):
+                with self.phase('World.step/availability'):
+                    if self.powerplantFleet is not None:
+                        self.powerplantFleet.checkAvailability(self.snapshots[self.currstep])
+                        
+                    for powerplant in self.powerplants:
+                        if powerplant.fleet is None:
+                            powerplant.checkAvailability(self.snapshots[self.currstep])
+                    
+                with self.phase('World.step/CRM'):
+                    self.markets['CRM'].step(self.snapshots[self.currstep], self.agents)
+                    
+                with self.phase('World.step/DHM'):
+                    self.markets['DHM'].step(self.snapshots[self.currstep])
                 
-            for electrolyzer in self.electrolyzers: 
-                electrolyzer.step()
+                with self.phase('World.step/EOM'):
+                    for market in self.markets["EOM"].values():
+                        market.step(self.snapshots[self.currstep],self.agents)
+                    
+                with self.phase('World.step/powerplants'):
+                    if self.powerplantFleet is not None:
+                        self.powerplantFleet.step()
+                        
+                    for powerplant in self.powerplants:
+                        if powerplant.fleet is None:
+                            powerplant.step()
+                    
+                with self.phase('World.step/storages'):
+                    if self.storageFleet is not None:
+                        self.storageFleet.step()
+                        
+                    for storage in self.storages:
+                        if storage.fleet is None:
+                            storage.step()
+                    
+                with self.phase('World.step/electrolyzers'):
+                    for electrolyzer in self.electrolyzers: 
+                        electrolyzer.step()
+                        
+                if self.resultsStream is not None:
+                    with self.phase('World.step/results'):
+                        self.resultsStream.update(self.currstep + 1)
+                        
             self.currstep +=1
         else:
             logger.info("Reached simulation end")
             
             
-    def runSimulation(self):
+    def phase(self, name):
+        """
+        Timer for a section of the simulation, does nothing if profiling is disabled.
+        """
+        if self.profiler is None:
+            return profiler.noTimer
+        
+        return self.profiler.phase(name)
+    
+    
+    def outputPath(self, *parts):
+        """
+        Path of an output of this run below the output directory, which is
+        output/<scenario> unless an outputDirectory was given, e.g. to keep
+        parallel runs of the same scenario apart. Creates the directory of
+        the path.
+        """
+        directory = 'output/{}'.format(self.scenario) if self.outputDirectory is None else self.outputDirectory
+        path = os.path.join(directory, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        
+        return path
+        
+        
+    def writeProfile(self):
+        """
+        Logs the profiling summary and saves it as JSON report in the output directory.
+        """
+        logger.info('Profiling summary:\n{}'.format(self.profiler.summary()))
+        
+        self.profiler.writeReport(self.outputPath('profile_{}.json'.format(self.simulationID)))
+        
+        
+    def readTimeseries(self, fileName, startingPoint = 0, **kwargs):
+        """
+        Reads the snapshots [startingPoint:startingPoint + len(snapshots)] of a
+        time series input file, either from the binary input store or by
+        parsing the CSV file of the scenario.
+        """
+        if self.inputStore is not None:
+            return self.inputStore.read(fileName, startingPoint, len(self.snapshots), **kwargs)
+        
+        data = pd.read_csv('input/{}/{}'.format(self.scenario, fileName),
+                           nrows = len(self.snapshots) + startingPoint,
+                           **kwargs)
+        data.drop(data.index[0:startingPoint], inplace = True)
+        data.reset_index(drop = True, inplace = True)
+        
+        return data
+    
+    
+    def checkpoint(self, path):
+        """
+        Saves the simulation state after the last finished step, see checkpoint.saveCheckpoint.
+        """
+        checkpoint.saveCheckpoint(self, path)
+        
+        
+    def restore(self, path):
+        """
+        Restores a checkpoint of the loaded scenario, the simulation continues
+        with the step after the checkpoint.
+        """
+        checkpoint.loadCheckpoint(self, path)
+        self.pfcIndex = pfcIndex.PFCIndex(self)
+        
+        
+    def runSimulation(self, checkpointInterval = None, checkpointPath = None):
+        """
+        Runs the remaining steps and saves the results. With a checkpointInterval
+        the state is saved every checkpointInterval steps, by default into
+        checkpoint_<simulationID>.pkl.gz in the output directory, a crashed run can
+        be resumed by restoring that file and calling runSimulation again.
+        """
         start = datetime.now()
         
+        if checkpointInterval is not None and checkpointPath is None:
+            checkpointPath = self.outputPath('checkpoint_{}.pkl.gz'.format(self.simulationID))
+        
         if self.writeResultsToDB:
             tempDF = pd.DataFrame(self.dictPFC,
                                   index = pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'),
@@ -158,17 +292,33 @@ class World():
         logger.info("######## Simulation Started ########")
         logger.info('Started at: {}'.format(start))
         
-        for _ in self.snapshots:
+        while self.currstep < len(self.snapshots):
             self.step()
             
+            if checkpointInterval is not None and self.currstep % checkpointInterval == 0:
+                self.checkpoint(checkpointPath)
+            
         finished = datetime.now()
         logger.info('Simulation finished at: {}'.format(finished))
         logger.info('Simulation time: {}'.format(finished - start))
         
+        if self.profiler is not None:
+            self.writeProfile()
+            
+        self.writeResults()
+        
         
+    def writeResults(self):
+        """
+        Saves the simulation results either into the database, as CSV files or,
+        with resultsFormat = 'parquet', as one results.parquet file in the
+        output directory of the scenario. Results streamed during the run
+        (streamResults) are completed in the results directory instead.
+        """
         #save the simulation results into a database
         if self.writeResultsToDB:
             start = datetime.now()
+            powerplants = self.resultPowerplants()
             logger.info('Writing Capacities in Server - This may take couple of minutes.')
             
             # writing EOM market prices
@@ -186,11 +336,8 @@ class World():
             self.ResultsWriter.writeDataFrame(tempDF, 'PFC', tags = {'simulationID':self.simulationID, "user": "EOM"})
             
             #save total capacities of power plants
-            for powerplant in self.powerplants:
-                tempDF = pd.DataFrame(powerplant.dictCapacity,
-                                      index = ['Power']).drop([-1], axis = 1).T.set_index(pd.date_range(self.startingDate,
-                                                                                                        periods = len(self.snapshots),
-                                                                                                        freq = '15T')).astype('float64')
+            for powerplant in powerplants:
+                tempDF = powerplant.dictCapacity.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'), 'Power')
                 
                 self.ResultsWriter.writeDataFrame(tempDF, 'Power', tags = {'simulationID':self.simulationID,
                                                                            'UnitName':powerplant.name,
@@ -198,20 +345,16 @@ class World():
             
             
             #write must-run and flex capacities and corresponding bid prices
-            for powerplant in self.powerplants:
-                tempDF = pd.DataFrame(powerplant.dictCapacityMR,
-                                      index = ['Power_MR', 'MR_Price']).T.set_index(pd.date_range(self.startingDate,
-                                                                                                 periods = len(self.snapshots),
-                                                                                                 freq = '15T')).astype('float64')
+            for powerplant in powerplants:
+                tempDF = powerplant.dictCapacityMR.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'),
+                                                           ['Power_MR', 'MR_Price'])
                 
                 self.ResultsWriter.writeDataFrame(tempDF, 'Capacities', tags = {'simulationID':self.simulationID,
                                                                                 'UnitName':powerplant.name,
                                                                                 'Technology':powerplant.technology})
                 
-                tempDF = pd.DataFrame(powerplant.dictCapacityFlex,
-                                      index=['Power_Flex','Flex_Price']).T.set_index(pd.date_range(self.startingDate,
-                                                                                                   periods = len(self.snapshots),
-                                                                                                   freq = '15T')).astype('float64')
+                tempDF = powerplant.dictCapacityFlex.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'),
+                                                             ['Power_Flex', 'Flex_Price'])
                 
                 self.ResultsWriter.writeDataFrame(tempDF, 'Capacities', tags = {'simulationID':self.simulationID,
                                                                                 'UnitName':powerplant.name,
@@ -219,9 +362,7 @@ class World():
             
             #write storage capacities
             for powerplant in self.storages:
-                tempDF = pd.DataFrame(powerplant.dictCapacity, index=['Power']).T.set_index(pd.date_range(self.startingDate,
-                                                                                                          periods = len(self.snapshots),
-                                                                                                          freq = '15T')).astype('float64')
+                tempDF = powerplant.dictCapacity.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'), 'Power')
 
                 self.ResultsWriter.writeDataFrame(tempDF.clip(upper = 0), 'Power', tags = {'simulationID':self.simulationID,
                                                                                            'UnitName':powerplant.name+'_charge',
@@ -236,31 +377,45 @@ class World():
             
             #write electrolyzer capacities
             for electrolyzer in self.electrolyzers:
-                tempDF = pd.DataFrame(electrolyzer.dictCapacity, index=['Power'].drop([-1])).T.set_index(pd.date_range(self.startingDate,
-                                                                                                          periods = len(self.snapshots),
-                                                                                                          freq = '15T')).astype('float64')
+                tempDF = electrolyzer.dictCapacity.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'), 'Power')
 
                 self.ResultsWriter.writeDataFrame(tempDF.clip(upper = 0), 'Power', tags = {'simulationID':self.simulationID,
                                                                                            'UnitName':electrolyzer.name+'_charge',
                                                                                            'direction':'charge',
                                                                                            'Technology':electrolyzer.technology})
             
+            self.ResultsWriter.close()
+            
             finished = datetime.now()
             logger.info('Writing results into database finished at: {}'.format(finished))
             logger.info('Saving into database time: {}'.format(finished - start))
             
+        elif self.resultsStream is not None:
+            logger.info('Completing streamed results...')
+            
+            self.resultsStream.close()
+            
+            logger.info('Results saved in {}'.format(self.resultsStream.directory))
+            
+        elif self.resultsFormat == 'parquet':
+            logger.info('Saving results into Parquet file...')
+            
+            resultsStore.ResultsStore(self).write(self.outputPath('results.parquet'))
+            
+            logger.info('Saving results complete')
+            
         else:
             logger.info('Saving results into CSV files...')
             
-            directory = 'output/{}/'.format(self.scenario)
-            if not os.path.exists(directory):
-                os.makedirs(directory)
+            directory = self.outputPath('')
             if not os.path.exists(directory+'/PP_capacities'):
                 os.makedirs(directory+'/PP_capacities')
             if not os.path.exists(directory+'/STO_capacities'):
                 os.makedirs(directory+'/STO_capacities')
             if not os.path.exists(directory+'/Elec_capacities'):
                 os.makedirs(directory+'/Elec_capacities')
+                
+            powerplants = self.resultPowerplants()
 
                 
             # writing EOM market prices as CSV
@@ -271,27 +426,21 @@ class World():
             tempDF.to_csv(directory + 'EOM_Prices.csv')
             
             #save total capacities of power plants as CSV
-            for powerplant in self.powerplants:
-                tempDF = pd.DataFrame(powerplant.dictCapacity,
-                                      index = ['Power']).drop([-1], axis = 1).T.set_index(pd.date_range(self.startingDate,
-                                                                                                        periods = len(self.snapshots),
-                                                                                                        freq = '15T')).astype('float64')
+            for powerplant in powerplants:
+                tempDF = powerplant.dictCapacity.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'), 'Power')
                                                                                                         
                 tempDF.to_csv(directory + 'PP_capacities/{}_Capacity.csv'.format(powerplant.name))
                             
             
             #write storage capacities as CSV
             for powerplant in self.storages:
-                tempDF = pd.DataFrame(powerplant.dictCapacity, index=['Power']).T.set_index(pd.date_range(self.startingDate,
-                                                                                                          periods = len(self.snapshots),
-                                                                                                          freq = '15T')).astype('float64')
+                tempDF = powerplant.dictCapacity.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'), 'Power')
                 
                 tempDF.to_csv(directory + 'STO_capacities/{}_Capacity.csv'.format(powerplant.name))
              
             #write electrolyzer capacities as CSV
             for powerplant in self.electrolyzers:
-                tempDF = pd.DataFrame(powerplant.dictCapacity, index=['Power']).T
-                tempDF = tempDF.drop([-1], axis = 0).set_index(pd.date_range(self.startingDate, periods=len(self.snapshots), freq='15T')).astype('float64')                
+                tempDF = powerplant.dictCapacity.toFrame(pd.date_range(self.startingDate, periods = len(self.snapshots), freq = '15T'), 'Power')
                 
                 tempDF.to_csv(directory + '/Elec_capacities/{}_Capacity.csv'.format(powerplant.name))                 
             
@@ -300,6 +449,22 @@ class World():
         logger.info("#########################")
         
         
+    def resultPowerplants(self):
+        """
+        Power plants of the result export, aggregated VRE units are split into
+        their single units.
+        """
+        powerplants = []
+        
+        for powerplant in self.powerplants:
+            if isinstance(powerplant, VREPortfolio):
+                powerplants.extend(powerplant.units())
+            else:
+                powerplants.append(powerplant)
+                
+        return powerplants
+        
+        
     def loadScenario(self,
                      scenario = "Default",
                      importStorages = False,
@@ -309,9 +474,34 @@ class World():
                      importCBT = True,
                      checkAvailability = False,
                      meritOrder = True,
+                     cachePFC = True,
+                     useInputStore = True,
+                     usePowerplantFleet = True,
+                     useStorageFleet = True,
+                     aggregateVRE = False,
                      startingPoint = 0):
-        
+        """
+        Loads the scenario from input/<scenario> and sets up the agents and markets.
+        
+        usePowerplantFleet builds a PowerplantFleet that calculates the EOM
+        bids and the status update of all conventional power plants in one
+        vectorized pass. It is on by default because it reproduces the
+        per-unit path exactly: tests/test_powerplantFleet.py compares the
+        prices, the dispatch, the CRM commitments and the storage SOCs of both
+        paths bitwise, and the 672-step run of the 2030 scenario is identical
+        with the fleet on and off. The fleet reads the unit parameters once,
+        when it is built. Scripts that change them after loadScenario have to
+        pass usePowerplantFleet = False.
+        
+        useStorageFleet does the same for the EOM bids and the SOC transition
+        of the storages with a StorageFleet. It is on by default for the same
+        reason: tests/test_storageFleet.py compares it bitwise with the
+        per-unit path, and the 672-step run of the 2030 scenario is identical
+        with the fleet on and off. Its parameters are read once as well, pass
+        useStorageFleet = False to change them after loadScenario.
+        """
         self.scenario = scenario
+        self.inputStore = inputStore.InputStore(scenario) if useInputStore else None
         if self.simulationID == None:
             self.simulationID = '{}{}{}{}{}{}'.format(scenario,
                                                         '_Sto' if importStorages else '',
@@ -328,11 +518,7 @@ class World():
         # =====================================================================
         logger.info("Loading fuel data....")
         
-        fuelData = pd.read_csv('input/{}/Fuel.csv'.format(scenario),
-                               nrows = len(self.snapshots) + startingPoint,
-                               index_col = 0)
-        fuelData.drop(fuelData.index[0:startingPoint], inplace = True)
-        fuelData.reset_index(drop = True, inplace = True)
+        fuelData = self.readTimeseries('Fuel.csv', startingPoint, index_col = 0)
         self.fuelPrices=dict(fuelData)
         
         emissionData = pd.read_csv('input/{}/EmissionFactors.csv'.format(scenario), index_col=0)
@@ -360,12 +546,7 @@ class World():
         for powerplant, data in powerplantsList.iterrows():
             if checkAvailability:
                 try:
-                    availability= pd.read_csv('input/{}/Availability/{}.csv'.format(scenario,powerplant),
-                                            nrows = len(self.snapshots) + startingPoint,
-                                            index_col = 0)
-                    
-                    availability.drop(availability.index[0:startingPoint], inplace = True)
-                    availability.reset_index(drop = True, inplace = True)
+                    availability = self.readTimeseries('Availability/{}.csv'.format(powerplant), startingPoint, index_col = 0)
                     availability = availability.Total.to_list()
                     
                     self.agents[data['company']].addPowerplant(powerplant, availability = availability, **dict(data))
@@ -376,6 +557,11 @@ class World():
             else:
                 self.agents[data['company']].addPowerplant(powerplant,**dict(data))
         
+        self.costTables = costTables.CostTables(self, self.powerplants)
+        
+        if usePowerplantFleet:
+            self.powerplantFleet = powerplantFleet.PowerplantFleet(self, self.powerplants)
+        
         
         # =====================================================================
         # Adding storages     
@@ -391,6 +577,9 @@ class World():
                     
             for storage, data in storageList.iterrows():
                 self.agents[data['company']].addStorage(storage, **dict(data))
+                
+        if useStorageFleet:
+            self.storageFleet = storageFleet.StorageFleet(self, self.storages)
     
         
         # =====================================================================
@@ -409,11 +598,7 @@ class World():
                 self.agents[data['company']].addElectrolyzer(electrolyzer, **dict(data))
             
             #import industrial H2 demand
-            industrial_demand = pd.read_csv('input/{}/industrial_demand.csv'.format(scenario),
-                                nrows = len(self.snapshots) + startingPoint,
-                                )
-            industrial_demand.drop(industrial_demand.index[0:startingPoint], inplace = True)
-            industrial_demand.reset_index(drop = True, inplace = True)
+            industrial_demand = self.readTimeseries('industrial_demand.csv', startingPoint)
             self.industrial_demand = industrial_demand            
             
             logger.info("Electrolyzer list and Industrial hydrogen demand loaded.")
@@ -421,18 +606,16 @@ class World():
         # =====================================================================
         # Load renewable power generation  
         # =====================================================================
-        vrepowerplantFeedIn = pd.read_csv('input/{}/FES_DE.csv'.format(scenario),
-                                        index_col = 0,
-                                        nrows = len(self.snapshots) + startingPoint,
-                                        encoding = "Latin-1")
-        
-        vrepowerplantFeedIn.drop(vrepowerplantFeedIn.index[0:startingPoint], inplace = True)
-        vrepowerplantFeedIn.reset_index(drop = True, inplace = True)
+        vrepowerplantFeedIn = self.readTimeseries('FES_DE.csv', startingPoint, index_col = 0, encoding = "Latin-1")
         
         self.addAgent('Renewables')
         
-        for _ in vrepowerplantFeedIn:
-            self.agents['Renewables'].addVREPowerplant(_, FeedInTimeseries = vrepowerplantFeedIn[_].to_list())
+        if aggregateVRE:
+            self.agents['Renewables'].addVREPortfolio('Renewables', feedIn = vrepowerplantFeedIn)
+            
+        else:
+            for _ in vrepowerplantFeedIn:
+                self.agents['Renewables'].addVREPowerplant(_, FeedInTimeseries = vrepowerplantFeedIn[_].to_list())
                 
         logger.info("Agents and assets loaded.")
         
@@ -442,24 +625,11 @@ class World():
         # =====================================================================
         logger.info("Loading demand....")
         
-        demand = pd.read_csv('input/{}/IED_DE.csv'.format(scenario),
-                             nrows  =len(self.snapshots) + startingPoint,
-                             index_col = 0)
-        demand.drop(demand.index[0:startingPoint], inplace = True)
-        demand.reset_index(drop = True, inplace = True)
-        
-        demand_for_PFC = pd.read_csv('input/{}/IED_DE_for_PFC.csv'.format(scenario),
-                             nrows  =len(self.snapshots) + startingPoint,
-                             index_col = 0)
-        demand_for_PFC.drop(demand.index[0:startingPoint], inplace = True)
-        demand_for_PFC.reset_index(drop = True, inplace = True)
+        demand = self.readTimeseries('IED_DE.csv', startingPoint, index_col = 0)
+        demand_for_PFC = self.readTimeseries('IED_DE_for_PFC.csv', startingPoint, index_col = 0)
         
         if importCBT:
-            CBT = pd.read_csv('input/{}/CBT_DE.csv'.format(scenario),
-                              nrows = len(self.snapshots) + startingPoint,
-                              index_col = 0)
-            CBT.drop(CBT.index[0:startingPoint], inplace = True)
-            CBT.reset_index(drop = True, inplace = True)
+            CBT = self.readTimeseries('CBT_DE.csv', startingPoint, index_col = 0)
             
             self.addMarket('EOM_DE','EOM', demand=dict(demand['demand']), CBtrades = CBT)
             
@@ -473,11 +643,7 @@ class World():
         if importDHM:
             logger.info("Loading District heating demand....")
             
-            HLP_DH = pd.read_csv('input/{}/HLP_DH_DE.csv'.format(scenario),
-                                 nrows = len(self.snapshots) + startingPoint,
-                                 index_col = 0)
-            HLP_DH.drop(HLP_DH.index[0:startingPoint], inplace = True)
-            HLP_DH.reset_index(drop = True, inplace = True)
+            HLP_DH = self.readTimeseries('HLP_DH_DE.csv', startingPoint, index_col = 0)
                         
             annualDemand = pd.read_csv('input/{}/DH_DE.csv'.format(scenario),
                                        index_col=0)
@@ -492,11 +658,7 @@ class World():
         if importCRM:
             logger.info("Loading control reserve demand....")
             
-            CRM = pd.read_csv('input/{}/CRM_DE.csv'.format(scenario),
-                              nrows = len(self.snapshots) + startingPoint,
-                              index_col = 0)
-            CRM.drop(CRM.index[0:startingPoint], inplace = True)
-            CRM.reset_index(drop = True, inplace = True)
+            CRM = self.readTimeseries('CRM_DE.csv', startingPoint, index_col = 0)
             
             CRMdemand = {"posCRMDemand":dict(CRM['positive Demand [MW]']),
                          "negCRMDemand":dict(CRM['negative Demand [MW]']),
@@ -512,22 +674,44 @@ class World():
         # Calculate prce forward curve using simple merit order
         # =====================================================================
         if meritOrder:
-            logger.info("Calculating PFC....")
-            
-            meritOrder = MeritOrder.MeritOrder(demand_for_PFC,
-                                               powerplantsList,
-                                               vrepowerplantFeedIn,
-                                               self.fuelPrices,
-                                               self.emissionFactors,
-                                               self.snapshots)
-            self.dictPFC = meritOrder.PFC()
+            cache = pfcCache.PFCCache(scenario, startingPoint, len(self.snapshots)) if cachePFC else None
+            cachedPFC = cache.load() if cachePFC else None
+            
+            if cachedPFC is not None:
+                logger.info("Loading PFC from cache {}....".format(cache.path))
+                self.dictPFC = cachedPFC
+                
+            else:
+                logger.info("Calculating PFC....")
+                
+                meritOrder = MeritOrder.MeritOrder(demand_for_PFC,
+                                                   powerplantsList,
+                                                   vrepowerplantFeedIn,
+                                                   self.fuelPrices,
+                                                   self.emissionFactors,
+                                                   self.snapshots)
+                self.dictPFC = meritOrder.PFC()
+                
+                if cachePFC:
+                    cache.save(self.dictPFC)
+                    
             self.PFC = self.dictPFC.copy()
             PFC_export = list([round(p, 2) for p in self.PFC])
             data = {'PFC': PFC_export}
             df = pd.DataFrame(data)
-            df.to_csv('output/PFC_export.csv', index=True)
+            df.to_csv('output/PFC_export.csv' if self.outputDirectory is None else self.outputPath('PFC_export.csv'), index=True)
             logger.info("Merit Order calculated.")
             
+        self.pfcIndex = pfcIndex.PFCIndex(self)
+        
+        if self.streamResults and not self.writeResultsToDB:
+            self.resultsStream = resultsStore.StreamingResultsWriter(self,
+                                                                     self.outputPath('results'),
+                                                                     chunkSize = self.resultsChunkSize)
+            
+        if self.profiler is not None:
+            self.profiler.instrumentWorld(self)
+            
             
         
 if __name__ == "__main__":
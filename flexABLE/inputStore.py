@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar binary store for the time series input files of a scenario.
+
+Every time series CSV is converted once into one .npy file per column. Loading
+memory-maps those files and slices exactly the simulated snapshots, so the CSV
+is neither parsed nor copied on later runs. A converted file is refreshed
+automatically when the size or modification time of its CSV changes, or
+when its metadata can not be read. All files are written to temporary paths
+and moved into place, the metadata last, so an interrupted conversion is
+converted again on the next run.
+
+The store can be prepared ahead of a run with
+    python -m flexABLE.inputStore 2030
+
+@author: intgridnb-02
+"""
+import json
+import os
+import sys
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("flexABLE")
+
+
+class InputStore():
+    """
+    The read arguments of the time series files as used in World.loadScenario.
+    Availability files are read with index_col = 0.
+    """
+    
+    timeseriesFiles = {'Fuel.csv': {'index_col': 0},
+                       'FES_DE.csv': {'index_col': 0, 'encoding': 'Latin-1'},
+                       'IED_DE.csv': {'index_col': 0},
+                       'IED_DE_for_PFC.csv': {'index_col': 0},
+                       'CBT_DE.csv': {'index_col': 0},
+                       'HLP_DH_DE.csv': {'index_col': 0},
+                       'CRM_DE.csv': {'index_col': 0},
+                       'industrial_demand.csv': {}}
+    
+    def __init__(self, scenario, directory = 'output/input_store'):
+        self.scenario = scenario
+        self.inputDirectory = 'input/{}'.format(scenario)
+        self.directory = os.path.join(directory, str(scenario))
+        
+        
+    def read(self, fileName, startingPoint, length, **kwargs):
+        """
+        Returns rows [startingPoint:startingPoint + length] of the given CSV as
+        a DataFrame with a RangeIndex, which matches reading the file with
+        pd.read_csv(nrows = startingPoint + length, **kwargs), dropping the
+        first startingPoint rows and resetting the index.
+        
+        The columns are read-only memory maps opened in copy-on-write mode,
+        writing to them never changes the files on disk.
+        """
+        meta = self.convert(fileName, **kwargs)
+        
+        if meta is None:
+            data = pd.read_csv(os.path.join(self.inputDirectory, fileName), nrows = startingPoint + length, **kwargs)
+            data.drop(data.index[0:startingPoint], inplace = True)
+            data.reset_index(drop = True, inplace = True)
+            return data
+        
+        path = self.storePath(fileName)
+        columns = {}
+        
+        for i, column in enumerate(meta['columns']):
+            values = np.load(os.path.join(path, '{}.npy'.format(i)), mmap_mode = 'c')
+            columns[column] = values[startingPoint:startingPoint + length]
+            
+        return pd.DataFrame(columns, copy = False)
+    
+    
+    def storePath(self, fileName):
+        return os.path.join(self.directory, os.path.splitext(fileName)[0])
+    
+    
+    def convert(self, fileName, **kwargs):
+        """
+        Converts a CSV file into the store unless an up to date version exists
+        and returns its metadata. Returns None if the file contains non numeric
+        columns, such files are always read from the CSV.
+        """
+        source = os.stat(os.path.join(self.inputDirectory, fileName))
+        path = self.storePath(fileName)
+        metaPath = os.path.join(path, 'meta.json')
+        
+        if os.path.exists(metaPath):
+            try:
+                with open(metaPath) as f:
+                    meta = json.load(f)
+                    
+                if meta['size'] == source.st_size and meta['mtime'] == source.st_mtime_ns and meta['kwargs'] == kwargs:
+                    return meta if meta['numeric'] else None
+                
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.warning("Unreadable metadata of {} in the binary input store, converting it again".format(fileName))
+        
+        logger.info("Converting {} into the binary input store....".format(fileName))
+        data = pd.read_csv(os.path.join(self.inputDirectory, fileName), **kwargs)
+        numeric = all(np.issubdtype(dtype, np.number) for dtype in data.dtypes)
+        
+        os.makedirs(path, exist_ok = True)
+        
+        if numeric:
+            for i, column in enumerate(data):
+                columnPath = os.path.join(path, '{}.npy'.format(i))
+                tempPath = os.path.join(path, '{}.{}.tmp.npy'.format(i, os.getpid()))
+                np.save(tempPath, data[column].to_numpy())
+                os.replace(tempPath, columnPath)
+                
+        meta = {'columns': list(data.columns),
+                'numeric': numeric,
+                'size': source.st_size,
+                'mtime': source.st_mtime_ns,
+                'kwargs': kwargs}
+        
+        tempPath = '{}.{}.tmp'.format(metaPath, os.getpid())
+        with open(tempPath, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tempPath, metaPath)
+        
+        return meta if numeric else None
+    
+    
+    def convertScenario(self):
+        """
+        Converts all time series files of the scenario folder that exist,
+        including the availability files.
+        """
+        for fileName, kwargs in self.timeseriesFiles.items():
+            if os.path.exists(os.path.join(self.inputDirectory, fileName)):
+                self.convert(fileName, **kwargs)
+                
+        availabilityDirectory = os.path.join(self.inputDirectory, 'Availability')
+        if os.path.isdir(availabilityDirectory):
+            for fileName in sorted(os.listdir(availabilityDirectory)):
+                if fileName.endswith('.csv'):
+                    self.convert(os.path.join('Availability', fileName), index_col = 0)
+                    
+                    
+if __name__ == "__main__":
+    logging.basicConfig(level = logging.INFO)
+    
+    for scenario in sys.argv[1:]:
+        InputStore(scenario).convertScenario()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent on-disk cache of the price forward curve (PFC).
+
+The PFC only depends on the scenario input files used by the merit order,
+the starting point and the number of snapshots. Those are hashed and the
+resulting curve is stored as a binary numpy file, so repeated runs of the
+same scenario can skip the merit order calculation.
+
+@author: intgridnb-02
+"""
+import hashlib
+import os
+import logging
+
+import numpy as np
+
+logger = logging.getLogger("flexABLE")
+
+
+class PFCCache():
+    """
+    The cache key is the SHA-256 hash of the relevant input files, the starting
+    point, the snapshot length and a version tag, which has to be increased
+    whenever the merit order calculation changes its results.
+    """
+    
+    version = 1
+    inputFiles = ['IED_DE_for_PFC.csv', 'FPP_DE.csv', 'FES_DE.csv', 'Fuel.csv', 'EmissionFactors.csv']
+    
+    def __init__(self, scenario, startingPoint, snapLength, directory = 'output/PFC_cache'):
+        self.scenario = scenario
+        self.startingPoint = startingPoint
+        self.snapLength = snapLength
+        self.directory = directory
+        
+        self.key = self.calculateKey()
+        self.path = os.path.join(self.directory, '{}_{}.npy'.format(self.scenario, self.key[:16]))
+        
+        
+    def calculateKey(self):
+        sha = hashlib.sha256()
+        sha.update('v{};{};{}'.format(self.version, self.startingPoint, self.snapLength).encode())
+        
+        for fileName in self.inputFiles:
+            sha.update(fileName.encode())
+            with open('input/{}/{}'.format(self.scenario, fileName), 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+                    
+        return sha.hexdigest()
+    
+    
+    def load(self):
+        """
+        Returns the cached PFC as a list, or None if there is no valid entry.
+        """
+        if not os.path.exists(self.path):
+            return None
+        
+        try:
+            pfc = np.load(self.path)
+        except (OSError, ValueError):
+            logger.warning('PFC cache file {} could not be read and is ignored.'.format(self.path))
+            return None
+        
+        if len(pfc) != self.snapLength:
+            return None
+        
+        return pfc.tolist()
+    
+    
+    def save(self, pfc):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+            
+        # Written to a temporary file of this process first, so neither an interrupted run nor
+        # parallel runs saving the same entry ever leave a truncated file
+        tempPath = self.path[:-len('.npy')] + '.{}.tmp.npy'.format(os.getpid())
+        np.save(tempPath, np.asarray(pfc, dtype = np.float64))
+        os.replace(tempPath, self.path)
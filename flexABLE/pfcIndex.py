@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Windowed lookups over the price forward curve.
+
+@author: intgridnb-02
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class PFCIndex():
+    """
+    Price windows over the price forward curve as arrays, without slicing and
+    concatenating world.dictPFC. Windows running past the end of the
+    simulation horizon wrap around to its start, like the slicing of
+    world.dictPFC in Powerplant.specificRevenueEOM.
+
+    The EOM overwrites world.dictPFC with the cleared price of every step,
+    prices from the current step on are still the forecast. Window parts before
+    the current step, i.e. the wrapped part at the end of the horizon, are
+    therefore read directly from world.dictPFC.
+
+    The centred average prices of the storages only use the forecast, they
+    are computed for all steps at once per foresight and shared by all units.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.forecast = np.array(world.PFC, dtype = np.float64)
+        self.averagePriceArrays = {}
+
+
+    def __len__(self):
+        return len(self.forecast)
+
+
+    def windows(self, t, foresight):
+        """
+        Returns the window [t, t + foresight) as (start, end) ranges on the horizon.
+        """
+        end = t + foresight
+
+        if end > len(self):
+            return [(t, len(self)), (0, end - len(self))]
+
+        return [(t, end)]
+
+
+    def averagePrices(self, foresight):
+        """
+        Mean forecast prices of the windows [t - foresight, t + foresight) of
+        all steps, wrapping around both ends of the horizon, same as
+        Storage.calculateBidEOM.
+        """
+        if foresight not in self.averagePriceArrays:
+            positions = np.arange(-foresight, len(self) + foresight) % len(self)
+            windows = sliding_window_view(self.forecast[positions], 2 * foresight)[:len(self)]
+            self.averagePriceArrays[foresight] = windows.mean(axis = 1)
+
+        return self.averagePriceArrays[foresight]
+
+
+    def averagePrice(self, t, foresight):
+        return self.averagePrices(foresight)[t]
+
+
+    def windowPrices(self, t, foresight):
+        prices = []
+
+        for start, end in self.windows(t, foresight):
+            cleared = min(max(self.world.currstep, start), end)
+            prices.extend(self.world.dictPFC[start:cleared])
+            prices.extend(self.forecast[cleared:end])
+
+        return np.array(prices, dtype = np.float64)
+
+
+    def specificRevenue(self, t, foresight, marginalCosts, horizon = 'all'):
+        """
+        Specific revenue of one MW over the foresight window, same as
+        Powerplant.specificRevenueEOM. 'positive' and 'negative' only count
+        the steps with a price above or below the marginal costs.
+
+        The revenue is rounded to 2 decimals, so it has to be bitwise equal to
+        the list based sum to give the same bids. The margins are calculated
+        per step as (price - marginalCosts) * dt and summed sequentially with
+        cumsum, a prefix sum over the prices or np.sum (pairwise summation)
+        can flip the rounding. The sum stays a numpy float like the sum over
+        the prices read by pandas, round() of a numpy float rounds halves
+        differently than the builtin round of a float.
+        """
+        margins = (self.windowPrices(t, foresight) - marginalCosts) * self.world.dt
+
+        if horizon == 'positive':
+            margins = margins[margins > 0]
+        elif horizon == 'negative':
+            margins = margins[margins < 0]
+
+        return round(np.cumsum(margins)[-1], 2) if len(margins) else 0
@@ -5,10 +5,20 @@ Created on Sun Apr  19 16:06:57 2020
 @author: intgridnb-02
 """
 from .auxFunc import initializer
-from .bid import Bid
+from .bid import Bid, SENT, CONFIRMED, PARTIALLY_CONFIRMED, MR_EOM, FLEX_EOM, STEAM, AUX_FIRING, CRM_POS, CRM_NEG
+from .powerplantFleet import FleetAttribute
+from .timeSeries import TimeSeries, PairTimeSeries
 
 class Powerplant():
     
+    # Set when the unit is part of a PowerplantFleet, the status attributes are then stored in the fleet
+    fleet = None
+    costIndex = None
+    maxPower = FleetAttribute()
+    currentStatus = FleetAttribute()
+    currentDowntime = FleetAttribute()
+    meanMarketSuccess = FleetAttribute()
+    
     @initializer
     def __init__(self,
                  agent = None,
@@ -43,15 +53,15 @@ class Powerplant():
         self.foresight = int(self.minDowntime)
         
         # bids status parameters
-        self.dictCapacity = {n:0 for n in self.world.snapshots}
-        self.dictCapacityMR = {n:(0,0) for n in self.world.snapshots}
-        self.dictCapacityFlex = {n:(0,0) for n in self.world.snapshots}
-        self.dictCapacity[-1] = self.maxPower/2
+        self.dictCapacity = TimeSeries.allocate(len(self.world.snapshots), initial = self.maxPower/2)
+        self.dictCapacityMR = PairTimeSeries.allocate(len(self.world.snapshots))
+        self.dictCapacityFlex = PairTimeSeries.allocate(len(self.world.snapshots))
         
-        self.confQtyCRM_neg = {n:0 for n in self.world.snapshots}
-        self.confQtyCRM_pos = {n:0 for n in self.world.snapshots}
-        self.confQtyDHM_steam = {n:0 for n in self.world.snapshots}
-        self.powerLoss_CHP = {n:0 for n in self.world.snapshots}
+        # CRM commitments of the last block may reach behind the last snapshot
+        self.confQtyCRM_neg = TimeSeries.allocate(len(self.world.snapshots), spare = self.crmTime)
+        self.confQtyCRM_pos = TimeSeries.allocate(len(self.world.snapshots), spare = self.crmTime)
+        self.confQtyDHM_steam = TimeSeries.allocate(len(self.world.snapshots))
+        self.powerLoss_CHP = TimeSeries.allocate(len(self.world.snapshots))
         self.maxExtraction /= self.world.dt
         
         self.emission = self.world.emissionFactors[self.fuel] if self.emission is None else self.emission
@@ -79,13 +89,13 @@ class Powerplant():
         self.dictCapacity[self.world.currstep] = 0
         
         for bid in self.sentBids:
-            if 'mrEOM' in bid.ID or 'flexEOM' in bid.ID:
+            if bid.kind == MR_EOM:
                 self.dictCapacity[self.world.currstep] += bid.confirmedAmount
+                self.dictCapacityMR[self.world.currstep] = (bid.confirmedAmount, bid.price)
                 
-                if 'mrEOM' in bid.ID:
-                    self.dictCapacityMR[self.world.currstep] = (bid.confirmedAmount, bid.price)
-                else:
-                    self.dictCapacityFlex[self.world.currstep] = (bid.confirmedAmount, bid.price)
+            elif bid.kind == FLEX_EOM:
+                self.dictCapacity[self.world.currstep] += bid.confirmedAmount
+                self.dictCapacityFlex[self.world.currstep] = (bid.confirmedAmount, bid.price)
         
         #change crm capacity every 4 hours (CRM market clearing time)
         if self.world.currstep % self.crmTime:
@@ -137,27 +147,17 @@ class Powerplant():
         
         
     def feedback(self, bid):
-        if bid.status == "Confirmed":
-            if 'CRMPosDem' in bid.ID:
-                self.confQtyCRM_pos.update({self.world.currstep+_:bid.confirmedAmount for _ in range(self.crmTime)})
-                
-            if 'CRMNegDem' in bid.ID:
-                self.confQtyCRM_neg.update({self.world.currstep+_:bid.confirmedAmount for _ in range(self.crmTime)})
-                
-            if 'steam' in bid.ID:
-                self.confQtyDHM_steam[self.world.currstep] = bid.confirmedAmount
-            
-        elif bid.status =="PartiallyConfirmed":
-            if 'CRMPosDem' in bid.ID:
+        if bid.status == CONFIRMED or bid.status == PARTIALLY_CONFIRMED:
+            if bid.kind == CRM_POS:
                 self.confQtyCRM_pos.update({self.world.currstep+_:bid.confirmedAmount for _ in range(self.crmTime)})
                 
-            if 'CRMNegDem' in bid.ID:
+            elif bid.kind == CRM_NEG:
                 self.confQtyCRM_neg.update({self.world.currstep+_:bid.confirmedAmount for _ in range(self.crmTime)})
                 
-            if 'steam' in bid.ID:
+            elif bid.kind == STEAM:
                 self.confQtyDHM_steam[self.world.currstep] = bid.confirmedAmount
                     
-        if 'steam' in bid.ID:
+        if bid.kind == STEAM:
             self.powerLossFPP(self.world.currstep, bid)
             
         self.sentBids.append(bid)
@@ -177,23 +177,29 @@ class Powerplant():
             return bids
         
         if market=="EOM":
-            bidQuantity_mr, bidPrice_mr, bidQuantity_flex, bidPrice_flex = self.calculateBidEOM(t)
+            if self.fleet is None:
+                bidQuantity_mr, bidPrice_mr, bidQuantity_flex, bidPrice_flex = self.calculateBidEOM(t)
+            else:
+                bidQuantity_mr, bidPrice_mr, bidQuantity_flex, bidPrice_flex = self.fleet.requestBidEOM(self.fleetIndex, t)
             
             bids.append(Bid(issuer = self,
-                            ID = "{}_mrEOM".format(self.name),
                             price = bidPrice_mr,
                             amount = bidQuantity_mr,
-                            status = "Sent",
+                            status = SENT,
                             bidType = "Supply",
-                            node = self.node))
+                            node = self.node,
+                            kind = MR_EOM))
             
             bids.append(Bid(issuer = self,
-                            ID = "{}_flexEOM".format(self.name),
                             price = bidPrice_flex,
                             amount = bidQuantity_flex,
-                            status = "Sent",
+                            status = SENT,
                             bidType = "Supply",
-                            node = self.node))
+                            node = self.node,
+                            kind = FLEX_EOM))
+            
+            if self.fleet is not None:
+                self.fleet.sentBidsEOM[self.fleetIndex] = bids
             
         elif market=="DHM": 
             bids.extend(self.calculateBidDHM(t))
@@ -207,6 +213,13 @@ class Powerplant():
         return bids
     
     
+    def fuelPrice(self, fuel, t):
+        if self.costIndex is not None:
+            return self.world.costTables.fuelPrices[fuel].item(t)
+        
+        return self.world.fuelPrices[fuel][t]
+    
+    
     def marginalCostsFPP(self, t, efficiencyDependence, passedCapacity):
         """
         Parameters
@@ -224,9 +237,6 @@ class Powerplant():
             DESCRIPTION.
         """
     
-        fuelPrice = self.world.fuelPrices[self.fuel][t]
-        co2price = self.world.fuelPrices['co2'][t]
-    
         if t > 0:
             if passedCapacity > 0:
                 currentCapacity = passedCapacity
@@ -237,6 +247,15 @@ class Powerplant():
         else:
             currentCapacity = self.maxPower
     
+        if self.costIndex is not None:
+            if efficiencyDependence:
+                return self.world.costTables.marginalCosts(self.costIndex, t, currentCapacity / self.maxPower)
+            
+            return self.world.costTables.baseCosts.item(self.costIndex, t)
+        
+        fuelPrice = self.world.fuelPrices[self.fuel][t]
+        co2price = self.world.fuelPrices['co2'][t]
+        
         # Efficiency dependent marginal cost
         marginalCosts = (fuelPrice / self.efficiency) + (co2price * (self.emission / self.efficiency)) + self.variableCosts
     
@@ -338,7 +357,7 @@ class Powerplant():
                 priceReduction_restart = startingCosts / avgDT / abs(bidQuantity_mr)
                 
                 if self.confQtyDHM_steam[t] > 0:
-                    eqHeatGenCosts = (self.confQtyDHM_steam[t] * (self.world.fuelPrices['natural gas'][t]/ 0.9)) / abs(bidQuantity_mr)
+                    eqHeatGenCosts = (self.confQtyDHM_steam[t] * (self.fuelPrice('natural gas', t)/ 0.9)) / abs(bidQuantity_mr)
                     
                 else:
                     eqHeatGenCosts = 0.00
@@ -415,41 +434,41 @@ class Powerplant():
     
             # Evaluation of heat price (EUR/MWh)
             heatPrice_process = round(powerLossRatio * self.marginalCostsFPP(t,0,0), 2)
-            heatPrice_auxFiring = round(self.world.fuelPrices['natural gas'][t] / 0.9, 2)
+            heatPrice_auxFiring = round(self.fuelPrice('natural gas', t) / 0.9, 2)
 
             # Create district heating bids
             bidsDHM.append(Bid(issuer = self,
-                               ID = "Bu{}t{}_steam".format(self.name,t),
                                price = heatPrice_process,
                                amount = heatExtraction_process,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = STEAM))
             
             bidsDHM.append(Bid(issuer = self,
-                               ID = "Bu{}t{}_auxFi".format(self.name,t),
                                price = heatPrice_auxFiring,
                                amount = heatExtraction_auxFiring,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = AUX_FIRING))
             
         else:
             bidsDHM.append(Bid(issuer = self,
-                               ID = "Bu{}t{}_steam".format(self.name,t),
                                price = 0,
                                amount = 0,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = STEAM))
             
             bidsDHM.append(Bid(issuer = self,
-                               ID = "Bu{}t{}_auxFi".format(self.name,t),
                                price = 0,
                                amount = 0,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = AUX_FIRING))
     
         return bidsDHM
 
@@ -480,23 +499,23 @@ class Powerplant():
             energyPrice = self.marginalCostsFPP(t, 1, 0)
 
             bidsCRM.append(Bid(issuer=self,
-                               ID = "Bu{}t{}_CRMPosDem".format(self.name,t),
                                price = capacityPrice,
                                amount = bidQuantityBPM_pos,
                                energyPrice = energyPrice,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = CRM_POS))
 
         else:
             bidsCRM.append(Bid(issuer=self,
-                               ID = "Bu{}t{}_CRMPosDem".format(self.name,t),
                                price = 0,
                                amount = 0,
                                energyPrice = 0,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = CRM_POS))
     
         return bidsCRM
 
@@ -523,27 +542,30 @@ class Powerplant():
             energyPrice = -self.marginalCostsFPP(t,  1, 0)
 
             bidsCRM.append(Bid(issuer=self,
-                               ID = "Bu{}t{}_CRMNegDem".format(self.name,t),
                                price = capacityPrice,
                                amount = bidQtyCRM_neg,
                                energyPrice = energyPrice,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = CRM_NEG))
         else:
             bidsCRM.append(Bid(issuer=self,
-                               ID = "Bu{}t{}_CRMNegDem".format(self.name,t),
                                price = 0,
                                amount = 0,
                                energyPrice = 0,
-                               status = "Sent",
+                               status = SENT,
                                bidType = "Supply",
-                               node = self.node))
+                               node = self.node,
+                               kind = CRM_NEG))
 
         return bidsCRM
 
 
     def specificRevenueEOM(self, t, foresight, marginalCosts, horizon):
+        if self.world.pfcIndex is not None:
+            return self.world.pfcIndex.specificRevenue(t, foresight, marginalCosts, horizon)
+        
         listPFC = []
         
         if t + foresight > len(self.world.dictPFC):
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized state and EOM bid calculation for the conventional power plants.
+
+@author: intgridnb-02
+"""
+import numpy as np
+
+from .auxFunc import roundArray
+from .timeSeries import TimeSeries, PairTimeSeries
+
+
+class FleetAttribute():
+    """
+    Scalar attribute of a unit. It is stored on the unit itself and, once the
+    unit is part of a fleet, in the fleet array of the same name.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+
+    def __get__(self, unit, owner = None):
+        if unit is None:
+            return self
+
+        if unit.fleet is None:
+            try:
+                return unit.__dict__[self.name]
+            except KeyError:
+                raise AttributeError(self.name)
+
+        return getattr(unit.fleet, self.name).item(unit.fleetIndex)
+
+
+    def __set__(self, unit, value):
+        if unit.fleet is None:
+            unit.__dict__[self.name] = value
+        else:
+            getattr(unit.fleet, self.name)[unit.fleetIndex] = value
+
+
+class PowerplantFleet():
+    """
+    Holds the parameters and the time series state of all conventional power
+    plants in arrays with one row per unit, and calculates the EOM bids and the
+    status update of the whole fleet in one vectorized pass per step.
+
+    The Powerplant objects stay in place as thin views on their row: the
+    per-snapshot TimeSeries become views on the fleet arrays and the status attributes
+    are FleetAttributes, so CRM and DHM bids and the result export work on
+    them unchanged. Parameters are read once, when the fleet is built.
+    """
+
+    maxDowntime_hotStart = 32 # represents 8h in 15min res
+    maxDowntime_warmStart = 192
+
+    def __init__(self, world, units):
+        self.world = world
+        self.units = list(units)
+
+        n = len(self.units)
+        length = len(self.world.snapshots)
+        self.crmTime = int(4 / self.world.dt)
+
+        def parameter(name):
+            return np.array([getattr(unit, name) for unit in self.units], dtype = np.float64)
+
+        # the time series of the units have the same layout as a fleet row
+        def series(name, columns = length):
+            data = np.zeros((n, columns))
+            for i, unit in enumerate(self.units):
+                values = getattr(unit, name).data
+                data[i, :len(values)] = values[:columns]
+            return data
+
+        def pairSeries(name):
+            data = np.zeros((n, length, 2))
+            for i, unit in enumerate(self.units):
+                data[i, :, 0], data[i, :, 1] = getattr(unit, name).array()
+            return data
+
+        # Parameters
+        self.minPower = parameter('minPower')
+        self.rampUp = parameter('rampUp')
+        self.rampDown = parameter('rampDown')
+        self.hotStartCosts = parameter('hotStartCosts')
+        self.warmStartCosts = parameter('warmStartCosts')
+        self.coldStartCosts = parameter('coldStartCosts')
+        self.minOperatingTime = parameter('minOperatingTime')
+        self.minDowntime = parameter('minDowntime')
+        self.maxAvailability = np.array([unit.maxAvailability for unit in self.units], dtype = np.float64).reshape(n, length)
+
+        self.costTables = self.world.costTables
+        self.costRows = np.array([unit.costIndex for unit in self.units], dtype = np.intp)
+
+        # Status
+        self.maxPower = parameter('maxPower')
+        self.currentStatus = parameter('currentStatus').astype(np.int8)
+        self.currentDowntime = parameter('currentDowntime')
+        self.meanMarketSuccess = parameter('meanMarketSuccess')
+
+        # Time series, the capacity has an extra first column for t = -1
+        self.capacity = series('dictCapacity', length + 1)
+        self.capacityMR = pairSeries('dictCapacityMR')
+        self.capacityFlex = pairSeries('dictCapacityFlex')
+        self.confQtyCRM_pos = series('confQtyCRM_pos', length + self.crmTime)
+        self.confQtyCRM_neg = series('confQtyCRM_neg', length + self.crmTime)
+        self.confQtyDHM_steam = series('confQtyDHM_steam')
+        self.powerLoss_CHP = series('powerLoss_CHP')
+
+        for i, unit in enumerate(self.units):
+            for name in ('maxPower', 'currentStatus', 'currentDowntime', 'meanMarketSuccess'):
+                unit.__dict__.pop(name, None)
+
+            unit.fleet = self
+            unit.fleetIndex = i
+            unit.dictCapacity = TimeSeries(self.capacity[i], length, offset = 1)
+            unit.dictCapacityMR = PairTimeSeries(self.capacityMR[i, :, 0], self.capacityMR[i, :, 1], length)
+            unit.dictCapacityFlex = PairTimeSeries(self.capacityFlex[i, :, 0], self.capacityFlex[i, :, 1], length)
+            unit.confQtyCRM_pos = TimeSeries(self.confQtyCRM_pos[i], length)
+            unit.confQtyCRM_neg = TimeSeries(self.confQtyCRM_neg[i], length)
+            unit.confQtyDHM_steam = TimeSeries(self.confQtyDHM_steam[i], length)
+            unit.powerLoss_CHP = TimeSeries(self.powerLoss_CHP[i], length)
+
+        # EOM bids calculated for bidStep and the bids sent by each unit in the current step
+        self.bidStep = None
+        self.bidsEOM = [None] * n
+        self.sentBidsEOM = [None] * n
+
+
+    def checkAvailability(self, t):
+        self.maxPower[:] = self.maxAvailability[:, t]
+        self.bidStep = None
+
+
+    def requestBidEOM(self, index, t):
+        """
+        Returns (bidQuantity_mr, bidPrice_mr, bidQuantity_flex, bidPrice_flex)
+        of one unit, the bids of the whole fleet are calculated on the first
+        request of a step.
+        """
+        if self.bidStep != t:
+            self.calculateBidsEOM(t)
+
+        return self.bidsEOM[index]
+
+
+    def startingCosts(self, downtime):
+        return np.where(downtime < self.maxDowntime_hotStart, self.hotStartCosts,
+                        np.where(downtime < self.maxDowntime_warmStart, self.warmStartCosts, self.coldStartCosts))
+
+
+    def marginalCosts(self, t, passedCapacity):
+        """
+        Partial load efficiency dependent marginal costs of all units, same as
+        Powerplant.marginalCostsFPP(t, 1, passedCapacity).
+        """
+        if t > 0:
+            lastCapacity = self.capacity[:, t]
+            currentCapacity = np.where(passedCapacity > 0, passedCapacity,
+                                       np.where(lastCapacity >= self.minPower, lastCapacity, self.maxPower))
+        else:
+            currentCapacity = self.maxPower
+
+        return self.costTables.marginalCostsArray(self.costRows, t, currentCapacity / self.maxPower)
+
+
+    def calculateBidsEOM(self, t):
+        """
+        Vectorized Powerplant.calculateBidEOM for all units of the fleet.
+        """
+        lastCapacity = self.capacity[:, t]
+        confQtyCRM_pos = self.confQtyCRM_pos[:, t]
+        confQtyCRM_neg = self.confQtyCRM_neg[:, t]
+        confQtyDHM_steam = self.confQtyDHM_steam[:, t]
+        powerLoss_CHP = self.powerLoss_CHP[:, t]
+
+        isOn = self.currentStatus != 0
+        canBid = isOn | (self.currentDowntime >= self.minDowntime)
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            # =============================================================================
+            # Calculating possible bid amount
+            # =============================================================================
+            mustRunPowerFPP = np.maximum(lastCapacity - self.rampDown + confQtyCRM_neg, self.minPower + confQtyCRM_neg)
+            bidQuantity_mr = np.where(mustRunPowerFPP > 0, mustRunPowerFPP, 0.)
+
+            flexPowerFPP = np.minimum(lastCapacity + self.rampUp - confQtyCRM_pos - mustRunPowerFPP,
+                                      self.maxPower - powerLoss_CHP - confQtyCRM_pos - mustRunPowerFPP)
+            bidQuantity_flex = np.where(flexPowerFPP > 0, flexPowerFPP, 0.)
+            totalOutputCapacity = mustRunPowerFPP + flexPowerFPP
+
+            marginalCosts_total = self.marginalCosts(t, totalOutputCapacity)
+
+            # =============================================================================
+            # Units that are off add a start-up markup to the marginal costs
+            # =============================================================================
+            averageOperatingTime = np.maximum(np.maximum(self.meanMarketSuccess, self.minOperatingTime), 1)
+            markup = self.startingCosts(self.currentDowntime) / averageOperatingTime / bidQuantity_mr
+            bidPriceOff_mr = np.minimum(self.marginalCosts(t, mustRunPowerFPP) + markup, 3000.12)
+
+            # =============================================================================
+            # Units that are on reduce the price by the restart costs they avoid
+            # =============================================================================
+            avgDT = np.maximum(self.minDowntime, 1)
+            priceReduction_restart = self.startingCosts(avgDT) / avgDT / np.abs(bidQuantity_mr)
+            eqHeatGenCosts = np.where(confQtyDHM_steam > 0,
+                                      (confQtyDHM_steam * (self.costTables.fuelPrices['natural gas'][t] / 0.9)) / np.abs(bidQuantity_mr),
+                                      0.)
+
+            marginalCosts_eta = marginalCosts_total.copy()
+            for i in np.flatnonzero(isOn & (self.world.dictPFC[t] < marginalCosts_total)):
+                unit = self.units[i]
+                if unit.specificRevenueEOM(t, unit.foresight, marginalCosts_total.item(i), 'all') >= 0:
+                    marginalCosts_eta[i] = 0
+
+            bidPriceOn_mr = np.maximum(-priceReduction_restart - eqHeatGenCosts + marginalCosts_eta, -2999.00)
+
+            # Flex-bid price formulation
+            powerLossRatio = np.where(confQtyDHM_steam > 0, roundArray(powerLoss_CHP / confQtyDHM_steam, 2), 0.)
+            bidPrice_flex = np.where(np.abs(bidQuantity_flex) > 0, (1 - powerLossRatio) * marginalCosts_total, 0.)
+
+        bids = np.where(canBid, [bidQuantity_mr, np.where(isOn, bidPriceOn_mr, bidPriceOff_mr), bidQuantity_flex, bidPrice_flex], 0.)
+        self.bidsEOM = list(zip(*bids.tolist()))
+
+        # Must-run bids below the minimum bid are left to the unit itself
+        for i in np.flatnonzero(canBid & (bidQuantity_mr < self.world.minBidEOM)):
+            self.bidsEOM[i] = self.units[i].calculateBidEOM(t)
+
+        self.bidStep = t
+
+
+    def step(self):
+        """
+        Vectorized Powerplant.step for all units of the fleet.
+        """
+        t = self.world.currstep
+        capacity = np.zeros(len(self.units))
+
+        for i, bids in enumerate(self.sentBidsEOM):
+            if bids is not None:
+                bid_mr, bid_flex = bids
+                capacity[i] = bid_mr.confirmedAmount + bid_flex.confirmedAmount
+                self.capacityMR[i, t] = (bid_mr.confirmedAmount, bid_mr.price)
+                self.capacityFlex[i, t] = (bid_flex.confirmedAmount, bid_flex.price)
+
+        #change crm capacity every 4 hours (CRM market clearing time)
+        if t % self.crmTime:
+            self.confQtyCRM_pos[:, t] = self.confQtyCRM_pos[:, t - 1]
+            self.confQtyCRM_neg[:, t] = self.confQtyCRM_neg[:, t - 1]
+
+        capacity[capacity < 0] = 0
+
+        # Calculates market success
+        for i, unit in enumerate(self.units):
+            if capacity[i] > 0:
+                unit.marketSuccess[-1] += 1
+            elif unit.marketSuccess[-1] != 0:
+                self.meanMarketSuccess[i] = sum(unit.marketSuccess) / len(unit.marketSuccess)
+                unit.marketSuccess.append(0)
+
+        # Checks if the powerplants are shutdown and whether they can start-up
+        isOff = self.currentStatus == 0
+        self.currentDowntime[isOff & (self.capacity[:, t] == 0)] += 1
+
+        canStart = isOff & (self.currentDowntime >= self.minDowntime)
+        starting = canStart & (capacity >= self.minPower)
+
+        for i in np.flatnonzero(starting):
+            self.units[i].averageDownTime.append(self.currentDowntime.item(i))
+
+        self.currentDowntime[starting] = 0
+        self.currentStatus[starting] = 1
+        capacity[canStart & ~starting] = 0
+
+        stopping = ~isOff & (capacity < self.minPower)
+        self.currentStatus[stopping] = 0
+        self.currentDowntime[stopping] = 1
+
+        self.capacity[:, t + 1] = capacity
+
+        for unit in self.units:
+            unit.sentBids = []
+
+        self.sentBidsEOM = [None] * len(self.units)
+        self.bidStep = None
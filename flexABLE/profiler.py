@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Wall time and call count instrumentation of a simulation run.
+
+@author: intgridnb-02
+"""
+import json
+from functools import wraps
+from time import perf_counter
+
+
+class Timer():
+    """
+    Context manager adding the wall time of its block to one profiler section.
+    """
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, perf_counter() - self.start)
+        return False
+
+
+class NoTimer():
+    """
+    Stand-in for Timer when profiling is disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        return False
+
+
+noTimer = NoTimer()
+
+
+class Profiler():
+    """
+    Accumulates wall time and call counts per named section.
+
+    The phases of World.step are timed with phase(), methods of markets, agents
+    and units are timed by wrapping them on the instances (instrumentWorld), so
+    nothing is measured and nothing is wrapped unless profiling is enabled.
+    """
+
+    def __init__(self):
+        self.sections = {}
+        self.timers = {}
+
+
+    def add(self, name, seconds):
+        section = self.sections.setdefault(name, [0, 0.])
+        section[0] += 1
+        section[1] += seconds
+
+
+    def phase(self, name):
+        if name not in self.timers:
+            self.timers[name] = Timer(self, name)
+
+        return self.timers[name]
+
+
+    def wrapMethod(self, obj, methodName, name = None):
+        """
+        Replaces obj.methodName by a timed version, named 'Class.method' by default.
+        """
+        method = getattr(obj, methodName)
+        name = name or '{}.{}'.format(type(obj).__name__, methodName)
+        add = self.add
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                add(name, perf_counter() - start)
+
+        setattr(obj, methodName, timed)
+
+
+    def instrumentWorld(self, world):
+        """
+        Times collectBids and marketClearing of every market, requestBid of
+        every agent and requestBid and step of every unit, aggregated per class.
+        """
+        markets = list(world.markets['EOM'].values())
+        markets += [world.markets[name] for name in ('CRM', 'DHM') if name in world.markets]
+
+        for market in markets:
+            for methodName in ('collectBids', 'marketClearing'):
+                self.wrapMethod(market, methodName)
+
+        for agent in world.agents.values():
+            self.wrapMethod(agent, 'requestBid')
+
+        for unit in world.powerplants + world.storages + world.electrolyzers:
+            self.wrapMethod(unit, 'requestBid')
+            self.wrapMethod(unit, 'step')
+
+        if world.powerplantFleet is not None:
+            self.wrapMethod(world.powerplantFleet, 'calculateBidsEOM')
+            self.wrapMethod(world.powerplantFleet, 'step')
+
+        if world.storageFleet is not None:
+            self.wrapMethod(world.storageFleet, 'calculateBidsEOM')
+            self.wrapMethod(world.storageFleet, 'step')
+
+
+    def report(self):
+        """
+        Returns the sections sorted by total time as a list of dictionaries.
+        """
+        report = []
+
+        for name, (calls, seconds) in sorted(self.sections.items(), key = lambda item: -item[1][1]):
+            report.append({'section': name,
+                           'calls': calls,
+                           'totalTime': seconds,
+                           'meanTime': seconds / calls})
+
+        return report
+
+
+    def summary(self, total = None):
+        """
+        Returns the report as a text table, shares are relative to the section
+        'World.step' unless a total time is given.
+        """
+        if total is None:
+            total = self.sections.get('World.step', [0, 0.])[1]
+
+        lines = ['{:<40}{:>10}{:>12}{:>12}{:>9}'.format('section', 'calls', 'total [s]', 'mean [ms]', 'share')]
+
+        for entry in self.report():
+            share = '{:8.1f}%'.format(100 * entry['totalTime'] / total) if total else ''
+            lines.append('{:<40}{:>10}{:>12.3f}{:>12.4f}{:>9}'.format(entry['section'],
+                                                                      entry['calls'],
+                                                                      entry['totalTime'],
+                                                                      1000 * entry['meanTime'],
+                                                                      share))
+
+        return '\n'.join(lines)
+
+
+    def writeReport(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent = 2)
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Simulation results of all units and markets in one columnar file.
+
+@author: intgridnb-02
+"""
+import os
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .timeSeries import TimeSeries, PairTimeSeries
+from .vrepowerplants import VREPortfolio
+
+
+def seriesValues(series, start, end):
+    """
+    Values of a per-snapshot dictionary or TimeSeries for the snapshots
+    [start, end) as float array, missing values become NaN.
+    """
+    if type(series) is TimeSeries:
+        return series.array(start, end)
+
+    return np.fromiter((np.nan if series.get(t) is None else series[t] for t in range(start, end)),
+                       dtype = np.float64,
+                       count = end - start)
+
+
+def pairSeriesValues(series, start, end):
+    """
+    Both components of a per-snapshot dictionary of (capacity, price) tuples
+    or a PairTimeSeries for the snapshots [start, end).
+    """
+    if type(series) is PairTimeSeries:
+        return series.array(start, end)
+
+    values = np.array([series[t] for t in range(start, end)], dtype = np.float64).reshape(end - start, 2)
+
+    return values[:, 0], values[:, 1]
+
+
+class ResultsStore():
+    """
+    Collects the results of a World in long format, one row per snapshot,
+    unit and variable with the columns
+
+        time, snapshot, unit, unitType, technology, fuel, company, variable, value
+
+    The text columns are categorical, so the unit metadata costs next to
+    nothing in memory and in the compressed Parquet file. Market results are
+    stored with unitType 'market' and the market name as unit.
+    """
+
+    columns = ['time', 'snapshot', 'unit', 'unitType', 'technology', 'fuel', 'company', 'variable', 'value']
+    categoricalColumns = ['unit', 'unitType', 'technology', 'fuel', 'company', 'variable']
+
+    # variable name: unit attribute, for the single and the (capacity, price) series
+    powerplantSeries = {'Power': 'dictCapacity',
+                        'CRM_pos': 'confQtyCRM_pos',
+                        'CRM_neg': 'confQtyCRM_neg',
+                        'DHM_steam': 'confQtyDHM_steam'}
+    powerplantPairSeries = {('Power_MR', 'MR_Price'): 'dictCapacityMR',
+                            ('Power_Flex', 'Flex_Price'): 'dictCapacityFlex'}
+    storageSeries = {'Power': 'dictCapacity',
+                     'SOC': 'dictSOC',
+                     'CRM_pos': 'confQtyCRM_pos',
+                     'CRM_neg': 'confQtyCRM_neg'}
+    electrolyzerSeries = {'Power': 'dictCapacity'}
+
+    def __init__(self, world):
+        self.world = world
+        self.timeStamps = pd.date_range(self.world.startingDate, periods = len(self.world.snapshots), freq = '15T')
+
+
+    def blocks(self, start, end):
+        """
+        Yields (unit, unitType, technology, fuel, company, variable, values)
+        for every stored series.
+        """
+        eom = next(iter(self.world.markets['EOM']), 'EOM')
+        yield (eom, 'market', None, None, None, 'Price', np.asarray(self.world.dictPFC[start:end], dtype = np.float64))
+        yield (eom, 'market', None, None, None, 'IED_Price', np.asarray(self.world.IEDPrice[start:end], dtype = np.float64))
+
+        for unit in self.world.powerplants:
+            if isinstance(unit, VREPortfolio):
+                yield from self.portfolioBlocks(unit, start, end)
+                continue
+
+            if hasattr(unit, 'fuel'):
+                metadata = (unit.name, 'powerplant', unit.technology, unit.fuel, unit.company)
+            else:
+                metadata = (unit.name, 'renewable', unit.technology, None, None)
+
+            for variable, attribute in self.powerplantSeries.items():
+                if hasattr(unit, attribute):
+                    yield metadata + (variable, seriesValues(getattr(unit, attribute), start, end))
+
+            for variables, attribute in self.powerplantPairSeries.items():
+                for variable, values in zip(variables, pairSeriesValues(getattr(unit, attribute), start, end)):
+                    yield metadata + (variable, values)
+
+        for unit in self.world.storages:
+            metadata = (unit.name, 'storage', unit.technology, None, unit.company)
+
+            for variable, attribute in self.storageSeries.items():
+                yield metadata + (variable, seriesValues(getattr(unit, attribute), start, end))
+
+        for unit in self.world.electrolyzers:
+            metadata = (unit.name, 'electrolyzer', unit.technology, None, getattr(unit, 'company', None))
+
+            for variable, attribute in self.electrolyzerSeries.items():
+                yield metadata + (variable, seriesValues(getattr(unit, attribute), start, end))
+
+
+    def portfolioBlocks(self, portfolio, start, end):
+        """
+        Blocks of the single units of an aggregated VRE unit, same variables as
+        for a VREPowerplant.
+        """
+        power, powerMR, priceMR = portfolio.split(start, end)
+        zeros = np.zeros(end - start)
+
+        for k, name in enumerate(portfolio.unitNames):
+            metadata = (name, 'renewable', portfolio.technology, None, None)
+
+            yield metadata + ('Power', power[:, k])
+            yield metadata + ('Power_MR', powerMR[:, k])
+            yield metadata + ('MR_Price', priceMR[:, k])
+            yield metadata + ('Power_Flex', zeros)
+            yield metadata + ('Flex_Price', zeros)
+
+
+    def collect(self, start = 0, end = None):
+        """
+        Returns the results of the snapshots [start, end) as DataFrame.
+        """
+        end = len(self.world.snapshots) if end is None else end
+        length = end - start
+        blocks = list(self.blocks(start, end))
+
+        data = {'time': np.tile(self.timeStamps[start:end].values, len(blocks)),
+                'snapshot': np.tile(np.arange(start, end, dtype = np.int32), len(blocks))}
+
+        for i, column in enumerate(self.categoricalColumns):
+            categories = sorted(set(block[i] for block in blocks if block[i] is not None))
+            codeOf = {category: code for code, category in enumerate(categories)}
+            codes = np.array([codeOf.get(block[i], -1) for block in blocks], dtype = np.int32)
+            data[column] = pd.Categorical.from_codes(np.repeat(codes, length), categories = categories)
+
+        data['value'] = np.concatenate([block[-1] for block in blocks]) if blocks else np.empty(0)
+
+        return pd.DataFrame(data, columns = self.columns)
+
+
+    def write(self, path, compression = 'zstd'):
+        """
+        Writes all results into one Parquet file, needs pyarrow or fastparquet.
+        """
+        self.collect().to_parquet(path, compression = compression, index = False)
+
+        return path
+
+
+    @staticmethod
+    def read(path, variables = None, units = None, columns = None):
+        """
+        Reads a results file, optionally only some variables and units. Use
+        e.g. data.pivot(index = 'time', columns = 'unit', values = 'value') on
+        the result of one variable to get one column per unit.
+        """
+        filters = []
+        if variables is not None:
+            filters.append(('variable', 'in', list(variables)))
+        if units is not None:
+            filters.append(('unit', 'in', list(units)))
+
+        return pd.read_parquet(path, columns = columns, filters = filters or None)
+
+
+class StreamingResultsWriter():
+    """
+    Writes the results of a running simulation in chunks while it is stepping.
+
+    The World reports the number of finished snapshots after every step, once
+    chunkSize snapshots are complete they are collected by a ResultsStore and
+    handed to a background thread, which writes them as part-<first snapshot>
+    .parquet into the dataset directory. Parts are written under a hidden name
+    and renamed when complete, so the directory always holds readable results
+    of the finished chunks, also if a run is killed, and ResultsStore.read
+    reads the whole directory. The queue between simulation and writer
+    thread is bounded, a simulation outrunning the disk waits for it.
+    """
+
+    def __init__(self, world, directory, chunkSize = 672, queueSize = 2, compression = 'zstd'):
+        self.world = world
+        self.store = ResultsStore(world)
+        self.directory = directory
+        self.chunkSize = chunkSize
+        self.compression = compression
+        self.flushed = 0
+        self.error = None
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        # parts of an earlier run would be read as part of this one
+        for fileName in os.listdir(self.directory):
+            if fileName.startswith(('part-', '.part-')) and fileName.endswith('.parquet'):
+                os.remove(os.path.join(self.directory, fileName))
+
+        self.queue = queue.Queue(maxsize = queueSize)
+        self.thread = threading.Thread(target = self.run, name = 'flexABLE results writer', daemon = True)
+        self.thread.start()
+
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+
+            if item is None:
+                return
+
+            fileName, data = item
+
+            if self.error is not None:
+                continue
+
+            try:
+                temporaryPath = os.path.join(self.directory, '.' + fileName)
+                data.to_parquet(temporaryPath, compression = self.compression, index = False)
+                os.replace(temporaryPath, os.path.join(self.directory, fileName))
+
+            except Exception as e:
+                self.error = e
+
+
+    def update(self, finished):
+        """
+        Called with the number of finished snapshots, flushes a chunk once
+        chunkSize snapshots are complete.
+        """
+        if finished - self.flushed >= self.chunkSize:
+            self.flush(finished)
+
+
+    def flush(self, finished):
+        if self.error is not None:
+            raise self.error
+
+        if finished > self.flushed:
+            self.queue.put(('part-{:08d}.parquet'.format(self.flushed), self.store.collect(self.flushed, finished)))
+            self.flushed = finished
+
+
+    def close(self):
+        """
+        Writes the remaining snapshots and waits for the writer thread.
+        """
+        try:
+            self.flush(self.world.currstep)
+        finally:
+            self.queue.put(None)
+            self.thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+        return self.directory
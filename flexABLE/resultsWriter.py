@@ -7,10 +7,186 @@ Created on Thu Sep 10 17:48:29 2020
 from influxdb import InfluxDBClient
 import pandas as pd
 from influxdb import DataFrameClient
+import logging
+import queue
+import threading
+import time
+import requests
+
+logger = logging.getLogger("flexABLE")
+
+
+def escapeKey(key):
+    return str(key).replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def escapeMeasurement(measurement):
+    return str(measurement).replace('\\', '\\\\').replace(',', '\\,').replace(' ', '\\ ')
+
+
+def timeNs(timestamp):
+    return timestamp if type(timestamp) == int else pd.Timestamp(timestamp).value
+
+
+class LineProtocolWriter():
+    """
+    Buffers points as InfluxDB line protocol and posts them in batches of
+    batchSize lines to the /write endpoint, from a background thread over one
+    HTTP session. Full batches go through a bounded queue: if the database
+    falls behind, writing blocks until a batch has been sent (backpressure).
+    Failed batches are retried, an error that persists is raised by the next
+    write, flush or close.
+    """
+
+    def __init__(self, url, database, user=None, password=None, batchSize=5000, queueSize=4, retries=3, timeout=60):
+        self.url = url.rstrip('/')
+        self.database = database
+        self.batchSize = batchSize
+        self.retries = retries
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        if user is not None:
+            self.session.auth = (user, password)
+
+        self.buffer = []
+        self.queue = queue.Queue(maxsize=queueSize)
+        self.error = None
+
+        self.points = 0
+        self.batches = 0
+        self.sendTime = 0.
+
+        self.thread = threading.Thread(target=self.run, name='flexABLE influx writer', daemon=True)
+        self.thread.start()
+
+
+    def createDatabase(self):
+        response = self.session.post(self.url + '/query',
+                                     params={'q': 'CREATE DATABASE "{}"'.format(self.database)},
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+
+    def run(self):
+        while True:
+            body = self.queue.get()
+
+            if body is None:
+                return
+
+            # after an error the queue is still drained, so that send() and close() do not block
+            if self.error is None:
+                start = time.perf_counter()
+
+                try:
+                    self.post(body)
+                except Exception as e:
+                    self.error = e
+                    continue
+
+                self.sendTime += time.perf_counter() - start
+                self.batches += 1
+
+
+    def post(self, body):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(self.url + '/write',
+                                             params={'db': self.database, 'precision': 'ns'},
+                                             data=body,
+                                             timeout=self.timeout)
+                if response.status_code < 300:
+                    return
+
+                error = requests.HTTPError('{} {}'.format(response.status_code, response.text), response=response)
+
+                # client errors, e.g. malformed points, fail the same way again
+                if response.status_code < 500:
+                    break
+
+            except requests.RequestException as e:
+                error = e
+
+            if attempt < self.retries:
+                logger.warning('Writing batch to InfluxDB failed ({}), retrying'.format(error))
+                time.sleep(0.5 * 2 ** attempt)
+
+        raise error
+
+
+    def checkError(self):
+        if self.error is not None:
+            raise self.error
+
+
+    def writeLines(self, lines):
+        self.buffer.extend(lines)
+        self.points += len(lines)
+
+        while len(self.buffer) >= self.batchSize:
+            self.send(self.buffer[:self.batchSize])
+            del self.buffer[:self.batchSize]
+
+
+    def write(self, measurement, tags, fields, timestamp):
+        fields = ','.join('{}={!r}'.format(escapeKey(key), float(value)) for key, value in fields.items())
+        tags = ''.join(',{}={}'.format(escapeKey(key), escapeKey(value)) for key, value in sorted(tags.items()))
+
+        self.writeLines(['{}{} {} {}'.format(escapeMeasurement(measurement), tags, fields, timeNs(timestamp))])
+
+
+    def writeDataFrame(self, df, measurement, tags={}):
+        """
+        Writes one point per row of a DataFrame with a DatetimeIndex, the
+        columns are the fields. NaN fields are left out like in DataFrameClient.
+        """
+        prefix = escapeMeasurement(measurement) + ''.join(',{}={}'.format(escapeKey(key), escapeKey(value)) for key, value in sorted(tags.items()))
+        keys = [escapeKey(column) for column in df.columns]
+        lines = []
+
+        for row, timestamp in zip(df.to_numpy(dtype=float).tolist(), df.index.asi8.tolist()):
+            fields = ','.join('{}={!r}'.format(key, value) for key, value in zip(keys, row) if value == value)
+            if fields:
+                lines.append('{} {} {}'.format(prefix, fields, timestamp))
+
+        self.writeLines(lines)
+
+
+    def send(self, lines):
+        self.checkError()
+        self.queue.put('\n'.join(lines).encode('utf-8'))
+
+
+    def flush(self):
+        if self.buffer:
+            self.send(self.buffer)
+            self.buffer = []
+
+
+    def close(self):
+        """
+        Sends the buffered points, waits until all batches are written and
+        closes the session.
+        """
+        try:
+            self.flush()
+        finally:
+            self.queue.put(None)
+            self.thread.join()
+            self.session.close()
+
+        self.checkError()
+
 
 class ResultsWriter():
-    
-    def __init__(self, databaseName, simulationID, startingDate='2018-01-01T00:00:00', host='localhost', port=8086, user='root', password='root', world=None):
+    """
+    Writes results into InfluxDB. By default every write is sent on its own
+    through the influxdb clients, with a batchSize all points go through one
+    LineProtocolWriter instead and close() sends the rest at the end.
+    """
+
+    def __init__(self, databaseName, simulationID, startingDate='2018-01-01T00:00:00', host='localhost', port=8086, user='root', password='root', world=None, batchSize=None):
         self.user = user
         self.password = password
         self.databaseName = databaseName
@@ -20,14 +196,32 @@ class ResultsWriter():
         if not(world is None):
             self.timeStamps = pd.date_range(self.startingDate, periods=len(self.world.snapshots), freq='15T')
 
+        self.batchWriter = None
+
+        if batchSize is not None:
+            self.batchWriter = LineProtocolWriter('http://{}:{}'.format(host, port), databaseName, user=user, password=password, batchSize=batchSize)
+            self.batchWriter.createDatabase()
+            return
+
         # Creating connection and Database to save results
         self.client = InfluxDBClient(host=host, port=port)
         self.client.create_database(databaseName)
         self.client.switch_database(databaseName)
-        
+
         self.dfClient = DataFrameClient(host=host, port=port, username=self.user, password=self.password, database=self.databaseName)
         self.dfClient.switch_database(self.databaseName)
-        
+
+    def writePoints(self, json_body):
+        if self.batchWriter is None:
+            self.client.write_points(json_body)
+        else:
+            for point in json_body:
+                self.batchWriter.write(point['measurement'], point['tags'], point['fields'], point['time'])
+
+    def close(self):
+        if self.batchWriter is not None:
+            self.batchWriter.close()
+
     def writeMarketResult(self,MarketResult):
         
         json_body = [
@@ -42,13 +236,13 @@ class ResultsWriter():
             "Price": float(MarketResult.marketClearingPrice)
         }
     }]
-        self.client.write_points(json_body)
+        self.writePoints(json_body)
         
     def writeGeneratorsPower(self,generators_P,t):
         df = generators_P.copy()
         df.set_index(pd.date_range(start=self.timeStamps[t], periods=1),inplace=True)
         
-        self.dfClient.write_points(df, 'reDispatch', protocol='line', tags= {"simulationID":"{}".format(self.world.simulationID)})
+        self.writeDataFrame(df, 'reDispatch', tags= {"simulationID":"{}".format(self.world.simulationID)})
         
 
         
@@ -70,7 +264,7 @@ class ResultsWriter():
                 "Price": float(bid.price)
             }
         }]
-            self.client.write_points(json_body)
+            self.writePoints(json_body)
 
 
     def writeBid(self, powerplant,t,bid):
@@ -90,10 +284,14 @@ class ResultsWriter():
             "Price": float(bid.price)
         }
     }]
-        self.client.write_points(json_body)
+        self.writePoints(json_body)
             
         
     def writeDataFrame(self,df, measurementName, tags={'simulationID':'Historic_Data'}):
+        if self.batchWriter is not None:
+            self.batchWriter.writeDataFrame(df, measurementName, tags=tags)
+            return
+        
         self.dfClient.write_points(df,
                                    measurementName,
                                    tags=tags,
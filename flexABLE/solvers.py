@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Solver backends for the optimization models of the units.
+
+The models are solved through Pyomo, this module maps a solver name and the
+common settings MIP gap, time limit and threads onto the plugin and option
+names of the respective solver. HiGHS and CBC need no license, HiGHS is
+installed with pip install highspy.
+
+    settings = solvers.solverSettings('highs', mipGap = 0.01, timeLimit = 30, threads = 1)
+    result, statistics = solvers.solve(model, settings)
+
+@author: intgridnb-02
+"""
+import logging
+import time
+
+# registers the solver plugins of Pyomo with the SolverFactory
+import pyomo.environ
+from pyomo.core import Var
+from pyomo.opt import SolverFactory, TerminationCondition
+
+# solver name: Pyomo solver plugin
+backends = {'gurobi': 'gurobi',
+            'highs': 'appsi_highs',
+            'cbc': 'cbc',
+            'glpk': 'glpk'}
+
+# names of the common settings in the options of every solver
+optionNames = {'gurobi': {'mipGap': 'MIPGap', 'timeLimit': 'TimeLimit', 'threads': 'Threads'},
+               'highs': {'mipGap': 'mip_rel_gap', 'timeLimit': 'time_limit', 'threads': 'threads'},
+               'cbc': {'mipGap': 'ratio', 'timeLimit': 'sec', 'threads': 'threads'},
+               'glpk': {'mipGap': 'mipgap', 'timeLimit': 'tmlim'}}
+
+warmStartSolvers = {'gurobi', 'highs', 'cbc'}
+
+# terminations with a usable solution, if the solver returned one, e.g. the incumbent at the time limit
+solutionTerminations = {TerminationCondition.optimal,
+                        TerminationCondition.locallyOptimal,
+                        TerminationCondition.globallyOptimal,
+                        TerminationCondition.feasible,
+                        TerminationCondition.maxTimeLimit,
+                        TerminationCondition.maxIterations,
+                        TerminationCondition.maxEvaluations}
+
+# configured solvers of this process
+solverCache = {}
+
+
+def solverSettings(solver = 'gurobi', mipGap = None, timeLimit = None, threads = None, warmStart = False):
+    """
+    Settings of a solver as picklable dictionary, unset settings keep the
+    defaults of the solver. The time limit is in seconds per solve, threads
+    are per solve, i.e. per worker process if windows are solved in parallel.
+    """
+    if solver not in backends:
+        raise ValueError('Unknown solver {}, available solvers are {}'.format(solver, ', '.join(backends)))
+
+    return {'solver': solver,
+            'mipGap': mipGap,
+            'timeLimit': timeLimit,
+            'threads': threads,
+            'warmStart': warmStart and solver in warmStartSolvers}
+
+
+def getSolver(settings):
+    key = tuple(sorted(settings.items()))
+
+    if key not in solverCache:
+        opt = SolverFactory(backends[settings['solver']])
+
+        if not opt.available(exception_flag = False):
+            raise RuntimeError('Solver {} is not available'.format(settings['solver']))
+
+        # the APPSI interfaces log the solver output as INFO, also without tee
+        if 'log_level' in getattr(opt, 'config', {}):
+            opt.config.log_level = logging.DEBUG
+
+        for setting, option in optionNames[settings['solver']].items():
+            if settings[setting] is not None:
+                # glpk only takes whole seconds
+                opt.options[option] = int(settings[setting]) if option == 'tmlim' else settings[setting]
+
+        solverCache[key] = opt
+
+    return solverCache[key]
+
+
+def solve(model, settings):
+    """
+    Solves a model and returns the Pyomo result and the statistics of the
+    solve: solver, status, termination condition, wall time in seconds and
+    whether a solution was loaded. The solution is only loaded into the
+    model if the termination condition allows it. Before loading, all
+    variables are reset, so values that the solution does not set are None
+    and never left over from an earlier solve of the same model.
+    """
+    opt = getSolver(settings)
+
+    start = time.perf_counter()
+    result = opt.solve(model, load_solutions = False, **({'warmstart': True} if settings['warmStart'] else {}))
+    seconds = time.perf_counter() - start
+
+    loaded = result.solver.termination_condition in solutionTerminations and len(result.solution) > 0
+    if loaded:
+        for variable in model.component_data_objects(Var):
+            variable.set_value(None, skip_validation = True)
+        model.solutions.load_from(result)
+
+    statistics = {'solver': settings['solver'],
+                  'status': str(result.solver.status),
+                  'termination': str(result.solver.termination_condition),
+                  'seconds': seconds,
+                  'loaded': loaded}
+
+    return result, statistics
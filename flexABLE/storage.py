@@ -5,13 +5,17 @@ Created on Sun Apr  19 16:06:57 2020
 @author: intgridnb-02
 """
 from .auxFunc import initializer
-from .bid import Bid
+from .bid import Bid, SENT, CONFIRMED, PARTIALLY_CONFIRMED, SUPPLY_EOM, DEMAND_EOM, CRM_POS, CRM_NEG
+from .timeSeries import TimeSeries
 import numpy as np
 
 
 
 class Storage():
     
+    # Set when the unit is part of a StorageFleet, the time series are then views on the fleet arrays
+    fleet = None
+    
     @initializer
     def __init__(self,
                  agent=None,
@@ -32,12 +36,12 @@ class Storage():
 
         #creating empty dictionaries and variables
         # bids status parameters
-        self.dictSOC = {n:0 for n in self.world.snapshots}
+        self.dictSOC = TimeSeries.allocate(len(self.world.snapshots))
         self.dictSOC[0] = self.maxSOC * 0.5 #we start at 50% of storage capacity
-        self.dictCapacity = {n:0 for n in self.world.snapshots}       
-        self.confQtyCRM_neg = {n:0 for n in self.world.snapshots}
-        self.confQtyCRM_pos = {n:0 for n in self.world.snapshots}
-        self.dictEnergyCost = {n:0 for n in self.world.snapshots}
+        self.dictCapacity = TimeSeries.allocate(len(self.world.snapshots))
+        self.confQtyCRM_neg = TimeSeries.allocate(len(self.world.snapshots))
+        self.confQtyCRM_pos = TimeSeries.allocate(len(self.world.snapshots))
+        self.dictEnergyCost = TimeSeries.allocate(len(self.world.snapshots))
         self.dictEnergyCost[0] = -self.world.dictPFC[0] * self.dictSOC[0]
         
         # Unit status parameters
@@ -51,10 +55,10 @@ class Storage():
         self.dictCapacity[self.world.currstep] = 0 #It initializes the available capacity at the current time step to zero.
             
         for bid in self.sentBids:
-            if 'supplyEOM' in bid.ID in bid.ID: #checks if a bid's ID contains the substring 'supplyEOM'. If it does, it increases the available capacity at the current time steP
+            if bid.kind == SUPPLY_EOM: #a supply bid on the EOM increases the available capacity at the current time step
                 self.dictCapacity[self.world.currstep] += bid.confirmedAmount
                 
-            if 'demandEOM' in bid.ID: #If the bid's ID contains the substring 'demandEOM', it decreases the available capacity at the current time step
+            elif bid.kind == DEMAND_EOM: #a demand bid on the EOM decreases the available capacity at the current time step
                 self.dictCapacity[self.world.currstep] -= bid.confirmedAmount
                
         
@@ -96,18 +100,11 @@ class Storage():
         
  #The purpose of following method is to provide feedback on the status of a bid, update certain attributes, and append the bid to the sentBids list.       
     def feedback(self, bid):
-        if bid.status == "Confirmed":
-            if 'CRMPosDem' in bid.ID:
-                self.confQtyCRM_pos[self.world.currstep] = bid.confirmedAmount
-                
-            if 'CRMNegDem' in bid.ID:
-                self.confQtyCRM_neg[self.world.currstep] = bid.confirmedAmount
-            
-        elif bid.status =="PartiallyConfirmed":
-            if 'CRMPosDem' in bid.ID:
+        if bid.status == CONFIRMED or bid.status == PARTIALLY_CONFIRMED:
+            if bid.kind == CRM_POS:
                 self.confQtyCRM_pos[self.world.currstep] = bid.confirmedAmount
                 
-            if 'CRMNegDem' in bid.ID:
+            elif bid.kind == CRM_NEG:
                 self.confQtyCRM_neg[self.world.currstep] = bid.confirmedAmount
             
         self.sentBids.append(bid)
@@ -117,7 +114,16 @@ class Storage():
         bids = []
         
         if market == "EOM":
-            bids.extend(self.calculateBidEOM(t))
+            if self.fleet is None:
+                bids.extend(self.calculateBidEOM(t))
+                
+            else:
+                bid = self.fleet.requestBidEOM(self.fleetIndex, t)
+                
+                if bid is not None:
+                    bids.append(self.bidEOM(*bid))
+                    
+                self.fleet.sentBidsEOM[self.fleetIndex] = bids
             
         elif market == "posCRMDemand":
             bids.extend(self.calculatingBidsSTO_CRM_pos(t))
@@ -135,7 +141,10 @@ class Storage():
         if t >= len(self.world.snapshots): #adjusts the value of t to be within the valid range of snapshots.
             t -= len(self.world.snapshots)
             
-        if t - self.foresight < 0: # checks if the available data spans across the beginning of the year and calculates average price
+        if self.world.pfcIndex is not None:
+            averagePrice = self.world.pfcIndex.averagePrice(t, self.foresight)
+            
+        elif t - self.foresight < 0: # checks if the available data spans across the beginning of the year and calculates average price
             averagePrice = np.mean(self.world.PFC[t-self.foresight:] + self.world.PFC[0:t+self.foresight])
             
         elif t + self.foresight > len(self.world.snapshots):# available data spans across the end of the year 
@@ -152,13 +161,7 @@ class Storage():
             bidPrice_supply = averagePrice 
             
             if bidQuantity_supply >= self.world.minBidEOM: #if greater than 1MWh
-                bidsEOM.append(Bid(issuer = self,
-                                    ID = "{}_supplyEOM".format(self.name),
-                                    price = bidPrice_supply,
-                                    amount = bidQuantity_supply,
-                                    status = "Sent",
-                                    bidType = "Supply",
-                                    node = self.node))
+                bidsEOM.append(self.bidEOM("Supply", bidQuantity_supply, bidPrice_supply))
             
         elif self.world.PFC[t] < averagePrice: #smaller that average price/charge or negative bid 
             bidQuantity_demand = min(max((self.maxSOC - SOC - 
@@ -169,39 +172,48 @@ class Storage():
             bidPrice_demand = averagePrice 
             
             if bidQuantity_demand >= self.world.minBidEOM: #if greater than 1MWh
-                bidsEOM.append(Bid(issuer = self,
-                                   ID = "{}_demandEOM".format(self.name),
-                                   price = bidPrice_demand,
-                                   amount = bidQuantity_demand,
-                                   status = "Sent",
-                                   bidType = "Demand",
-                                   node = self.node))
+                bidsEOM.append(self.bidEOM("Demand", bidQuantity_demand, bidPrice_demand))
 
         return bidsEOM
+    
+    
+    def bidEOM(self, bidType, amount, price):
+        return Bid(issuer = self,
+                   price = price,
+                   amount = amount,
+                   status = SENT,
+                   bidType = bidType,
+                   node = self.node,
+                   kind = SUPPLY_EOM if bidType == "Supply" else DEMAND_EOM)
 
 #calculate and return capacity and energy price
     def calculatingBidPricesSTO_CRM(self, t):
         fl = int(4 / self.world.dt)
-        theoreticalSOC = self.dictSOC[t]
-        theoreticalRevenue = []
         
-        for tick in range(t, t + fl):
-            BidSTO_EOM = self.calculateBidEOM(tick, theoreticalSOC)
+        if self.world.pfcIndex is not None:
+            capacityPrice = self.world.storageLookAhead.capacityPrice(self, t, self.dictSOC[t], fl)
             
-            if len(BidSTO_EOM) != 0:
-                BidSTO_EOM = BidSTO_EOM[0]
-                if BidSTO_EOM.bidType == 'Supply':
-                    theoreticalSOC -= BidSTO_EOM.amount / self.efficiency_discharge * self.world.dt
-                    theoreticalRevenue.append(self.world.PFC[t] * BidSTO_EOM.amount * self.world.dt)
-                    
-                elif BidSTO_EOM.bidType == 'Demand':
-                    theoreticalSOC += BidSTO_EOM.amount * self.efficiency_charge * self.world.dt
-                    theoreticalRevenue.append(- self.world.PFC[t] * BidSTO_EOM.amount * self.world.dt)
-                    
-            else:
-                continue
-        
-        capacityPrice = abs(sum(theoreticalRevenue))
+        else:
+            theoreticalSOC = self.dictSOC[t]
+            theoreticalRevenue = []
+            
+            for tick in range(t, t + fl):
+                BidSTO_EOM = self.calculateBidEOM(tick, theoreticalSOC)
+                
+                if len(BidSTO_EOM) != 0:
+                    BidSTO_EOM = BidSTO_EOM[0]
+                    if BidSTO_EOM.bidType == 'Supply':
+                        theoreticalSOC -= BidSTO_EOM.amount / self.efficiency_discharge * self.world.dt
+                        theoreticalRevenue.append(self.world.PFC[t] * BidSTO_EOM.amount * self.world.dt)
+                        
+                    elif BidSTO_EOM.bidType == 'Demand':
+                        theoreticalSOC += BidSTO_EOM.amount * self.efficiency_charge * self.world.dt
+                        theoreticalRevenue.append(- self.world.PFC[t] * BidSTO_EOM.amount * self.world.dt)
+                        
+                else:
+                    continue
+            
+            capacityPrice = abs(sum(theoreticalRevenue))
         energyPrice = -self.dictEnergyCost[self.world.currstep] / self.dictSOC[t]  
         
         return capacityPrice, energyPrice
@@ -218,21 +230,21 @@ class Storage():
             capacityPrice, energyPrice = self.calculatingBidPricesSTO_CRM(t)
             
             bidsCRM.append(Bid(issuer = self,
-                               ID = "{}_CRMPosDem".format(self.name),
                                price = capacityPrice,
                                amount = bidQuantityBPM_pos,
                                energyPrice = energyPrice,
-                               status = "Sent",
-                               bidType = "Supply"))
+                               status = SENT,
+                               bidType = "Supply",
+                               kind = CRM_POS))
 
         else: #unsuccessful bid, sets energyprice and amount to 0
             bidsCRM.append(Bid(issuer=self,
-                               ID="{}_CRMPosDem".format(self.name),
                                price = 0,
                                amount = 0,
                                energyPrice = 0,
-                               status = "Sent",
-                               bidType = "Supply"))
+                               status = SENT,
+                               bidType = "Supply",
+                               kind = CRM_POS))
         return bidsCRM
     
 #calculate and return negative bid with its details
@@ -247,21 +259,21 @@ class Storage():
             bidQtyCRM_neg = availablePower_BP_neg
 
             bidsCRM.append(Bid(issuer = self,
-                               ID = "{}_CRMNegDem".format(self.name),
                                price = 0,
                                amount = bidQtyCRM_neg,
                                energyPrice = 0, #zero energy price for charging in CRM
-                               status = "Sent",
-                               bidType = "Supply"))
+                               status = SENT,
+                               bidType = "Supply",
+                               kind = CRM_NEG))
 
         else: #unsuccesful bid, sets energyprice and amount to 0
             bidsCRM.append(Bid(issuer = self,
-                               ID = "{}_CRMNegDem".format(self.name),
                                price = 0,
                                amount = 0,
                                energyPrice = 0,
-                               status = "Sent",
-                               bidType = "Supply"))
+                               status = SENT,
+                               bidType = "Supply",
+                               kind = CRM_NEG))
             
         
         return bidsCRM
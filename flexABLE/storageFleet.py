@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized state and EOM bid calculation for the storages.
+
+@author: intgridnb-02
+"""
+import numpy as np
+
+from .bid import SUPPLY_EOM
+from .timeSeries import TimeSeries
+
+
+class StorageFleet():
+    """
+    Holds the parameters, the SOC, the energy costs and the CRM commitments of
+    all storages in arrays with one row per unit, and calculates the EOM bids
+    and the SOC transition of the whole fleet in one vectorized pass per step.
+
+    Like in the PowerplantFleet the Storage objects stay in place, their
+    per-snapshot TimeSeries become views on the fleet arrays, so the CRM bids
+    and the result export work on them unchanged. Parameters are read once,
+    when the fleet is built.
+    """
+
+    def __init__(self, world, units):
+        self.world = world
+        self.units = list(units)
+
+        n = len(self.units)
+        length = len(self.world.snapshots)
+
+        def parameter(name):
+            return np.array([getattr(unit, name) for unit in self.units], dtype = np.float64)
+
+        def series(name):
+            data = np.zeros((n, length))
+            for i, unit in enumerate(self.units):
+                data[i] = getattr(unit, name).array()
+            return data
+
+        # Parameters
+        self.maxPower_charge = parameter('maxPower_charge')
+        self.maxPower_discharge = parameter('maxPower_discharge')
+        self.efficiency_charge = parameter('efficiency_charge')
+        self.efficiency_discharge = parameter('efficiency_discharge')
+        self.minSOC = parameter('minSOC')
+        self.maxSOC = parameter('maxSOC')
+        self.foresight = np.array([unit.foresight for unit in self.units], dtype = np.intp)
+
+        # Time series
+        self.SOC = series('dictSOC')
+        self.capacity = series('dictCapacity')
+        self.energyCost = series('dictEnergyCost')
+        self.confQtyCRM_pos = series('confQtyCRM_pos')
+        self.confQtyCRM_neg = series('confQtyCRM_neg')
+
+        for i, unit in enumerate(self.units):
+            unit.fleet = self
+            unit.fleetIndex = i
+            unit.dictSOC = TimeSeries(self.SOC[i], length)
+            unit.dictCapacity = TimeSeries(self.capacity[i], length)
+            unit.dictEnergyCost = TimeSeries(self.energyCost[i], length)
+            unit.confQtyCRM_pos = TimeSeries(self.confQtyCRM_pos[i], length)
+            unit.confQtyCRM_neg = TimeSeries(self.confQtyCRM_neg[i], length)
+
+        # EOM bids calculated for bidStep and the bids sent by each unit in the current step
+        self.bidStep = None
+        self.bidsEOM = [None] * n
+        self.sentBidsEOM = [None] * n
+
+
+    def requestBidEOM(self, index, t):
+        """
+        Returns (bidType, amount, price) of the EOM bid of one unit or None if
+        the unit does not bid, the bids of the whole fleet are calculated on
+        the first request of a step.
+        """
+        if self.bidStep != t:
+            self.calculateBidsEOM(t)
+
+        return self.bidsEOM[index]
+
+
+    def averagePrices(self, t):
+        averagePrice = np.empty(len(self.units))
+
+        for foresight in np.unique(self.foresight).tolist():
+            averagePrice[self.foresight == foresight] = self.world.pfcIndex.averagePrice(t, foresight)
+
+        return averagePrice
+
+
+    def calculateBidsEOM(self, t):
+        """
+        Vectorized Storage.calculateBidEOM for all units of the fleet.
+        """
+        dt = self.world.dt
+        SOC = self.SOC[:, t]
+        averagePrice = self.averagePrices(t)
+
+        supply = self.world.PFC[t] >= averagePrice
+        demand = self.world.PFC[t] < averagePrice
+
+        bidQuantity_supply = np.minimum(np.maximum((SOC - self.minSOC - self.confQtyCRM_pos[:, t] * dt)
+                                                   * self.efficiency_discharge / dt, 0), self.maxPower_discharge)
+        bidQuantity_demand = np.minimum(np.maximum((self.maxSOC - SOC - self.confQtyCRM_neg[:, t] * dt)
+                                                   / self.efficiency_charge / dt, 0), self.maxPower_charge)
+
+        bidQuantity = np.where(supply, bidQuantity_supply, bidQuantity_demand)
+        bidding = np.flatnonzero((supply | demand) & (bidQuantity >= self.world.minBidEOM))
+
+        self.bidsEOM = [None] * len(self.units)
+
+        # the bid price stays a numpy float like the average price of a single unit
+        for i, isSupply, amount in zip(bidding.tolist(), supply[bidding].tolist(), bidQuantity[bidding].tolist()):
+            self.bidsEOM[i] = ('Supply' if isSupply else 'Demand', amount, averagePrice[i])
+
+        self.bidStep = t
+
+
+    def step(self):
+        """
+        Vectorized Storage.step for all units of the fleet.
+        """
+        t = self.world.currstep
+        dt = self.world.dt
+        capacity = np.zeros(len(self.units))
+
+        for i, bids in enumerate(self.sentBidsEOM):
+            for bid in bids or ():
+                if bid.kind == SUPPLY_EOM:
+                    capacity[i] += bid.confirmedAmount
+                else:
+                    capacity[i] -= bid.confirmedAmount
+
+        self.capacity[:, t] = capacity
+        discharging = capacity >= 0
+
+        if t < len(self.world.snapshots) - 1:
+            price = self.world.PFC[t]
+
+            SOC = np.where(discharging,
+                           self.SOC[:, t] - (capacity / self.efficiency_discharge * dt),
+                           self.SOC[:, t] - (capacity * self.efficiency_charge * dt))
+            self.SOC[:, t + 1] = np.maximum(SOC, 0)
+
+            self.energyCost[:, t + 1] = np.where(discharging,
+                                                 self.energyCost[:, t] + capacity * price * dt,
+                                                 self.energyCost[:, t] - capacity * price * dt)
+
+        else:
+            # the last step changes the initial SOC, same as Storage.step
+            self.SOC[:, 0] += np.where(discharging,
+                                       -(capacity / self.efficiency_discharge * dt),
+                                       -capacity * self.efficiency_charge * dt)
+
+        # Calculates market success
+        for unit, success in zip(self.units, (capacity > 0).tolist()):
+            if success:
+                unit.marketSuccess[-1] += 1
+            else:
+                unit.marketSuccess.append(0)
+
+            unit.sentBids = []
+
+        self.sentBidsEOM = [None] * len(self.units)
+        self.bidStep = None
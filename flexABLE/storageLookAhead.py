@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Look-ahead of the storage EOM strategy for the pricing of CRM bids.
+
+@author: intgridnb-02
+"""
+import numpy as np
+
+
+class StorageLookAhead():
+    """
+    Revenue of a storage that follows its EOM bidding strategy over the next
+    ticks, starting from a given SOC, as used for the capacity price of its
+    positive CRM bids (Storage.calculatingBidPricesSTO_CRM). The bid
+    directions and the CRM commitments of the window are evaluated as arrays,
+    only the SOC recursion runs tick by tick, and no Bid objects are created.
+
+    The results are not cached: every storage prices its bids once per window
+    start from its own SOC, so evaluations practically never repeat within a
+    run, not even with the SOC rounded to whole MWh.
+    """
+
+    def __init__(self, world):
+        self.world = world
+
+
+    def capacityPrice(self, storage, t, SOC, ticks):
+        """
+        Absolute revenue of the EOM bids of the storage in [t, t + ticks) at
+        the price of step t, same as the simulated bids of
+        Storage.calculatingBidPricesSTO_CRM.
+        """
+        pfcIndex = self.world.pfcIndex
+        window = np.arange(t, t + ticks) % len(pfcIndex)
+
+        forecast = pfcIndex.forecast[window]
+        averagePrice = pfcIndex.averagePrices(storage.foresight)[window]
+
+        return self.revenue(storage, t, SOC, (forecast >= averagePrice).tolist(), (forecast < averagePrice).tolist(),
+                            storage.confQtyCRM_pos.data[window].tolist(), storage.confQtyCRM_neg.data[window].tolist())
+
+
+    def revenue(self, storage, t, SOC, supply, demand, confQtyCRM_pos, confQtyCRM_neg):
+        dt = self.world.dt
+        price = self.world.PFC[t]
+        revenue = 0
+
+        for isSupply, isDemand, qtyCRM_pos, qtyCRM_neg in zip(supply, demand, confQtyCRM_pos, confQtyCRM_neg):
+            if isSupply:
+                amount = min(max((SOC - storage.minSOC - qtyCRM_pos * dt) * storage.efficiency_discharge / dt, 0),
+                             storage.maxPower_discharge)
+
+                if amount >= self.world.minBidEOM:
+                    SOC -= amount / storage.efficiency_discharge * dt
+                    revenue += price * amount * dt
+
+            elif isDemand:
+                amount = min(max((storage.maxSOC - SOC - qtyCRM_neg * dt) / storage.efficiency_charge / dt, 0),
+                             storage.maxPower_charge)
+
+                if amount >= self.world.minBidEOM:
+                    SOC += amount * storage.efficiency_charge * dt
+                    revenue += - price * amount * dt
+
+        return abs(revenue)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel runs of many World configurations.
+
+Every configuration is simulated in its own process of a process pool. The
+time series inputs of all scenarios are converted into the binary input
+store once before the pool starts, the workers memory-map the same files,
+so the operating system shares the input pages between all runs instead of
+every World parsing its own copy of the CSV files.
+
+Each run writes its results in the ResultsStore layout into
+<directory>/<sweep>/run=<name>/, the whole sweep is one Parquet dataset
+with the run name as partition column. _runs.csv next to the runs lists
+the configurations with their status and run time. All other outputs of a
+run, e.g. the electrolyzer schedules and the PFC export, go to its own
+output directory <directory>/<sweep>/_outputs/<name>/, so runs of the same
+scenario never share them.
+
+    from flexABLE import sweep
+
+    configurations = [sweep.configuration('2030_{}'.format(days), '2030', days = days, importStorages = True)
+                      for days in (7, 14, 28)]
+    runs = sweep.runSweep(configurations, name = 'horizon', workers = 3)
+    prices = sweep.readSweep('output/sweeps/horizon', variables = ['Price'])
+
+@author: intgridnb-02
+"""
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+import pandas as pd
+
+from .flexABLE import World
+from .inputStore import InputStore
+from .resultsStore import ResultsStore
+
+logger = logging.getLogger("flexABLE")
+
+
+def configuration(name, scenario, days = 365, startingPoint = 0, startingDate = None, world = None, attributes = None, **loadScenario):
+    """
+    Describes one run: World(96 * days, **world) with the given attributes
+    set, e.g. {'minBidEOM': 5}, and loadScenario(scenario, startingPoint,
+    **loadScenario). The starting date defaults to the first of January of
+    the scenario year for year named scenarios.
+    """
+    if startingDate is None:
+        year = str(scenario)[:4]
+        startingDate = '{}-01-01T00:00:00'.format(year if year.isdigit() else 2018)
+        startingDate = str(pd.Timestamp(startingDate) + pd.Timedelta(minutes = 15 * startingPoint))
+
+    return {'name': name,
+            'scenario': str(scenario),
+            'snapshots': 96 * days,
+            'startingPoint': startingPoint,
+            'startingDate': startingDate,
+            'world': dict(world or {}),
+            'attributes': dict(attributes or {}),
+            'loadScenario': loadScenario}
+
+
+def runConfiguration(configuration, directory):
+    """
+    Simulates one configuration and writes its results, runs in the workers.
+    """
+    start = perf_counter()
+
+    worldArguments = dict(configuration['world'])
+    worldArguments.setdefault('outputDirectory', os.path.join(directory, '_outputs', configuration['name']))
+
+    world = World(configuration['snapshots'],
+                  simulationID = configuration['name'],
+                  startingDate = configuration['startingDate'],
+                  **worldArguments)
+
+    for attribute, value in configuration['attributes'].items():
+        setattr(world, attribute, value)
+
+    world.loadScenario(scenario = configuration['scenario'],
+                       startingPoint = configuration['startingPoint'],
+                       **configuration['loadScenario'])
+
+    while world.currstep < len(world.snapshots):
+        world.step()
+
+    path = os.path.join(directory, 'run={}'.format(configuration['name']))
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+    ResultsStore(world).write(os.path.join(path, 'results.parquet'))
+
+    return perf_counter() - start
+
+
+def initializeWorker(logLevel):
+    logging.getLogger("flexABLE").setLevel(logLevel)
+
+
+def runSweep(configurations, name = 'sweep', workers = None, directory = 'output/sweeps', logLevel = logging.WARNING):
+    """
+    Runs the configurations on a pool of worker processes, os.cpu_count() by
+    default, and returns the run index as DataFrame. A failing run is
+    reported in the index and does not stop the others.
+    """
+    names = [configuration['name'] for configuration in configurations]
+    if len(set(names)) != len(names):
+        raise ValueError('Names of the sweep configurations are not unique')
+
+    directory = os.path.join(directory, name)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # shared inputs, converted once for all workers
+    for scenario in sorted(set(configuration['scenario'] for configuration in configurations)):
+        if any(configuration['loadScenario'].get('useInputStore', True) for configuration in configurations if configuration['scenario'] == scenario):
+            InputStore(scenario).convertScenario()
+
+    runs = {configuration['name']: {'run': configuration['name'],
+                                    'status': 'failed',
+                                    'seconds': None,
+                                    'error': None,
+                                    'configuration': json.dumps(configuration, default = str)}
+            for configuration in configurations}
+
+    start = perf_counter()
+    logger.info('Running {} configurations of sweep {}....'.format(len(configurations), name))
+
+    with ProcessPoolExecutor(max_workers = workers, initializer = initializeWorker, initargs = (logLevel,)) as pool:
+        futures = {pool.submit(runConfiguration, configuration, directory): configuration['name'] for configuration in configurations}
+
+        for future in as_completed(futures):
+            run = runs[futures[future]]
+
+            try:
+                run['seconds'] = future.result()
+                run['status'] = 'finished'
+            except Exception as e:
+                run['error'] = '{}: {}'.format(type(e).__name__, e)
+                logger.error('Sweep run {} failed: {}'.format(run['run'], run['error']))
+
+    logger.info('Sweep {} finished in {:.1f} s'.format(name, perf_counter() - start))
+
+    index = pd.DataFrame([runs[runName] for runName in names]).set_index('run')
+    index.to_csv(os.path.join(directory, '_runs.csv'))
+
+    return index
+
+
+def readSweep(directory, runs = None, variables = None, units = None, columns = None):
+    """
+    Reads the results of a sweep, optionally only some runs, variables and
+    units. The column 'run' holds the configuration name.
+    """
+    filters = []
+    if runs is not None:
+        filters.append(('run', 'in', list(runs)))
+    if variables is not None:
+        filters.append(('variable', 'in', list(variables)))
+    if units is not None:
+        filters.append(('unit', 'in', list(units)))
+
+    return pd.read_parquet(directory, columns = columns, filters = filters or None)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Per-snapshot time series of the units in preallocated arrays.
+
+The units used to keep their results and commitments in dictionaries with
+one boxed entry per snapshot. A TimeSeries keeps the same dictionary
+interface on a float64 array, so the unit code reads and writes series[t]
+as before, while the results are exported as views on the arrays without
+copying them.
+
+@author: intgridnb-02
+"""
+import numpy as np
+import pandas as pd
+
+
+class TimeSeries():
+    """
+    Dictionary like view on a float array, indexed by snapshot. With
+    offset = 1 the first element holds the initial value at t = -1. Elements
+    behind the last snapshot are spare, e.g. for CRM commitments written
+    for a block that reaches past the end of the simulation.
+    """
+
+    def __init__(self, data, length, offset = 0):
+        self.data = data
+        self.length = length
+        self.offset = offset
+
+
+    @classmethod
+    def allocate(cls, length, value = 0., initial = None, spare = 0):
+        """
+        New series of length snapshots set to value, with an element for the
+        initial value at t = -1 unless initial is None.
+        """
+        offset = 0 if initial is None else 1
+        data = np.full(offset + length + spare, value, dtype = np.float64)
+
+        if initial is not None:
+            data[0] = initial
+
+        return cls(data, length, offset)
+
+
+    def __getitem__(self, t):
+        if t < -self.offset:
+            raise KeyError(t)
+
+        return self.data.item(t + self.offset)
+
+
+    def __setitem__(self, t, value):
+        if t < -self.offset:
+            raise KeyError(t)
+
+        self.data[t + self.offset] = value
+
+
+    def __len__(self):
+        return self.length + self.offset
+
+
+    def __iter__(self):
+        return iter(self.keys())
+
+
+    def __contains__(self, t):
+        return -self.offset <= t < self.length
+
+
+    def keys(self):
+        # same order as the dictionaries the series replace, the initial value comes last
+        return list(range(self.length)) + list(range(-self.offset, 0))
+
+
+    def values(self):
+        return [self[t] for t in self.keys()]
+
+
+    def items(self):
+        return [(t, self[t]) for t in self.keys()]
+
+
+    def update(self, other):
+        for t, value in dict(other).items():
+            self[t] = value
+
+
+    def array(self, start = 0, end = None):
+        """
+        View on the values of the snapshots [start, end).
+        """
+        end = self.length if end is None else end
+
+        return self.data[start + self.offset:end + self.offset]
+
+
+    def toFrame(self, index, column):
+        """
+        DataFrame with the values of all snapshots as one column, a view on the array.
+        """
+        return pd.DataFrame(self.array()[:, np.newaxis], index = index, columns = [column], copy = False)
+
+
+class PairTimeSeries(TimeSeries):
+    """
+    TimeSeries over two arrays, e.g. (capacity, price), read and written as tuples.
+    """
+
+    def __init__(self, data, otherData, length):
+        super().__init__(data, length)
+        self.otherData = otherData
+
+
+    @classmethod
+    def allocate(cls, length):
+        data = np.zeros((length, 2))
+
+        return cls(data[:, 0], data[:, 1], length)
+
+
+    def __getitem__(self, t):
+        if t < 0:
+            raise KeyError(t)
+
+        return (self.data.item(t), self.otherData.item(t))
+
+
+    def __setitem__(self, t, value):
+        if t < 0:
+            raise KeyError(t)
+
+        self.data[t], self.otherData[t] = value
+
+
+    def array(self, start = 0, end = None):
+        """
+        Views on both components for the snapshots [start, end).
+        """
+        end = self.length if end is None else end
+
+        return self.data[start:end], self.otherData[start:end]
+
+
+    def toFrame(self, index, columns):
+        return pd.DataFrame(np.column_stack(self.array()), index = index, columns = columns)
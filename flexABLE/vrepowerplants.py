@@ -5,10 +5,21 @@ Created on Sun Apr  19 17:04:23 2020
 @author: intgridnb-02
 """
 from .auxFunc import initializer
-from .bid import Bid
+from .bid import Bid, SENT, MR_EOM
+from .timeSeries import TimeSeries, PairTimeSeries
+import numpy as np
+from types import SimpleNamespace
+
+
+def bidPrice(name):
+    return -500 if 'Biomass' in name else -500
+
 
 class VREPowerplant():
     
+    # VRE units are not part of a PowerplantFleet
+    fleet = None
+    
     @initializer
     def __init__(self,
                  agent = None,
@@ -29,12 +40,11 @@ class VREPowerplant():
         # bids status parameters
         self.dictFeedIn = {n:m for n,m in zip(self.world.snapshots,FeedInTimeseries)}
         
-        self.dictCapacity = {n:None for n in self.world.snapshots}
-        self.dictCapacity[self.world.snapshots[0]] = self.maxPower
-        self.dictCapacity[-1] = self.maxPower
+        self.dictCapacity = TimeSeries.allocate(len(self.world.snapshots), value = np.nan, initial = self.maxPower)
+        self.dictCapacity[0] = self.maxPower
 
-        self.dictCapacityMR = {n:(0,0) for n in self.world.snapshots}
-        self.dictCapacityFlex = {n:(0,0) for n in self.world.snapshots}
+        self.dictCapacityMR = PairTimeSeries.allocate(len(self.world.snapshots))
+        self.dictCapacityFlex = PairTimeSeries.allocate(len(self.world.snapshots))
         
         # Unit status parameters
         self.sentBids=[]
@@ -49,7 +59,7 @@ class VREPowerplant():
         
         for bid in self.sentBids:
             self.dictCapacity[self.world.currstep] += bid.confirmedAmount
-            if 'mrEOM' in bid.ID:
+            if bid.kind == MR_EOM:
                 self.dictCapacityMR[self.world.currstep] = (bid.confirmedAmount, bid.price)
                 
             else:
@@ -69,18 +79,18 @@ class VREPowerplant():
         if market=="EOM":
             if bidQuantity_mr != 0:
                 bids.append(Bid(issuer = self,
-                                ID = "{}_mrEOM".format(self.name),
                                 price = bidPrice_mr,
                                 amount = bidQuantity_mr,
-                                status = "Sent",
+                                status = SENT,
                                 bidType = "Supply",
-                                node = self.node))
+                                node = self.node,
+                                kind = MR_EOM))
 
         return bids
     
     
     def calculateBidEOM(self, t):
-        marginalCost = -500 if 'Biomass' in self.name else -500
+        marginalCost = bidPrice(self.name)
         
         return self.dictFeedIn[t], marginalCost
     
@@ -88,3 +98,119 @@ class VREPowerplant():
     def checkAvailability(self, t):
         pass
 
+
+
+class VREPortfolio():
+    """
+    All VRE units of a scenario as one unit. The feed-ins are stored as one
+    (T x K) array and the portfolio sends one EOM supply bid per price level
+    and step. The confirmed amounts are split back onto the units pro-rata to
+    their feed-in only when the results are written, so curtailment is shared
+    by all units of a price level instead of following the bid order.
+    """
+    
+    # VRE units are not part of a PowerplantFleet
+    fleet = None
+    
+    @initializer
+    def __init__(self,
+                 agent = None,
+                 name = 'Renewables',
+                 technology = 'Renewable',
+                 heatExtraction = False,
+                 maxExtraction = 0,
+                 heatingDistrict = 'BW',
+                 node = 'Bus_DE',
+                 world = None,
+                 feedIn = None):
+        
+        length = len(self.world.snapshots)
+        
+        self.unitNames = list(feedIn.columns)
+        self.feedIn = feedIn.to_numpy(dtype = np.float64)[:length]
+        
+        # price level of every unit and the summed feed-in per level
+        self.prices, self.levels = np.unique([bidPrice(unitName) for unitName in self.unitNames], return_inverse = True)
+        self.levelFeedIn = np.stack([self.feedIn[:, self.levels == level].sum(axis = 1) for level in range(len(self.prices))], axis = 1)
+        self.bidNames = ["{}_{}".format(self.name, level) for level in range(len(self.prices))]
+        
+        # confirmed amount per level, NaN until the step is simulated
+        self.confirmed = np.full((length, len(self.prices)), np.nan)
+        
+        self.sentBids = []
+        self.bidsEOM = []
+        
+        
+    def step(self):
+        self.confirmed[self.world.currstep] = 0
+        
+        for level, bid in self.bidsEOM:
+            self.confirmed[self.world.currstep, level] += bid.confirmedAmount
+            
+        self.bidsEOM = []
+        self.sentBids = []
+        
+        
+    def feedback(self, bid):
+        self.sentBids.append(bid)
+        
+        
+    def requestBid(self, t, market):
+        bids = []
+        
+        if market == "EOM":
+            for level, amount in enumerate(self.levelFeedIn[t].tolist()):
+                if amount != 0:
+                    bid = Bid(issuer = self,
+                              price = self.prices.item(level),
+                              amount = amount,
+                              status = SENT,
+                              bidType = "Supply",
+                              node = self.node,
+                              kind = MR_EOM,
+                              name = self.bidNames[level])
+                    
+                    bids.append(bid)
+                    self.bidsEOM.append((level, bid))
+                    
+        return bids
+    
+    
+    def checkAvailability(self, t):
+        pass
+    
+    
+    def split(self, start, end):
+        """
+        Returns the power, must-run power and must-run price of every unit in
+        the snapshots [start, end) as (end - start) x K arrays. The power is
+        NaN for snapshots that are not simulated yet, like VREPowerplant.
+        """
+        feedIn = self.feedIn[start:end]
+        confirmed = self.confirmed[start:end]
+        simulated = ~np.isnan(confirmed[:, self.levels])
+        
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            share = np.where(self.levelFeedIn[start:end] != 0, confirmed / self.levelFeedIn[start:end], confirmed * 0)
+            
+        power = feedIn * share[:, self.levels]
+        powerMR = np.where(simulated, power, 0.)
+        priceMR = np.where(simulated & (feedIn != 0), self.prices[self.levels].astype(np.float64), 0.)
+        
+        return power, powerMR, priceMR
+    
+    
+    def units(self):
+        """
+        Result views of the single units with their share of the confirmed
+        amounts, with the series of a VREPowerplant.
+        """
+        length = len(self.world.snapshots)
+        power, powerMR, priceMR = self.split(0, length)
+        
+        return [SimpleNamespace(name = unitName,
+                                technology = self.technology,
+                                dictCapacity = TimeSeries(power[:, k], length),
+                                dictCapacityMR = PairTimeSeries(powerMR[:, k], priceMR[:, k], length),
+                                dictCapacityFlex = PairTimeSeries.allocate(length))
+                for k, unitName in enumerate(self.unitNames)]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures of the regression tests. The simulations run a few days of
+the 2030 scenario in a temporary working directory, since the World reads
+from input/ and writes to output/ relative to the working directory.
+
+@author: intgridnb-02
+"""
+import os
+
+import pytest
+
+from flexABLE.flexABLE import World
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIO = '2030'
+SNAPSHOTS = 192
+
+
+@pytest.fixture(scope = 'session')
+def scenarioDirectory(tmp_path_factory):
+    """
+    Working directory with the files of the scenario linked one by one into
+    input/, so that converted inputs and caches stay in the temporary
+    directory. The scenario has no district heating profile, the household
+    profile stands in for it.
+    """
+    directory = tmp_path_factory.mktemp('flexABLE')
+    source = os.path.join(REPOSITORY, 'input', SCENARIO)
+    target = directory / 'input' / SCENARIO
+    target.mkdir(parents = True)
+    
+    for fileName in os.listdir(source):
+        os.symlink(os.path.join(source, fileName), str(target / fileName))
+    os.symlink(os.path.join(source, 'HLP_HH_DE.csv'), str(target / 'HLP_DH_DE.csv'))
+    
+    (directory / 'output').mkdir()
+    
+    return directory
+
+
+@pytest.fixture
+def newWorld(scenarioDirectory, monkeypatch):
+    """
+    Returns a function that creates and loads a world of the scenario,
+    keyword arguments are passed on to loadScenario.
+    """
+    monkeypatch.chdir(scenarioDirectory)
+    
+    def newWorld(**kwargs):
+        world = World(SNAPSHOTS, simulationID = 'test', startingDate = '2030-01-01T00:00:00')
+        world.loadScenario(**dict(dict(scenario = SCENARIO,
+                                       importStorages = True,
+                                       importCRM = True,
+                                       importDHM = True,
+                                       importCBT = True,
+                                       cachePFC = False), **kwargs))
+        return world
+    
+    return newWorld
+
+
+@pytest.fixture
+def simulationResults():
+    """
+    Returns a function that collects prices and dispatch of a simulated world
+    as plain lists for exact comparison.
+    """
+    return collectResults
+
+
+def collectResults(world):
+    steps = range(len(world.snapshots))
+    
+    return {'price': [float(world.dictPFC[t]) for t in steps],
+            'IEDPrice': [float(world.IEDPrice[t]) for t in steps],
+            'powerplants': {p.name: [float(p.dictCapacity[t]) for t in steps] for p in world.powerplants},
+            'CRM': {p.name: [float(p.confQtyCRM_pos[t]) for t in steps] for p in world.powerplants if hasattr(p, 'confQtyCRM_pos')},
+            'storages': {s.name: [float(s.dictSOC[t]) for t in steps] for s in world.storages}}
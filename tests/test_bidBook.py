@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+clearBidBook against the bid by bid clearing EOM.marketClearing performed on
+Bid objects before the bid book was introduced.
+
+@author: intgridnb-02
+"""
+import operator
+
+import numpy as np
+import pytest
+
+from flexABLE.bid import Bid, SENT, REJECTED, INELASTIC_DEMAND as IED_KIND
+from flexABLE.bidBook import BidBook, clearBidBook, SUPPLY, DEMAND, INELASTIC_DEMAND
+
+
+def reject(bid):
+    # Bid.reject of the old clearing, only the inelastic demand is never rejected
+    if bid.kind != IED_KIND:
+        bid.status = REJECTED
+        bid.confirmedAmount = 0
+        
+        
+def referenceClearing(supplyBids, demandBids, inelasticDemand):
+    """
+    The former EOM.marketClearing on Bid objects. Returns the case, the
+    clearing price, the marginal bid, the energy deficit and the supply price
+    written to IEDPrice. The inelastic demand is the last demand bid.
+    """
+    bidsReceived = {"Supply": list(supplyBids), "Demand": list(demandBids[:-1])}
+    bidsReceived["Supply"].sort(key = operator.attrgetter('price'), reverse = True)
+    bidsReceived["Demand"].sort(key = operator.attrgetter('price'))
+    bidsReceived["Demand"].append(demandBids[-1])
+    bidsReceived["Demand"].sort(key = operator.attrgetter('price'))
+    
+    sum_totalSupply = sum(bidsReceived["Supply"])
+    sum_totalDemand = sum(bidsReceived["Demand"])
+    IEDPrice = None
+    
+    # Case 1
+    if sum_totalSupply == 0 or sum_totalDemand == 0:
+        return "Case1", 3000.2, None, 0, IEDPrice
+    
+    # Case 2
+    if inelasticDemand > sum_totalSupply:
+        for b in bidsReceived["Supply"]:
+            b.confirm()
+        bidsReceived["Demand"][-1].partialConfirm(sum_totalSupply)
+        marketClearingPrice = sorted(bidsReceived["Supply"], key = operator.attrgetter('price'))[-1].price
+        
+        return "Case2", marketClearingPrice, None, inelasticDemand - sum_totalSupply, IEDPrice
+    
+    # Case 3
+    confirmedBidsDemand = [bidsReceived["Demand"].pop()]
+    confQty_demand = confirmedBidsDemand[-1].amount
+    confirmedBidsDemand[-1].confirm()
+    
+    confirmedBidsSupply = []
+    confQty_supply = 0
+    currBidPrice_demand = 3000.00
+    currBidPrice_supply = -3000.00
+    
+    while True:
+        if confQty_demand > confQty_supply and currBidPrice_demand > currBidPrice_supply:
+            try:
+                confirmedBidsSupply.append(bidsReceived["Supply"].pop())
+                confQty_supply += confirmedBidsSupply[-1].amount
+                currBidPrice_supply = confirmedBidsSupply[-1].price
+                confirmedBidsSupply[-1].confirm()
+            except IndexError:
+                confirmedBidsDemand[-1].partialConfirm(confirmedBidsDemand[-1].amount - (confQty_demand - confQty_supply))
+                case = 'Case3.1'
+                break
+            
+        elif confQty_demand <= confQty_supply and currBidPrice_demand > currBidPrice_supply:
+            try:
+                confirmedBidsDemand.append(bidsReceived["Demand"].pop())
+                confQty_demand += confirmedBidsDemand[-1].amount
+                currBidPrice_demand = confirmedBidsDemand[-1].price
+                confirmedBidsDemand[-1].confirm()
+                IEDPrice = currBidPrice_supply
+            except IndexError:
+                confirmedBidsSupply[-1].partialConfirm(confirmedBidsSupply[-1].amount - (confQty_supply - confQty_demand))
+                case = 'Case3.2'
+                break
+            
+        elif currBidPrice_demand < currBidPrice_supply:
+            if (confQty_supply - confirmedBidsSupply[-1].amount) < (confQty_demand - confirmedBidsDemand[-1].amount):
+                confQty_demand -= confirmedBidsDemand[-1].amount
+                confirmedBidsSupply[-1].partialConfirm(confirmedBidsSupply[-1].amount - (confQty_supply - confQty_demand))
+                reject(confirmedBidsDemand.pop())
+            elif (confQty_supply - confirmedBidsSupply[-1].amount) > (confQty_demand - confirmedBidsDemand[-1].amount):
+                confQty_supply -= confirmedBidsSupply[-1].amount
+                confirmedBidsDemand[-1].partialConfirm(confirmedBidsDemand[-1].amount - (confQty_demand - confQty_supply))
+                reject(confirmedBidsSupply.pop())
+            case = 'Case3.3'
+            break
+        
+        else:
+            if confQty_supply > confQty_demand:
+                confirmedBidsSupply[-1].partialConfirm(confirmedBidsSupply[-1].amount - (confQty_supply - confQty_demand))
+            elif confQty_demand > confQty_supply:
+                confirmedBidsDemand[-1].partialConfirm(confirmedBidsDemand[-1].amount - (confQty_demand - confQty_supply))
+            case = 'Case3.4'
+            break
+        
+    marginalBid = sorted(confirmedBidsSupply, key = operator.attrgetter('price'))[-1]
+    
+    return case, marginalBid.price, marginalBid, 0, IEDPrice
+
+
+def randomBids(rng, supplyBids, demandBids, prices):
+    """
+    Agent bids in random order with prices drawn from a few levels, so that
+    equal prices are frequent, followed by import, export and inelastic demand.
+    Some agent bids have 'IED' in their ID, like the bids of NIEDERAUSSEM,
+    these are rejected like every other agent bid.
+    """
+    bids = []
+    for i, bidType in enumerate(rng.permutation(["Supply"] * supplyBids + ["Demand"] * demandBids)):
+        bids.append(Bid(ID = ('NIEDERAUSSEM {}' if rng.random() < 0.2 else 'Bid{}').format(i),
+                        price = float(rng.choice(prices)),
+                        amount = float(rng.choice([0., 10., 25., 50., 100., rng.uniform(0., 200.)])),
+                        status = SENT,
+                        bidType = bidType))
+        
+    imports = Bid(ID = 'import', price = -500., amount = float(rng.choice([0., 30.])), status = SENT, bidType = "Supply")
+    exports = Bid(ID = 'export', price = 2999., amount = float(rng.choice([0., 40.])), status = SENT, bidType = "Demand")
+    inelasticDemand = Bid(ID = 'IED', price = 3000., amount = float(rng.uniform(0., 50. * supplyBids)), status = SENT, bidType = "InelasticDemand", kind = IED_KIND)
+    
+    return bids, imports, exports, inelasticDemand
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_clearBidBook(seed):
+    rng = np.random.default_rng(seed)
+    bids, imports, exports, inelasticDemand = randomBids(rng, int(rng.integers(0, 12)), int(rng.integers(0, 12)),
+                                                         [-10., 0., 20., 20., 45., 80., 80., 3000.])
+    
+    book = BidBook.fromBids(bids, extraBids = [(imports.price, imports.amount, SUPPLY),
+                                               (exports.price, exports.amount, DEMAND),
+                                               (inelasticDemand.price, inelasticDemand.amount, INELASTIC_DEMAND)])
+    clearing = clearBidBook(book, inelasticDemand.amount)
+    
+    allBids = bids + [imports, exports, inelasticDemand]
+    case, price, marginalBid, energyDeficit, IEDPrice = referenceClearing([b for b in allBids if b.bidType == "Supply"],
+                                                                          [b for b in allBids if b.bidType != "Supply"],
+                                                                          inelasticDemand.amount)
+    
+    assert clearing.case == case
+    assert clearing.marketClearingPrice == price
+    assert clearing.energyDeficit == energyDeficit
+    assert clearing.lastAcceptedSupplyPrice == IEDPrice
+    assert clearing.marginalRow == (-1 if marginalBid is None else allBids.index(marginalBid))
+    assert [int(status) for status in book.status] == [b.status for b in allBids]
+    assert list(book.confirmedAmount) == [b.confirmedAmount for b in allBids]
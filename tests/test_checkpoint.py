@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Simulations resumed from a checkpoint against an uninterrupted simulation.
+
+@author: intgridnb-02
+"""
+
+
+def test_checkpoint(newWorld, simulationResults):
+    world = newWorld()
+    steps = len(world.snapshots)
+    
+    for _ in range(steps // 2):
+        world.step()
+    world.checkpoint('output/checkpoint.pkl.gz')
+    
+    while world.currstep < steps:
+        world.step()
+    uninterrupted = simulationResults(world)
+    
+    # Resumed in a new world
+    resumed = newWorld()
+    resumed.restore('output/checkpoint.pkl.gz')
+    assert resumed.currstep == steps // 2
+    
+    while resumed.currstep < steps:
+        resumed.step()
+    assert simulationResults(resumed) == uninterrupted
+    
+    # Rewound in the finished world
+    world.restore('output/checkpoint.pkl.gz')
+    
+    while world.currstep < steps:
+        world.step()
+    assert simulationResults(world) == uninterrupted
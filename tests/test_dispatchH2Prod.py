@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Heuristic electrolyzer dispatch against the constraints of the MILP in
+electrolyzer.buildModel, and its cost against the MILP solved with HiGHS.
+
+@author: intgridnb-02
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flexABLE import solvers
+from flexABLE.electrolyzer import Electrolyzer, buildModel, dispatchH2Prod
+from flexABLE.flexABLE import World
+
+TOLERANCE = 1e-6
+
+
+def randomUnit(rng, dt = 0.25):
+    """
+    Optimization parameters of an electrolyzer as in Electrolyzer.optimizationParameters.
+    """
+    installedCapacity = rng.uniform(10., 200.)
+    
+    return SimpleNamespace(dt = dt,
+                           coldStartUpCost = rng.uniform(10., 100.) * installedCapacity,
+                           maxPower = installedCapacity * rng.uniform(1., 1.2),
+                           minPower = installedCapacity * rng.uniform(0.05, 0.3),
+                           standbyCons = installedCapacity * rng.uniform(0.01, 0.1),
+                           minDowntime = float(rng.integers(1, 9)),
+                           effElec = rng.uniform(0.6, 0.75),
+                           energyContentH2_LHV = 0.03333,
+                           comprCons = 0.0012,
+                           maxSOC = float(rng.choice([0., 100., 2000., 10000.])))
+
+
+def randomWindow(rng, unit, time_periods = 96):
+    """
+    Prices with negative hours and demands between zero and above the
+    production capacity, constant or with gaps and spikes.
+    """
+    maxKg = unit.maxPower * unit.dt * unit.effElec / unit.energyContentH2_LHV
+    price = rng.uniform(-20., 150., size = time_periods)
+    
+    demand = rng.choice([0., 1.], size = time_periods, p = [0.3, 0.7]) * rng.uniform(0., 1.1, size = time_periods) * maxKg
+    if rng.random() < 0.3:
+        demand = np.full(time_periods, rng.uniform(0., 1.05) * maxKg)
+        
+    return price.tolist(), demand.tolist(), float(rng.choice([0., 1., 3000 / 365, 100.]))
+
+
+def assertConstraints(unit, demand, values, maxAllowedColdStartups, demandMet = True):
+    """
+    Asserts every constraint of buildModel for a schedule given as the results
+    of optimizeH2Prod. Without demandMet the demand may be undersupplied.
+    """
+    (bidQuantity, elecCons, elecStandByCons, comprCons, prodH2, elecToPlantUse, elecToStorage,
+     storageToPlantUse, currentSOC, isRunning, isStandBy, isIdle, isColdStarted) = map(np.asarray, values)
+    demand = np.asarray(demand)
+    time_periods = len(demand)
+    
+    close = lambda a, b: np.allclose(a, b, rtol = TOLERANCE, atol = TOLERANCE)
+    
+    # domains
+    for continuous in (bidQuantity, elecCons, elecStandByCons, comprCons, prodH2, elecToPlantUse, elecToStorage, storageToPlantUse, currentSOC):
+        assert (continuous >= -TOLERANCE).all()
+    for binary in (isRunning, isStandBy, isIdle, isColdStarted):
+        assert np.isin(binary, (0., 1.)).all()
+        
+    # power bounds, states and transitions
+    assert (elecCons <= unit.maxPower * isRunning + unit.standbyCons * isStandBy + TOLERANCE).all()
+    assert (elecCons >= unit.minPower * isRunning + unit.standbyCons * isStandBy - TOLERANCE).all()
+    assert close(isRunning + isIdle + isStandBy, 1.)
+    assert (isColdStarted[1:] >= isRunning[1:] - isRunning[:-1] - isStandBy[:-1]).all()
+    assert isColdStarted[0] == 0
+    assert (isIdle[:-1] + isStandBy[1:] <= 1).all()
+    
+    for i in range(1, time_periods):
+        previous = range(max(0, i - int(unit.minDowntime)), i)
+        assert len(previous) * isColdStarted[i] <= isIdle[previous].sum()
+        
+    assert isColdStarted.sum() <= maxAllowedColdStartups
+    
+    # hydrogen and energy balances
+    assert close(prodH2, (elecCons - unit.standbyCons * isStandBy) * unit.dt * unit.effElec / unit.energyContentH2_LHV)
+    assert close(prodH2, elecToPlantUse + elecToStorage)
+    if demandMet:
+        assert close(demand, elecToPlantUse + storageToPlantUse)
+    else:
+        assert (elecToPlantUse + storageToPlantUse <= demand + TOLERANCE).all()
+    assert close(comprCons, elecToStorage * unit.comprCons / unit.dt)
+    assert close(elecStandByCons, unit.standbyCons * isStandBy)
+    assert close(bidQuantity, elecCons + comprCons)
+    
+    # storage
+    assert close(currentSOC, np.cumsum(elecToStorage - storageToPlantUse))
+    assert (currentSOC <= unit.maxSOC + TOLERANCE).all()
+    
+    
+def highs():
+    pytest.importorskip('highspy')
+    
+    return solvers.solverSettings('highs', mipGap = 0)
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_dispatchH2Prod_constraints(seed):
+    rng = np.random.default_rng(seed)
+    unit = randomUnit(rng)
+    
+    for _ in range(5):
+        price, demand, maxAllowedColdStartups = randomWindow(rng, unit)
+        values, statistics = dispatchH2Prod(unit, price, demand, len(price), maxAllowedColdStartups)
+        
+        assert statistics['termination'] in ('feasible', 'demandNotMet')
+        assertConstraints(unit, demand, values, maxAllowedColdStartups, demandMet = statistics['termination'] == 'feasible')
+        
+        
+def test_dispatchH2Prod_demandNotMet():
+    # the heuristic only gives up on the demand of windows the MILP cannot solve either
+    settings = highs()
+    rng = np.random.default_rng(0)
+    windows = 0
+    
+    while windows < 10:
+        unit = randomUnit(rng)
+        price, demand, maxAllowedColdStartups = randomWindow(rng, unit, time_periods = 32)
+        values, statistics = dispatchH2Prod(unit, price, demand, len(price), maxAllowedColdStartups)
+        
+        if statistics['termination'] == 'demandNotMet':
+            model = buildModel(unit, len(price))
+            model.price.store_values(dict(enumerate(price)))
+            model.industry_demand.store_values(dict(enumerate(demand)))
+            model.maxAllowedColdStartups.set_value(maxAllowedColdStartups)
+            
+            result, solveStatistics = solvers.solve(model, settings)
+            assert solveStatistics['termination'] == 'infeasible'
+            windows += 1
+            
+            
+def test_dispatchGapReport(tmp_path, monkeypatch):
+    settings = highs()
+    rng = np.random.default_rng(1)
+    
+    world = World(35040, optimizationSolver = settings['solver'], optimizationMIPGap = 0, outputDirectory = str(tmp_path))
+    world.PFC = rng.uniform(-20., 150., size = 35040).tolist()
+    world.industrial_demand = pd.DataFrame({'Elec_test': np.full(35040, 500.)})
+    unit = Electrolyzer(name = 'Elec_test', installedCapacity = 100, world = world)
+    
+    # the first three days only
+    optimizationInput = unit.optimizationInput
+    def firstWindows():
+        industrialDemandH2, PFC, windows, maxAllowedColdStartups = optimizationInput()
+        return industrialDemandH2, PFC, windows[:3], maxAllowedColdStartups
+    monkeypatch.setattr(unit, 'optimizationInput', firstWindows)
+    
+    report = unit.dispatchGapReport()
+    
+    assert len(report) == 3
+    assert (report['milpTermination'] == 'optimal').all()
+    assert (report['costDifference'] >= -TOLERANCE * report['milpCost'].abs()).all()
+    assert (report['gap'] >= -TOLERANCE).all()
+    assert (tmp_path / 'Elec_capacities' / 'Elec_test_dispatchGap.csv').exists()
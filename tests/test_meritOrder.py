@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+MeritOrder.PFC against the snapshot by snapshot reference iterativePFC.
+
+@author: intgridnb-02
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from flexABLE.MeritOrder import MeritOrder
+
+INPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'input', '2030')
+
+
+def scenarioMeritOrder(snapshots):
+    """
+    Merit order of the 2030 scenario with the inputs read as in loadScenario.
+    """
+    fuelPrices = dict(pd.read_csv(os.path.join(INPUT, 'Fuel.csv'), nrows = snapshots, index_col = 0))
+    emissionFactors = dict(pd.read_csv(os.path.join(INPUT, 'EmissionFactors.csv'), index_col = 0)['emissions'])
+    
+    return MeritOrder(pd.read_csv(os.path.join(INPUT, 'IED_DE_for_PFC.csv'), nrows = snapshots, index_col = 0),
+                      pd.read_csv(os.path.join(INPUT, 'FPP_DE.csv'), index_col = 0, encoding = "Latin-1"),
+                      pd.read_csv(os.path.join(INPUT, 'FES_DE.csv'), nrows = snapshots, index_col = 0, encoding = "Latin-1"),
+                      fuelPrices,
+                      emissionFactors,
+                      range(snapshots))
+
+
+def test_PFC_scenario():
+    assert list(scenarioMeritOrder(672).PFC()) == list(scenarioMeritOrder(672).iterativePFC())
+    
+    
+def test_PFC_equalMarginalCosts():
+    # Many units with equal marginal costs whose merit order changes between snapshots
+    rng = np.random.default_rng(1)
+    T = 200
+    powerplants = pd.DataFrame({'fuel': rng.choice(['lignite', 'natural gas'], size = 30),
+                                'efficiency': rng.choice([0.35, 0.4], size = 30),
+                                'variableCosts': rng.choice([1., 2.], size = 30),
+                                'maxPower': rng.integers(50, 500, size = 30).astype(float)})
+    fuelPrices = {'lignite': np.full(T, 2.), 'natural gas': rng.choice([20., 30.], size = T), 'co2': rng.choice([50., 80.], size = T)}
+    emissionFactors = {'lignite': 0.4, 'natural gas': 0.2}
+    demand = pd.DataFrame({'demand': rng.uniform(0., powerplants.maxPower.sum() * 1.2, size = T)})
+    renewableSupply = pd.DataFrame({'wind': rng.uniform(0., 2000., size = T), 'solar': rng.uniform(0., 1000., size = T)})
+    
+    pfc = MeritOrder(demand, powerplants.copy(), renewableSupply, fuelPrices, emissionFactors, range(T)).PFC()
+    reference = MeritOrder(demand, powerplants.copy(), renewableSupply, fuelPrices, emissionFactors, range(T)).iterativePFC()
+    
+    assert list(pfc) == list(reference)
+    assert {-500, 1000} <= set(reference)
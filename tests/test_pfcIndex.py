@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+PFCIndex against the list based specificRevenueEOM of the power plants and
+the list based average price of the storages.
+
+@author: intgridnb-02
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from flexABLE.pfcIndex import PFCIndex
+from flexABLE.powerplant import Powerplant
+
+
+def randomWorld(rng, snapshots):
+    """
+    Stand-in for the world with a forecast and, before the current step,
+    cleared prices that differ from the forecast. Prices and marginal costs
+    are numpy floats as read by pandas, so the list based sum is a numpy float
+    like in the original simulation.
+    """
+    PFC = list(np.round(rng.uniform(-20., 150., size = snapshots), int(rng.integers(0, 5))))
+    for t in rng.integers(0, snapshots, size = snapshots // 10):
+        PFC[t] = int(rng.choice([-500, 1000]))
+    currstep = int(rng.integers(0, snapshots))
+    dictPFC = list(np.round(rng.uniform(-20., 150., size = currstep), 2)) + PFC[currstep:]
+    
+    return SimpleNamespace(PFC = PFC, dictPFC = dictPFC, currstep = currstep, dt = 0.25, pfcIndex = None)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_specificRevenue(seed):
+    rng = np.random.default_rng(seed)
+    world = randomWorld(rng, int(rng.integers(50, 400)))
+    unit = SimpleNamespace(world = world)
+    index = PFCIndex(world)
+    
+    for _ in range(200):
+        foresight = int(rng.integers(1, len(world.PFC)))
+        # start positions near the end of the horizon wrap around
+        t = int(rng.choice([rng.integers(0, len(world.PFC)), len(world.PFC) - rng.integers(1, foresight + 1)]))
+        marginalCosts = np.round(rng.uniform(-10., 120.), int(rng.integers(0, 4)))
+        
+        for horizon in ('all', 'positive', 'negative'):
+            world.pfcIndex = None
+            expected = Powerplant.specificRevenueEOM(unit, t, foresight, marginalCosts, horizon)
+            world.pfcIndex = index
+            
+            assert Powerplant.specificRevenueEOM(unit, t, foresight, marginalCosts, horizon) == expected, (t, foresight, marginalCosts, horizon)
+
+
+def referenceAveragePrice(PFC, t, foresight):
+    # list based average price of Storage.calculateBidEOM
+    if t - foresight < 0:
+        return np.mean(PFC[t-foresight:] + PFC[0:t+foresight])
+    elif t + foresight > len(PFC):
+        return np.mean(PFC[t-foresight:] + PFC[:t+foresight-len(PFC)])
+    else:
+        return np.mean(PFC[t-foresight:t+foresight])
+
+
+@pytest.mark.parametrize('snapshots', [96, 193, 672])
+def test_averagePrices(snapshots):
+    rng = np.random.default_rng(snapshots)
+    world = randomWorld(rng, snapshots)
+    index = PFCIndex(world)
+    
+    for foresight in range(1, 49):
+        averagePrices = index.averagePrices(foresight)
+        
+        assert len(averagePrices) == snapshots
+        assert [index.averagePrice(t, foresight) for t in range(snapshots)] == [referenceAveragePrice(world.PFC, t, foresight) for t in range(snapshots)], foresight
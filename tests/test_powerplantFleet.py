@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+PowerplantFleet against the bids of the single power plants.
+
+@author: intgridnb-02
+"""
+
+
+def test_powerplantFleet(newWorld, simulationResults):
+    results = []
+    for usePowerplantFleet in (False, True):
+        world = newWorld(usePowerplantFleet = usePowerplantFleet)
+        for _ in world.snapshots:
+            world.step()
+        results.append(simulationResults(world))
+        
+    assert results[0] == results[1]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Electrolyzer windows solved with HiGHS: solutions are loaded into the reused
+model, windows without a solution fall back to the heuristic dispatch.
+
+@author: intgridnb-02
+"""
+import numpy as np
+import pytest
+
+from flexABLE import electrolyzer, solvers
+from flexABLE.electrolyzer import dispatchCost, dispatchH2Prod, optimizeH2Prod
+
+from .test_dispatchH2Prod import assertConstraints, randomUnit
+
+pytest.importorskip('highspy')
+
+TIME_PERIODS = 48
+
+
+@pytest.fixture
+def unit(monkeypatch):
+    # every test builds its models from scratch
+    monkeypatch.setattr(electrolyzer, 'models', {})
+    unit = randomUnit(np.random.default_rng(0))
+    unit.maxSOC = 2000.
+    
+    return unit
+
+
+def window(unit, seed, demandRatio = 0.5):
+    rng = np.random.default_rng(seed)
+    maxKg = unit.maxPower * unit.dt * unit.effElec / unit.energyContentH2_LHV
+    
+    return rng.uniform(-20., 150., size = TIME_PERIODS).tolist(), [demandRatio * maxKg] * TIME_PERIODS
+
+
+def test_optimalWindow(unit):
+    price, demand = window(unit, 1)
+    values, statistics = optimizeH2Prod(unit, solvers.solverSettings('highs', mipGap = 0), price, demand, TIME_PERIODS, 3)
+    
+    assert statistics['termination'] == 'optimal'
+    assert statistics['loaded']
+    assert statistics['fallback'] is None
+    assertConstraints(unit, demand, values, 3)
+    assert dispatchCost(unit, price, values) <= dispatchCost(unit, price, dispatchH2Prod(unit, price, demand, TIME_PERIODS, 3)[0]) + 1e-6
+    
+    
+def test_infeasibleWindow(unit):
+    settings = solvers.solverSettings('highs', mipGap = 0)
+    price, demand = window(unit, 1)
+    optimizeH2Prod(unit, settings, price, demand, TIME_PERIODS, 3)
+    
+    # more demand than the electrolyzer can produce, solved on the model that still holds the solution above
+    price, demand = window(unit, 2, demandRatio = 1.5)
+    values, statistics = optimizeH2Prod(unit, settings, price, demand, TIME_PERIODS, 3)
+    
+    assert statistics['termination'] == 'infeasible'
+    assert not statistics['loaded']
+    assert statistics['fallback'] == 'heuristic'
+    assert statistics['fallbackTermination'] == 'demandNotMet'
+    assert values == dispatchH2Prod(unit, price, demand, TIME_PERIODS, 3)[0]
+    
+    
+def test_warmStart(unit):
+    settings = solvers.solverSettings('highs', mipGap = 0, warmStart = True)
+    assert settings['warmStart']
+    
+    first = window(unit, 1)
+    second = window(unit, 2, demandRatio = 0.3)
+    optimizeH2Prod(unit, settings, *first, TIME_PERIODS, 3)
+    model = next(iter(electrolyzer.models.values()))
+    
+    values, statistics = optimizeH2Prod(unit, settings, *second, TIME_PERIODS, 3)
+    
+    # the second window is solved on the same model, started from the first solution
+    assert list(electrolyzer.models.values()) == [model]
+    assert statistics['termination'] == 'optimal'
+    assert statistics['fallback'] is None
+    assertConstraints(unit, second[1], values, 3)
+    
+    electrolyzer.models.clear()
+    coldValues, coldStatistics = optimizeH2Prod(unit, solvers.solverSettings('highs', mipGap = 0), *second, TIME_PERIODS, 3)
+    
+    assert dispatchCost(unit, second[0], values) == pytest.approx(dispatchCost(unit, second[0], coldValues), rel = 1e-9, abs = 1e-6)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+StorageFleet against the bids of the single storages.
+
+@author: intgridnb-02
+"""
+
+
+def test_storageFleet(newWorld, simulationResults):
+    results = []
+    for useStorageFleet in (False, True):
+        world = newWorld(useStorageFleet = useStorageFleet)
+        for _ in world.snapshots:
+            world.step()
+        results.append(simulationResults(world))
+        
+    assert results[0] == results[1]